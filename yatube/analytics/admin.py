@@ -0,0 +1,144 @@
+import datetime as dt
+from collections import defaultdict
+
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html_join
+
+from posts.models import ArchivedPost, Post, User
+
+from .hll import HyperLogLog
+from .models import CPROFILE, KINDS, POST, PageStat, RequestProfile
+
+REPORT_SIZE = 50
+
+
+def top_pages(kind, since, limit=REPORT_SIZE):
+    """Самые просматриваемые страницы с дня since: просмотры суммой,
+    посетители — слиянием дневных скетчей."""
+    top = list(PageStat.objects.filter(kind=kind, day__gte=since)
+               .values('object_id').annotate(total=Sum('views'))
+               .order_by('-total')[:limit])
+    sketches = defaultdict(HyperLogLog)
+    for object_id, sketch in PageStat.objects.filter(
+            kind=kind, day__gte=since,
+            object_id__in=[row['object_id'] for row in top]
+    ).values_list('object_id', 'sketch'):
+        sketches[object_id].merge(HyperLogLog.from_bytes(sketch))
+    return [(row['object_id'], row['total'],
+             sketches[row['object_id']].count()) for row in top]
+
+
+def page_titles(kind, ids):
+    if kind == POST:
+        titles = {}
+        for model in (ArchivedPost, Post):
+            titles.update(
+                (post.id, f'{post.author.username}: {post}')
+                for post in model.objects.filter(
+                    id__in=ids).select_related('author'))
+        return titles
+    return dict(User.objects.filter(id__in=ids).values_list('id',
+                                                            'username'))
+
+
+class PageStatAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'object_id', 'day', 'views', 'uniques')
+    list_filter = ('kind',)
+    date_hierarchy = 'day'
+    readonly_fields = ('kind', 'object_id', 'day', 'views', 'uniques')
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        return [
+            path('top/', self.admin_site.admin_view(self.top_view),
+                 name='analytics_pagestat_top'),
+        ] + super().get_urls()
+
+    def top_view(self, request):
+        kind = request.GET.get('kind', POST)
+        if kind not in dict(KINDS):
+            kind = POST
+        days = request.GET.get('days', '')
+        days = int(days) if days.isdigit() and int(days) else 7
+        since = timezone.localdate() - dt.timedelta(days=days - 1)
+        rows = top_pages(kind, since)
+        titles = page_titles(kind, [row[0] for row in rows])
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Популярные страницы',
+            'kinds': KINDS,
+            'kind': kind,
+            'days': days,
+            'rows': [(object_id, titles.get(object_id, '-удалено-'), views,
+                      uniques) for object_id, views, uniques in rows],
+        }
+        return TemplateResponse(request,
+                                'admin/analytics/pagestat/top.html', context)
+
+
+# Что можно скачать из профиля: (поле, расширение, тип содержимого).
+DOWNLOADS = {
+    'profile': ('txt', 'text/plain'),
+    'sql': ('json', 'application/json'),
+    'templates': ('json', 'application/json'),
+}
+
+
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created', 'method', 'path', 'view_name', 'user',
+                    'status_code', 'duration_ms', 'sql_count', 'sql_ms')
+    list_filter = ('view_name', 'mode')
+    list_select_related = ('user',)
+    fields = ('created', 'user', 'method', 'path', 'view_name',
+              'status_code', 'mode', 'duration_ms', 'sql_count', 'sql_ms',
+              'downloads')
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def downloads(self, obj):
+        return format_html_join(
+            ' | ', '<a href="{}">{}</a>',
+            ((reverse('admin:analytics_requestprofile_download',
+                      args=[obj.id, field]), self.filename(obj, field))
+             for field in DOWNLOADS))
+    downloads.short_description = 'Скачать'
+
+    def filename(self, obj, field):
+        extension = DOWNLOADS[field][0]
+        if field == 'profile' and obj.mode != CPROFILE:
+            # Свернутые стеки: flamegraph.pl или speedscope.
+            extension = 'collapsed'
+        return f'profile-{obj.id}-{field}.{extension}'
+
+    def get_urls(self):
+        return [
+            path('<int:profile_id>/download/<slug:field>/',
+                 self.admin_site.admin_view(self.download_view),
+                 name='analytics_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, profile_id, field):
+        if field not in DOWNLOADS or not self.has_view_permission(request):
+            raise PermissionDenied
+        obj = get_object_or_404(RequestProfile, id=profile_id)
+        response = HttpResponse(getattr(obj, field),
+                                content_type=DOWNLOADS[field][1])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.filename(obj, field)}"')
+        return response
+
+
+admin.site.register(PageStat, PageStatAdmin)
+admin.site.register(RequestProfile, RequestProfileAdmin)
@@ -0,0 +1,172 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       transaction)
+from django.utils import timezone
+
+from yatube.ratelimit import client_ip
+
+from .hll import HyperLogLog
+from .models import PageStat
+
+logger = logging.getLogger(__name__)
+
+
+def visitor_id(request):
+    """Кого считать одним посетителем: пользователя или пару
+    адрес + браузер для анонимов."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.id}'
+    return (f"anon:{client_ip(request)}:"
+            f"{request.META.get('HTTP_USER_AGENT', '')}")
+
+
+def save(pending):
+    """Сводит накопленное в PageStat пачкой на каждый (вид, день).
+
+    Существующие строки блокируются и обновляются одним bulk_update,
+    новые вставляются одним bulk_create. Если строку успел вставить
+    другой процесс, транзакция повторяется уже с ней.
+    """
+    by_page = defaultdict(dict)
+    for (kind, object_id, day), entry in pending.items():
+        by_page[kind, day][object_id] = entry
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                for (kind, day), entries in by_page.items():
+                    _save_page(kind, day, entries)
+            return
+        except IntegrityError:
+            if attempt:
+                raise
+
+
+def _save_page(kind, day, entries):
+    rows = {row.object_id: row for row in PageStat.objects
+            .select_for_update().filter(kind=kind, day=day,
+                                        object_id__in=list(entries))}
+    created = []
+    for object_id, (views, sketch) in entries.items():
+        row = rows.get(object_id)
+        if row is None:
+            created.append(PageStat(
+                kind=kind, object_id=object_id, day=day, views=views,
+                uniques=sketch.count(), sketch=sketch.to_bytes()))
+            continue
+        merged = HyperLogLog.from_bytes(row.sketch).merge(sketch)
+        row.views += views
+        row.uniques = merged.count()
+        row.sketch = merged.to_bytes()
+    PageStat.objects.bulk_update(rows.values(),
+                                 ['views', 'uniques', 'sketch'])
+    PageStat.objects.bulk_create(created)
+
+
+class ViewCounter:
+    """Счетчик просмотров в памяти процесса.
+
+    Просмотр — приращение в словаре и регистр скетча, без запроса к
+    БД. Накопленное сводит в PageStat фоновый поток процесса (start):
+    раз в ANALYTICS_FLUSH_INTERVAL секунд, даже если запросов нет, и
+    сразу, как только набралось ANALYTICS_MAX_PENDING страниц. Запрос
+    сам не пишет в БД; только без потока (тесты, команды) сводит тот
+    запрос, который заметил срок. Если сведение не удалось,
+    накопленное возвращается в буфер до следующей попытки, а при
+    штатной остановке процесса сводится напоследок.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.last_flush = time.monotonic()
+        self.wakeup = threading.Event()
+        self.flusher = None
+
+    def record(self, kind, object_id, visitor):
+        key = (kind, object_id, timezone.localdate())
+        with self.lock:
+            entry = self.pending.get(key)
+            if entry is None:
+                entry = self.pending[key] = [0, HyperLogLog()]
+            entry[0] += 1
+            entry[1].add(visitor)
+            due = (len(self.pending) >= getattr(
+                settings, 'ANALYTICS_MAX_PENDING', 1000)
+                or time.monotonic() - self.last_flush >= getattr(
+                    settings, 'ANALYTICS_FLUSH_INTERVAL', 10))
+        if due:
+            if self.flusher is not None and self.flusher.is_alive():
+                self.wakeup.set()
+            else:
+                self.flush()
+
+    def start(self):
+        """Запускает поток сведения; вызывают точки входа WSGI и ASGI."""
+        if self.flusher is not None and self.flusher.is_alive():
+            return
+        if self.flusher is None:
+            atexit.register(self.flush)
+            os.register_at_fork(after_in_child=self.after_fork)
+        self.flusher = threading.Thread(target=self.run,
+                                        name='analytics-flush', daemon=True)
+        self.flusher.start()
+
+    def after_fork(self):
+        # Воркер, форкнутый после запуска, начинает с пустым буфером и
+        # своим потоком: накопленное сведет родитель.
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pending = {}
+        self.start()
+
+    def run(self):
+        # Поток работает, пока он — текущий поток сведения счетчика.
+        while self.flusher is threading.current_thread():
+            self.wakeup.wait(getattr(settings, 'ANALYTICS_FLUSH_INTERVAL',
+                                     10))
+            self.wakeup.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception('Analytics flush failed')
+
+    def take(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.monotonic()
+        return pending
+
+    def restore(self, pending):
+        with self.lock:
+            for key, (views, sketch) in pending.items():
+                entry = self.pending.setdefault(key, [0, HyperLogLog()])
+                entry[0] += views
+                entry[1].merge(sketch)
+
+    def flush(self):
+        """Сводит накопленное в БД; возвращает число страниц."""
+        pending = self.take()
+        if not pending:
+            return 0
+        try:
+            save(pending)
+        except DatabaseError:
+            logger.exception('Analytics flush failed')
+            self.restore(pending)
+            return 0
+        return len(pending)
+
+
+counter = ViewCounter()
+
+
+def record_view(request, kind, object_id):
+    counter.record(kind, object_id, visitor_id(request))
@@ -0,0 +1,37 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'пост'), ('profile', 'профиль')], max_length=16, verbose_name='Страница')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id')),
+                ('day', models.DateField(verbose_name='День')),
+                ('views', models.PositiveIntegerField(default=0, verbose_name='Просмотров')),
+                ('uniques', models.PositiveIntegerField(default=0, verbose_name='Посетителей')),
+                ('sketch', models.BinaryField()),
+            ],
+            options={
+                'ordering': ['-day', '-views'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='pagestat',
+            index=models.Index(fields=['kind', 'day', '-views'], name='analytics_p_kind_288c24_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='pagestat',
+            unique_together={('kind', 'object_id', 'day')},
+        ),
+    ]
@@ -0,0 +1,125 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+POST = 'post'
+PROFILE = 'profile'
+KINDS = [
+    (POST, 'пост'),
+    (PROFILE, 'профиль'),
+]
+
+
+class PageStat(models.Model):
+    """Просмотры страницы за день, сведенные analytics.counter.
+
+    sketch — HyperLogLog посетителей (analytics.hll), uniques — его
+    оценка на момент последнего сведения, чтобы отчет сортировал и
+    показывал строки, не разбирая скетчи.
+    """
+    kind = models.CharField(
+        max_length=16,
+        choices=KINDS,
+        verbose_name='Страница',
+    )
+    object_id = models.PositiveIntegerField(
+        verbose_name='id',
+    )
+    day = models.DateField(
+        verbose_name='День',
+    )
+    views = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Просмотров',
+    )
+    uniques = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Посетителей',
+    )
+    sketch = models.BinaryField(
+        editable=False,
+    )
+
+    class Meta:
+        ordering = ['-day', '-views']
+        unique_together = ['kind', 'object_id', 'day']
+        indexes = [models.Index(fields=['kind', 'day', '-views'])]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.object_id} {self.day}'
+
+
+SAMPLE = 'sample'
+CPROFILE = 'cprofile'
+PROFILER_MODES = [
+    (SAMPLE, 'выборочный'),
+    (CPROFILE, 'cProfile'),
+]
+
+
+class RequestProfile(models.Model):
+    """Один запрос, выполненный под профилировщиком по просьбе
+    сотрудника (см. analytics.profiling)."""
+    created = models.DateTimeField(
+        auto_now_add=True,
+        db_index=True,
+        verbose_name='Дата',
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='Сотрудник',
+    )
+    method = models.CharField(
+        max_length=8,
+        verbose_name='Метод',
+    )
+    path = models.CharField(
+        max_length=500,
+        verbose_name='Путь',
+    )
+    view_name = models.CharField(
+        max_length=200,
+        blank=True,
+        verbose_name='Представление',
+    )
+    status_code = models.PositiveSmallIntegerField(
+        verbose_name='Статус',
+    )
+    mode = models.CharField(
+        max_length=16,
+        choices=PROFILER_MODES,
+        verbose_name='Профилировщик',
+    )
+    duration_ms = models.FloatField(
+        verbose_name='Время, мс',
+    )
+    sql_count = models.PositiveIntegerField(
+        verbose_name='SQL-запросов',
+    )
+    sql_ms = models.FloatField(
+        verbose_name='Время SQL, мс',
+    )
+    profile = models.TextField(
+        blank=True,
+        verbose_name='Профиль',
+        help_text='Свернутые стеки для flamegraph или отчет cProfile',
+    )
+    sql = models.TextField(
+        default='[]',
+        verbose_name='SQL',
+    )
+    templates = models.TextField(
+        default='[]',
+        verbose_name='Шаблоны',
+    )
+
+    class Meta:
+        ordering = ['-created']
+
+    def __str__(self):
+        return f'{self.method} {self.path}'
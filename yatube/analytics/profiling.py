@@ -0,0 +1,191 @@
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+from .models import CPROFILE, SAMPLE, RequestProfile
+
+HEADER = 'HTTP_X_PROFILE'
+PARAM = '_profile'
+
+# Глобальную подмену Template.render делит один запрос за раз.
+_busy = threading.Lock()
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}.{code.co_name}"
+
+
+class Sampler:
+    """Выборочный профилировщик одного потока.
+
+    Отдельный поток раз в PROFILING_INTERVAL секунд снимает стек
+    профилируемого и копит свернутые стеки: «корень;...;лист» и число
+    попаданий — формат flamegraph.pl и speedscope.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run,
+                                       name='request-sampler', daemon=True)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                names.append(frame_name(frame))
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def result(self):
+        return '\n'.join(f'{stack} {count}'
+                         for stack, count in self.stacks.most_common())
+
+
+class DeterministicProfiler:
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+
+    def __enter__(self):
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.disable()
+
+    def result(self):
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(
+            'cumulative').print_stats(100)
+        return out.getvalue()
+
+
+@contextmanager
+def trace_sql(queries):
+    def record(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'ms': (time.perf_counter() - start) * 1000,
+            })
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(record))
+        yield
+
+
+@contextmanager
+def trace_templates(timings):
+    """Время рендеринга каждого шаблона, включая вложенные: пока
+    запрос профилируется, Template.render подменен оберткой, которая
+    пишет только вызовы из его потока."""
+    thread_id = threading.get_ident()
+    render = Template.render
+    depth = [0]
+
+    def timed_render(template, context):
+        if threading.get_ident() != thread_id:
+            return render(template, context)
+        # Запись заводится до рендеринга: вложенные идут после нее.
+        timing = {'name': template.origin.template_name or template.name,
+                  'depth': depth[0]}
+        timings.append(timing)
+        start = time.perf_counter()
+        depth[0] += 1
+        try:
+            return render(template, context)
+        finally:
+            depth[0] -= 1
+            timing['ms'] = (time.perf_counter() - start) * 1000
+
+    Template.render = timed_render
+    try:
+        yield
+    finally:
+        Template.render = render
+
+
+def profile_request(get_response, request, mode):
+    queries, timings = [], []
+    if mode == CPROFILE:
+        profiler = DeterministicProfiler()
+    else:
+        profiler = Sampler(threading.get_ident(),
+                           getattr(settings, 'PROFILING_INTERVAL', 0.002))
+    start = time.perf_counter()
+    with trace_sql(queries), trace_templates(timings), profiler:
+        response = get_response(request)
+    duration = (time.perf_counter() - start) * 1000
+    match = request.resolver_match
+    report = RequestProfile.objects.create(
+        user=request.user, method=request.method,
+        path=request.get_full_path()[:500],
+        view_name=match.view_name if match else '',
+        status_code=response.status_code, mode=mode,
+        duration_ms=duration, sql_count=len(queries),
+        sql_ms=sum(query['ms'] for query in queries),
+        profile=profiler.result(), sql=json.dumps(queries),
+        templates=json.dumps(timings))
+    keep = getattr(settings, 'PROFILING_KEEP', 100)
+    stale = RequestProfile.objects.values_list('id', flat=True)[keep:]
+    RequestProfile.objects.filter(id__in=list(stale)).delete()
+    response['X-Profile-Id'] = str(report.id)
+    return response
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос сотрудника с заголовком X-Profile или
+    параметром ?_profile (значение cprofile — детерминированный
+    профилировщик, иначе выборочный).
+
+    Без триггера запрос проходит после одной проверки META; ни
+    профилировщик, ни обертки SQL и шаблонов не устанавливаются.
+    Профили лежат в RequestProfile и скачиваются из админки.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (HEADER not in request.META
+                and PARAM not in request.META.get('QUERY_STRING', '')):
+            return self.get_response(request)
+        mode = request.META.get(HEADER) or request.GET.get(PARAM)
+        if mode is None or not request.user.is_staff:
+            return self.get_response(request)
+        if not _busy.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            return profile_request(
+                self.get_response, request,
+                CPROFILE if mode == CPROFILE else SAMPLE)
+        finally:
+            _busy.release()
@@ -0,0 +1,129 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..counter import ViewCounter, counter
+from ..hll import HyperLogLog
+from ..models import POST, PROFILE, PageStat
+
+User = get_user_model()
+
+
+class HyperLogLogTests(TestCase):
+    def test_estimate_is_close(self):
+        for total in (10, 1000, 50000):
+            with self.subTest(total=total):
+                sketch = HyperLogLog()
+                for number in range(total):
+                    sketch.add(f'visitor {number}')
+                    sketch.add(f'visitor {number}')
+                self.assertAlmostEqual(sketch.count(), total,
+                                       delta=total * 0.05 + 1)
+
+    def test_merge_is_union(self):
+        first, second = HyperLogLog(), HyperLogLog()
+        for number in range(3000):
+            first.add(str(number))
+            second.add(str(number + 2000))
+        merged = HyperLogLog.from_bytes(first.to_bytes()).merge(second)
+        self.assertAlmostEqual(merged.count(), 5000, delta=250)
+
+
+@override_settings(ANALYTICS_FLUSH_INTERVAL=3600)
+class ViewCounterTests(TestCase):
+    def test_views_stay_in_memory_until_flush(self):
+        views = ViewCounter()
+        with self.assertNumQueries(0):
+            for number in range(30):
+                views.record(POST, 1, f'visitor {number % 3}')
+            views.record(PROFILE, 1, 'visitor 0')
+        self.assertEqual(views.flush(), 2)
+        for number in range(10):
+            views.record(POST, 1, f'visitor {number}')
+        views.flush()
+        stat = PageStat.objects.get(kind=POST, object_id=1)
+        self.assertEqual(stat.views, 40)
+        self.assertEqual(stat.uniques, 10)
+        self.assertEqual(PageStat.objects.get(kind=PROFILE).views, 1)
+
+    @override_settings(ANALYTICS_MAX_PENDING=2)
+    def test_flushes_when_buffer_is_full(self):
+        views = ViewCounter()
+        views.record(POST, 1, 'visitor')
+        self.assertFalse(PageStat.objects.exists())
+        views.record(POST, 2, 'visitor')
+        self.assertEqual(PageStat.objects.count(), 2)
+        self.assertFalse(views.pending)
+
+
+@override_settings(ANALYTICS_FLUSH_INTERVAL=0.05, ANALYTICS_MAX_PENDING=2)
+class BackgroundFlushTests(TransactionTestCase):
+    def setUp(self):
+        self.views = ViewCounter()
+        self.views.start()
+
+    def tearDown(self):
+        flusher, self.views.flusher = self.views.flusher, None
+        self.views.wakeup.set()
+        flusher.join(5)
+
+    def wait_for_stats(self, count):
+        deadline = time.monotonic() + 5
+        while (PageStat.objects.count() < count
+               and time.monotonic() < deadline):
+            time.sleep(0.01)
+        return PageStat.objects.count()
+
+    def test_requests_do_not_write(self):
+        """Полный буфер будит поток, а не пишет в БД из запроса."""
+        with self.assertNumQueries(0):
+            self.views.record(POST, 1, 'visitor')
+            self.views.record(POST, 2, 'visitor')
+        self.assertEqual(self.wait_for_stats(2), 2)
+
+    @override_settings(ANALYTICS_MAX_PENDING=1000)
+    def test_idle_process_flushes(self):
+        self.views.record(PROFILE, 1, 'visitor')
+        self.assertEqual(self.wait_for_stats(1), 1)
+        self.assertFalse(self.views.pending)
+
+
+@override_settings(ANALYTICS_FLUSH_INTERVAL=3600)
+class PageViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='популярный пост',
+                                       author=cls.author)
+
+    def setUp(self):
+        counter.take()
+
+    def test_post_and_profile_views_are_counted(self):
+        client = Client()
+        for _ in range(3):
+            client.get(reverse('posts:post',
+                               args=['author', PageViewsTests.post.id]))
+        client.get(reverse('posts:profile', args=['author']))
+        counter.flush()
+        stat = PageStat.objects.get(kind=POST,
+                                    object_id=PageViewsTests.post.id)
+        self.assertEqual((stat.views, stat.uniques), (3, 1))
+        self.assertTrue(PageStat.objects.filter(
+            kind=PROFILE, object_id=PageViewsTests.author.id).exists())
+
+    def test_admin_report(self):
+        Client().get(reverse('posts:post',
+                             args=['author', PageViewsTests.post.id]))
+        counter.flush()
+        client = Client()
+        client.force_login(User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'))
+        response = client.get(reverse('admin:analytics_pagestat_top'))
+        self.assertContains(response, 'author: популярный пост')
@@ -0,0 +1,67 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.template.base import Template
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..models import CPROFILE, SAMPLE, RequestProfile
+
+User = get_user_model()
+
+
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(text='пост', author=cls.author)
+        cls.staff = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ProfilingTests.staff)
+        self.url = reverse('posts:profile', args=['author'])
+
+    def test_staff_request_is_profiled(self):
+        render = Template.render
+        response = self.client.get(self.url, {'_profile': CPROFILE})
+        report = RequestProfile.objects.get()
+        self.assertEqual(response['X-Profile-Id'], str(report.id))
+        self.assertEqual(report.view_name, 'posts:profile')
+        self.assertIn('posts/views.py', report.profile)
+        self.assertGreater(report.sql_count, 0)
+        self.assertEqual(len(json.loads(report.sql)), report.sql_count)
+        templates = json.loads(report.templates)
+        self.assertEqual((templates[0]['name'], templates[0]['depth']),
+                         ('profile.html', 0))
+        self.assertIs(Template.render, render)
+
+    def test_header_selects_sampler(self):
+        self.client.get(self.url, HTTP_X_PROFILE='1')
+        self.assertEqual(RequestProfile.objects.get().mode, SAMPLE)
+
+    def test_others_are_not_profiled(self):
+        client = Client()
+        client.force_login(ProfilingTests.author)
+        response = client.get(self.url, {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile-Id', response)
+        self.assertFalse(RequestProfile.objects.exists())
+
+    def test_download(self):
+        self.client.get(self.url, {'_profile': '1'})
+        report = RequestProfile.objects.get()
+        response = self.client.get(reverse(
+            'admin:analytics_requestprofile_download',
+            args=[report.id, 'sql']))
+        self.assertEqual(
+            response['Content-Disposition'],
+            f'attachment; filename="profile-{report.id}-sql.json"')
+        self.assertEqual(len(json.loads(response.content)), report.sql_count)
+        self.assertContains(self.client.get(reverse(
+            'admin:analytics_requestprofile_change', args=[report.id])),
+            f'profile-{report.id}-profile.collapsed')
@@ -0,0 +1,77 @@
+import logging
+import signal
+import threading
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from jobs import worker
+
+logger = logging.getLogger(__name__)
+
+
+def _execute_in_process(job_id):
+    from jobs.models import Job
+
+    job = Job.objects.filter(id=job_id).first()
+    if job is not None:
+        worker.execute(job)
+
+
+class Command(BaseCommand):
+    help = 'Запускает воркеры фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--processes', action='store_true',
+                            help='Пул процессов вместо пула потоков')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--burst', action='store_true',
+                            help='Выполнить готовые задачи и завершиться')
+
+    def handle(self, *args, **options):
+        worker.discover_tasks()
+        concurrency = max(1, options['concurrency'])
+        self.stopping = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        if options['processes']:
+            # Дочерние процессы не должны наследовать соединение с БД.
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=concurrency)
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency)
+
+        running = set()
+        done = 0
+        with pool:
+            while not self.stopping.is_set():
+                worker.requeue_stale()
+                jobs = worker.claim(concurrency - len(running))
+                for job in jobs:
+                    if options['processes']:
+                        running.add(pool.submit(_execute_in_process, job.id))
+                    else:
+                        running.add(pool.submit(worker.execute, job))
+                if not running:
+                    if options['burst']:
+                        break
+                    self.stopping.wait(options['poll_interval'])
+                    continue
+                finished, running = wait(
+                    running, timeout=options['poll_interval'],
+                    return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future.exception() is not None:
+                        logger.error('Worker crashed: %r', future.exception())
+                done += len(finished)
+            wait(running)
+            done += len(running)
+        self.stdout.write(f'Выполнено задач: {done}')
+
+    def stop(self, signum, frame):
+        self.stopping.set()
@@ -0,0 +1,55 @@
+import datetime as dt
+import json
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Job
+
+registry = {}
+
+
+class Task:
+    def __init__(self, func, name=None, max_attempts=5):
+        self.func = func
+        self.name = name or f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Ставит задачу в очередь на немедленное выполнение."""
+        return self.schedule(None, *args, **kwargs)
+
+    def schedule(self, eta, *args, **kwargs):
+        """Ставит задачу в очередь на момент eta (datetime или timedelta)."""
+        if getattr(settings, 'JOBS_EAGER', False):
+            return self.func(*args, **kwargs)
+        if eta is None:
+            eta = timezone.now()
+        elif isinstance(eta, dt.timedelta):
+            eta = timezone.now() + eta
+        return Job.objects.create(
+            name=self.name,
+            payload=json.dumps({'args': args, 'kwargs': kwargs}),
+            run_at=eta,
+            max_attempts=self.max_attempts,
+        )
+
+
+def task(func=None, *, name=None, max_attempts=5):
+    """Регистрирует функцию как фоновую задачу.
+
+    Аргументы задачи сериализуются в JSON, поэтому передавать нужно
+    идентификаторы, а не объекты моделей.
+    """
+    def wrap(func):
+        registered = Task(func, name=name, max_attempts=max_attempts)
+        registry[registered.name] = registered
+        return registered
+
+    if func is None:
+        return wrap
+    return wrap(func)
@@ -0,0 +1,95 @@
+import datetime as dt
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .. import worker
+from ..models import Job
+from ..tasks import task
+
+calls = []
+
+
+@task
+def remember(value):
+    calls.append(value)
+
+
+@task(max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+class WorkerTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_enqueues_job(self):
+        """delay() создает задачу в очереди, а не выполняет ее сразу."""
+        job = remember.delay(1)
+        self.assertEqual(calls, [])
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.name, remember.name)
+
+    def test_run_pending_executes_and_removes_job(self):
+        """Выполненная задача удаляется из очереди."""
+        remember.delay('a')
+        self.assertEqual(worker.run_pending(), 1)
+        self.assertEqual(calls, ['a'])
+        self.assertFalse(Job.objects.exists())
+
+    def test_scheduled_job_waits_for_eta(self):
+        """Отложенная задача не выполняется раньше срока."""
+        remember.schedule(dt.timedelta(hours=1), 'later')
+        self.assertEqual(worker.run_pending(), 0)
+        self.assertEqual(calls, [])
+
+    def test_failed_job_retries_with_backoff(self):
+        """Упавшая задача откладывается, а после max_attempts
+        помечается как failed."""
+        job = explode.delay()
+        worker.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('boom', job.last_error)
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now())
+        worker.run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+
+    def test_stale_running_job_is_requeued(self):
+        """Задача зависшего воркера возвращается в очередь."""
+        job = remember.delay('stale')
+        Job.objects.filter(id=job.id).update(
+            status=Job.RUNNING,
+            locked_at=timezone.now() - dt.timedelta(days=1))
+        self.assertEqual(worker.requeue_stale(), 1)
+        worker.run_pending()
+        self.assertEqual(calls, ['stale'])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        """В режиме JOBS_EAGER задача выполняется сразу."""
+        remember.delay('now')
+        self.assertEqual(calls, ['now'])
+        self.assertFalse(Job.objects.exists())
+
+
+class RunWorkersCommandTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_burst_mode_drains_queue(self):
+        """run_workers --burst выполняет очередь и завершается."""
+        for i in range(5):
+            remember.delay(i)
+        out = StringIO()
+        call_command('run_workers', concurrency=1, burst=True, stdout=out)
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertFalse(Job.objects.exists())
+        self.assertIn('5', out.getvalue())
@@ -0,0 +1,98 @@
+import datetime as dt
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+from .tasks import registry
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = getattr(settings, 'JOBS_BACKOFF_BASE', 5)
+BACKOFF_MAX = getattr(settings, 'JOBS_BACKOFF_MAX', 3600)
+STALE_AFTER = dt.timedelta(
+    seconds=getattr(settings, 'JOBS_STALE_AFTER', 600))
+
+
+def discover_tasks():
+    """Импортирует модули tasks.py всех приложений, наполняя реестр."""
+    autodiscover_modules('tasks')
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return dt.timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, воркер которых пропал."""
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=timezone.now() - STALE_AFTER,
+    ).update(status=Job.QUEUED, locked_by='', locked_at=None)
+
+
+def claim(limit, owner=None):
+    """Атомарно забирает до limit готовых к запуску задач."""
+    owner = owner or worker_id()
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(Job.objects
+                   .filter(status=Job.QUEUED, run_at__lte=now)
+                   .values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        Job.objects.filter(id__in=ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=owner, locked_at=now)
+    return list(Job.objects.filter(id__in=ids, status=Job.RUNNING,
+                                   locked_by=owner))
+
+
+def execute(job):
+    """Выполняет задачу; при ошибке планирует повтор с задержкой."""
+    close_old_connections()
+    try:
+        func = registry[job.name]
+        payload = json.loads(job.payload)
+        func(*payload.get('args', ()), **payload.get('kwargs', {}))
+    except Exception:
+        job.attempts += 1
+        job.last_error = traceback.format_exc()
+        job.locked_by = ''
+        job.locked_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = Job.FAILED
+            logger.error('Job %s (%s) failed permanently', job.id, job.name)
+        else:
+            job.status = Job.QUEUED
+            job.run_at = timezone.now() + backoff(job.attempts)
+        job.save(update_fields=['attempts', 'last_error', 'locked_by',
+                                'locked_at', 'status', 'run_at'])
+        return False
+    else:
+        Job.objects.filter(id=job.id).delete()
+        return True
+    finally:
+        close_old_connections()
+
+
+def run_pending(limit=100):
+    """Синхронно выполняет все готовые задачи; удобно в тестах."""
+    done = 0
+    for job in claim(limit):
+        execute(job)
+        done += 1
+    return done
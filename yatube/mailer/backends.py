@@ -0,0 +1,32 @@
+import json
+
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .models import OutgoingEmail
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """Складывает письма в таблицу исходящих вместо отправки по сети.
+
+    Доставкой занимается ``manage.py send_outbox``.
+    """
+
+    def send_messages(self, email_messages):
+        rows = []
+        for message in email_messages:
+            recipients = message.recipients()
+            if not recipients:
+                continue
+            rows.append(OutgoingEmail(
+                from_email=message.from_email,
+                recipients=json.dumps(recipients),
+                subject=str(message.subject)[:255],
+                message=message.message().as_bytes(),
+            ))
+        try:
+            OutgoingEmail.objects.bulk_create(rows)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(rows)
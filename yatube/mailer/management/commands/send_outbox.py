@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mailer import outbox
+from mailer.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = 'Доставляет письма из таблицы исходящих'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true',
+                            help='Работать непрерывно')
+        parser.add_argument('--poll-interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        # Отправитель один, поэтому незавершенные письма прошлого
+        # запуска можно смело вернуть в очередь.
+        OutgoingEmail.objects.filter(status=OutgoingEmail.SENDING).update(
+            status=OutgoingEmail.QUEUED)
+        total = 0
+        while True:
+            sent = outbox.send_batch(options['batch_size'])
+            total += sent
+            if sent:
+                continue
+            # Очередь пуста: самое время убрать старые отправленные.
+            while outbox.prune(options['batch_size']):
+                pass
+            if not options['loop']:
+                break
+            time.sleep(options['poll_interval'])
+        self.stdout.write(f'Отправлено писем: {total}')
@@ -0,0 +1,134 @@
+import datetime as dt
+import json
+import logging
+import smtplib
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from jobs.worker import backoff
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_BACKEND = getattr(settings, 'OUTBOX_DELIVERY_BACKEND',
+                           'django.core.mail.backends.smtp.EmailBackend')
+MAX_ATTEMPTS = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+KEEP_SENT_DAYS = getattr(settings, 'OUTBOX_KEEP_SENT_DAYS', 7)
+
+
+class _RawMessage:
+    def __init__(self, data):
+        self.data = data
+
+    def as_bytes(self, linesep='\n'):
+        lines = self.data.replace(b'\r\n', b'\n').split(b'\n')
+        return linesep.encode().join(lines)
+
+    def get_charset(self):
+        return None
+
+
+class StoredMessage:
+    """Обертка над строкой таблицы с интерфейсом EmailMessage,
+    достаточным для встроенных почтовых бэкендов Django."""
+
+    encoding = None
+
+    def __init__(self, outgoing):
+        self.from_email = outgoing.from_email
+        self._recipients = json.loads(outgoing.recipients)
+        self._message = _RawMessage(bytes(outgoing.message))
+
+    def recipients(self):
+        return self._recipients
+
+    def message(self):
+        return self._message
+
+
+def claim(limit):
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(OutgoingEmail.objects
+                   .filter(status=OutgoingEmail.QUEUED, next_attempt__lte=now)
+                   .values_list('id', flat=True)[:limit])
+        OutgoingEmail.objects.filter(
+            id__in=ids, status=OutgoingEmail.QUEUED
+        ).update(status=OutgoingEmail.SENDING)
+    return list(OutgoingEmail.objects.filter(id__in=ids,
+                                             status=OutgoingEmail.SENDING))
+
+
+def _fail(outgoing, error):
+    outgoing.attempts += 1
+    outgoing.last_error = repr(error)
+    if outgoing.attempts >= MAX_ATTEMPTS:
+        outgoing.status = OutgoingEmail.FAILED
+        logger.error('Email %s failed permanently: %r', outgoing.id, error)
+    else:
+        outgoing.status = OutgoingEmail.QUEUED
+        outgoing.next_attempt = timezone.now() + backoff(outgoing.attempts)
+    outgoing.save(update_fields=['attempts', 'last_error', 'status',
+                                 'next_attempt'])
+
+
+def _deliver(connection, outgoing):
+    try:
+        connection.send_messages([StoredMessage(outgoing)])
+    except smtplib.SMTPServerDisconnected:
+        # Сервер оборвал сессию: переподключаемся один раз.
+        connection.close()
+        connection.open()
+        connection.send_messages([StoredMessage(outgoing)])
+
+
+def send_batch(limit=100, connection=None):
+    """Отправляет до limit писем через одно соединение.
+
+    Возвращает число доставленных писем.
+    """
+    batch = claim(limit)
+    if not batch:
+        return 0
+    connection = connection or get_connection(DELIVERY_BACKEND)
+    sent_ids = []
+    try:
+        connection.open()
+        for outgoing in batch:
+            try:
+                _deliver(connection, outgoing)
+            except Exception as error:
+                _fail(outgoing, error)
+            else:
+                sent_ids.append(outgoing.id)
+    except Exception as error:
+        # Не удалось даже подключиться: откладываем всю пачку.
+        for outgoing in batch:
+            if outgoing.id not in sent_ids:
+                _fail(outgoing, error)
+    finally:
+        connection.close()
+        # next_attempt отправленного — время доставки, от него prune()
+        # отсчитывает срок хранения.
+        OutgoingEmail.objects.filter(id__in=sent_ids).update(
+            status=OutgoingEmail.SENT, last_error='',
+            next_attempt=timezone.now())
+    return len(sent_ids)
+
+
+def prune(limit=1000):
+    """Удаляет до limit писем, доставленных раньше чем
+    OUTBOX_KEEP_SENT_DAYS дней назад; возвращает их число.
+
+    Ищет по тому же индексу (status, next_attempt), что и claim().
+    """
+    before = timezone.now() - dt.timedelta(days=KEEP_SENT_DAYS)
+    ids = list(OutgoingEmail.objects
+               .filter(status=OutgoingEmail.SENT, next_attempt__lt=before)
+               .values_list('id', flat=True)[:limit])
+    OutgoingEmail.objects.filter(id__in=ids).delete()
+    return len(ids)
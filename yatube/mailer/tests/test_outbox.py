@@ -0,0 +1,142 @@
+import datetime as dt
+import socketserver
+import threading
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import outbox
+from ..models import OutgoingEmail
+
+SMTP_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 localhost ready')
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode().strip().upper()
+            if command.startswith(('EHLO', 'HELO')):
+                self.reply('250 localhost')
+            elif command.startswith('RCPT'):
+                if 'REJECT' in command:
+                    self.reply('550 no such user')
+                else:
+                    self.reply('250 ok')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                body = []
+                for data in iter(self.rfile.readline, b''):
+                    if data == b'.\r\n':
+                        break
+                    body.append(data)
+                server.messages.append(b''.join(body))
+                self.reply('250 queued')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 ok')
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.connections = 0
+        self.messages = []
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.server = SMTPStandIn()
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def connection(self):
+        return get_connection(SMTP_BACKEND, host='127.0.0.1',
+                              port=self.server.server_address[1])
+
+    def enqueue(self, *recipients):
+        outbox_backend = get_connection('mailer.backends.OutboxEmailBackend')
+        for recipient in recipients:
+            mail.send_mail('Тема', 'Текст', 'from@yatube.ru', [recipient],
+                           connection=outbox_backend)
+
+    def test_backend_only_writes_outbox(self):
+        """Бэкенд не ходит в сеть, а пишет письмо в таблицу."""
+        self.enqueue('a@example.com')
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        self.assertEqual(self.server.connections, 0)
+
+    def test_batch_uses_one_connection(self):
+        """Пачка писем уходит через одно SMTP-соединение."""
+        self.enqueue('a@example.com', 'b@example.com', 'c@example.com')
+        sent = outbox.send_batch(connection=self.connection())
+        self.assertEqual(sent, 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(len(self.server.messages), 3)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(),
+            3)
+
+    def test_old_sent_messages_are_pruned(self):
+        """Доставленные письма хранятся OUTBOX_KEEP_SENT_DAYS дней."""
+        self.enqueue('a@example.com', 'b@example.com')
+        self.enqueue('queued@example.com')
+        outbox.send_batch(limit=2, connection=self.connection())
+        self.assertEqual(outbox.prune(), 0)
+        old = timezone.now() - dt.timedelta(days=outbox.KEEP_SENT_DAYS + 1)
+        OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).update(
+            next_attempt=old)
+        self.assertEqual(outbox.prune(limit=1), 1)
+        self.assertEqual(outbox.prune(), 1)
+        self.assertEqual(OutgoingEmail.objects.get().status,
+                         OutgoingEmail.QUEUED)
+
+    def test_rejected_message_is_retried_later(self):
+        """Отклоненное письмо откладывается, остальные доставляются."""
+        self.enqueue('reject@example.com', 'b@example.com')
+        sent = outbox.send_batch(connection=self.connection())
+        self.assertEqual(sent, 1)
+        failed = OutgoingEmail.objects.get(recipients__contains='reject')
+        self.assertEqual(failed.status, OutgoingEmail.QUEUED)
+        self.assertEqual(failed.attempts, 1)
+        self.assertEqual(outbox.send_batch(connection=self.connection()), 0)
+
+    def test_unreachable_server_requeues_batch(self):
+        """Если сервер недоступен, вся пачка возвращается в очередь."""
+        self.enqueue('a@example.com')
+        connection = get_connection(SMTP_BACKEND, host='127.0.0.1', port=1)
+        self.assertEqual(outbox.send_batch(connection=connection), 0)
+        self.assertEqual(
+            OutgoingEmail.objects.get().status, OutgoingEmail.QUEUED)
+
+    def test_password_reset_goes_through_outbox(self):
+        """Сброс пароля не отправляет письмо синхронно."""
+        from django.contrib.auth import get_user_model
+
+        get_user_model().objects.create_user(
+            username='foo', email='foo@example.com', password='pass')
+        with self.settings(
+                EMAIL_BACKEND='mailer.backends.OutboxEmailBackend'):
+            self.client.post(reverse('password_reset'),
+                             {'email': 'foo@example.com'})
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+        outbox.send_batch(connection=self.connection())
+        self.assertIn(b'foo@example.com', self.server.messages[0])
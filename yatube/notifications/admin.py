@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import Notification
+
+
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'verb', 'post', 'count', 'is_read',
+                    'updated')
+    list_filter = ('verb', 'is_read')
+    raw_id_fields = ('recipient', 'post')
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(Notification, NotificationAdmin)
@@ -0,0 +1,12 @@
+from django.utils.functional import SimpleLazyObject
+
+from . import inbox
+
+
+def unread(request):
+    """Бейдж непрочитанных; кэш трогаем, только если шаблон его выведет."""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_notifications':
+            SimpleLazyObject(lambda: inbox.unread_count(user))}
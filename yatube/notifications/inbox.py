@@ -0,0 +1,131 @@
+import datetime as dt
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Event, Notification, User
+
+MAX_ACTORS = 3
+DELIVERY_SCHEDULED_KEY = 'notifications:delivery-scheduled'
+
+
+def unread_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_count(user):
+    """Число непрочитанных из кэша; COUNT — после сброса или истечения.
+
+    Раскладка и прочтение правят счетчик в общем кэше. Срок
+    NOTIFICATIONS_UNREAD_TTL ограничивает расхождение, если правка до
+    него не дошла: процесс со своим кэшем пересчитает бейдж сам.
+    """
+    count = cache.get(unread_key(user.id))
+    if count is None:
+        count = Notification.objects.filter(recipient=user,
+                                            is_read=False).count()
+        cache.set(unread_key(user.id), count,
+                  getattr(settings, 'NOTIFICATIONS_UNREAD_TTL', 60))
+    return count
+
+
+def bump_unread(user_id, delta):
+    try:
+        cache.incr(unread_key(user_id), delta)
+    except ValueError:
+        # Счетчика нет в кэше — его честно посчитает unread_count().
+        pass
+
+
+def reset_unread(user_id):
+    cache.delete(unread_key(user_id))
+
+
+def record(recipient_id, actor_id, verb, post_id=None):
+    if recipient_id == actor_id:
+        return
+    Event.objects.create(recipient_id=recipient_id, actor_id=actor_id,
+                         verb=verb, post_id=post_id)
+    schedule_delivery()
+
+
+def schedule_delivery():
+    """Одна задача раскладки на окно NOTIFICATIONS_DELAY."""
+    from .tasks import deliver_notifications
+
+    delay = getattr(settings, 'NOTIFICATIONS_DELAY', 5)
+    if cache.add(DELIVERY_SCHEDULED_KEY, True, delay):
+        transaction.on_commit(lambda: deliver_notifications.schedule(
+            dt.timedelta(seconds=delay)))
+
+
+def deliver(limit=None):
+    """Раскладывает пачку событий по ящикам; возвращает ее размер.
+
+    События группируются по (получатель, вид, пост) и сворачиваются в
+    непрочитанную строку ящика, если такая есть: двенадцать
+    комментариев подряд дают одну строку «… и еще 9». Пачка
+    забирается с SKIP LOCKED, так что раскладчики не мешают друг
+    другу, а упавший просто отпускает свои события.
+    """
+    limit = limit or getattr(settings, 'NOTIFICATIONS_BATCH_SIZE', 500)
+    new_unread = Counter()
+    with transaction.atomic():
+        events = list(Event.objects.select_for_update(skip_locked=True)
+                      .order_by('id')[:limit])
+        if not events:
+            return 0
+        groups = defaultdict(list)
+        for event in events:
+            groups[(event.recipient_id, event.verb,
+                    event.post_id)].append(event)
+        names = dict(User.objects.filter(
+            id__in={event.actor_id for event in events}
+        ).values_list('id', 'username'))
+        unread = {
+            (n.recipient_id, n.verb, n.post_id): n
+            for n in Notification.objects.filter(
+                is_read=False,
+                recipient_id__in={key[0] for key in groups})
+        }
+        now = timezone.now()
+        created = []
+        for key, group in groups.items():
+            actors = []
+            for event in reversed(group):
+                name = names.get(event.actor_id)
+                if name and name not in actors:
+                    actors.append(name)
+            notification = unread.get(key)
+            if notification is None:
+                created.append(Notification(
+                    recipient_id=key[0], verb=key[1], post_id=key[2],
+                    actor_names=json.dumps(actors[:MAX_ACTORS]),
+                    count=len(group), updated=now))
+                new_unread[key[0]] += 1
+                continue
+            actors += [name for name in notification.actors
+                       if name not in actors]
+            notification.actor_names = json.dumps(actors[:MAX_ACTORS])
+            notification.count += len(group)
+            notification.updated = now
+            notification.save(update_fields=['actor_names', 'count',
+                                             'updated'])
+        Notification.objects.bulk_create(created)
+        Event.objects.filter(id__in=[event.id for event in events]).delete()
+    for user_id, delta in new_unread.items():
+        bump_unread(user_id, delta)
+    return len(events)
+
+
+def mark_read(user, ids=None):
+    notifications = Notification.objects.filter(recipient=user,
+                                                is_read=False)
+    if ids is not None:
+        notifications = notifications.filter(id__in=ids)
+    if notifications.update(is_read=True):
+        reset_unread(user.id)
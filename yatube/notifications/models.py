@@ -0,0 +1,102 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import models
+from django.utils import timezone
+
+from posts.models import Post
+
+User = get_user_model()
+
+COMMENT = 'comment'
+REPLY = 'reply'
+FOLLOW = 'follow'
+VERBS = [
+    (COMMENT, 'комментарий к посту'),
+    (REPLY, 'ответ на комментарий'),
+    (FOLLOW, 'подписка'),
+]
+
+
+class Event(models.Model):
+    """Событие, еще не разложенное по ящикам (см. notifications.inbox)."""
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    verb = models.CharField(max_length=16, choices=VERBS)
+    # Пост может уехать в архив с тем же id (см. notifications.signals).
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        blank=True,
+        null=True,
+        related_name='+',
+    )
+    created = models.DateTimeField(auto_now_add=True)
+
+
+class Notification(models.Model):
+    """Строка ящика: пока она не прочитана, новые события того же
+    вида про тот же пост сворачиваются в нее же."""
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель',
+    )
+    verb = models.CharField(
+        max_length=16,
+        choices=VERBS,
+        verbose_name='Событие',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        blank=True,
+        null=True,
+        related_name='+',
+        verbose_name='Пост',
+    )
+    actor_names = models.TextField(
+        default='[]',
+        verbose_name='Последние участники',
+    )
+    count = models.PositiveIntegerField(
+        default=1,
+        verbose_name='Событий',
+    )
+    is_read = models.BooleanField(
+        default=False,
+        verbose_name='Прочитано',
+    )
+    updated = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Обновлено',
+    )
+
+    class Meta:
+        ordering = ['-updated']
+        indexes = [
+            models.Index(fields=['recipient', '-updated']),
+            models.Index(fields=['recipient', 'is_read']),
+        ]
+
+    def __str__(self):
+        return f'{self.get_verb_display()} ×{self.count}'
+
+    @property
+    def actors(self):
+        return json.loads(self.actor_names)
+
+    @property
+    def others(self):
+        return max(self.count - len(self.actors), 0)
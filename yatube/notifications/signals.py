@@ -0,0 +1,39 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posts import archive
+from posts.models import ArchivedPost, Comment, Follow, Post
+
+from . import inbox
+from .models import COMMENT, FOLLOW, REPLY, Event, Notification
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if not created:
+        return
+    post_author_id = (Post.objects.filter(id=instance.post_id)
+                      .values_list('author_id', flat=True).first())
+    inbox.record(post_author_id, instance.author_id, COMMENT,
+                 instance.post_id)
+    parent = instance.parent
+    if parent is not None and parent.author_id != post_author_id:
+        inbox.record(parent.author_id, instance.author_id, REPLY,
+                     instance.post_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        inbox.record(instance.author_id, instance.user_id, FOLLOW)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def post_deleted(sender, instance, **kwargs):
+    # Перенесенный в архив пост сохраняет id, и уведомления о нем
+    # остаются; удаленный уносит их с собой.
+    if sender is Post and archive.is_moving():
+        return
+    Event.objects.filter(post_id=instance.id).delete()
+    Notification.objects.filter(post_id=instance.id).delete()
@@ -0,0 +1,10 @@
+from jobs.tasks import task
+
+from . import inbox
+
+
+@task
+def deliver_notifications():
+    """Разбирает очередь событий пачками, пока она не опустеет."""
+    while inbox.deliver():
+        pass
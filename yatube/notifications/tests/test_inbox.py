@@ -0,0 +1,130 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Post
+
+from .. import inbox
+from ..models import Event, Notification
+
+User = get_user_model()
+
+
+class InboxTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='test', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, user, parent=None):
+        return Comment.objects.create(post=InboxTests.post, author=user,
+                                      text='text', parent=parent)
+
+    def test_burst_is_digested(self):
+        """Поток комментариев сворачивается в одну строку."""
+        for number in range(12):
+            self.comment(User.objects.create_user(username=f'user{number}'))
+        self.comment(InboxTests.author)
+        self.assertEqual(Event.objects.count(), 12)
+
+        inbox.deliver(limit=5)
+        while inbox.deliver(limit=5):
+            pass
+        notification = Notification.objects.get(recipient=InboxTests.author)
+        self.assertEqual(notification.count, 12)
+        self.assertEqual(notification.actors, ['user11', 'user10', 'user9'])
+        self.assertEqual(notification.others, 9)
+        self.assertFalse(Event.objects.exists())
+
+    def test_read_notification_is_not_reused(self):
+        """После прочтения новые события начинают новую строку."""
+        reader = User.objects.create_user(username='reader')
+        self.comment(reader)
+        inbox.deliver()
+        inbox.mark_read(InboxTests.author)
+        self.comment(reader)
+        inbox.deliver()
+        self.assertEqual(
+            list(InboxTests.author.notifications.values_list(
+                'is_read', flat=True)), [False, True])
+
+    def test_reply_and_follow(self):
+        """Ответ уведомляет автора комментария, подписка — автора."""
+        commenter = User.objects.create_user(username='commenter')
+        replier = User.objects.create_user(username='replier')
+        root = self.comment(commenter)
+        self.comment(replier, parent=root)
+        Follow.objects.create(user=replier, author=InboxTests.author)
+        inbox.deliver()
+        self.assertEqual(commenter.notifications.get().verb, 'reply')
+        self.assertEqual(
+            sorted(InboxTests.author.notifications.values_list(
+                'verb', 'count')), [('comment', 2), ('follow', 1)])
+
+    def test_unread_count_is_cached(self):
+        """Бейдж считается COUNT один раз, дальше — из кэша."""
+        self.assertEqual(inbox.unread_count(InboxTests.author), 0)
+        self.comment(User.objects.create_user(username='reader'))
+        Follow.objects.create(user=User.objects.get(username='reader'),
+                              author=InboxTests.author)
+        inbox.deliver()
+        with self.assertNumQueries(0):
+            self.assertEqual(inbox.unread_count(InboxTests.author), 2)
+        inbox.mark_read(InboxTests.author)
+        self.assertEqual(inbox.unread_count(InboxTests.author), 0)
+
+
+class InboxViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='test', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(InboxViewTests.author)
+
+    def test_inbox_marks_page_read(self):
+        """Ящик показывает уведомления и гасит бейдж."""
+        Comment.objects.create(post=InboxViewTests.post,
+                               author=InboxViewTests.reader, text='text')
+        inbox.deliver()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'badge')
+        response = self.client.get(reverse('notifications:inbox'))
+        self.assertContains(response, '@reader')
+        self.assertContains(response, 'border-primary')
+        self.assertFalse(Notification.objects.filter(is_read=False).exists())
+        cache.clear()
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'badge')
+
+    def test_badge_catches_up_with_other_process(self):
+        """Раскладка в процессе со своим кэшем доходит до бейджа не
+        позже NOTIFICATIONS_UNREAD_TTL."""
+        index = reverse('posts:index')
+        self.assertNotContains(self.client.get(index), 'badge')
+        Comment.objects.create(post=InboxViewTests.post,
+                               author=InboxViewTests.reader, text='text')
+        with mock.patch.object(inbox, 'cache', LocMemCache('worker', {})):
+            inbox.deliver()
+        later = time.time() + settings.NOTIFICATIONS_UNREAD_TTL + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertContains(self.client.get(index), 'badge')
+
+    def test_inbox_requires_login(self):
+        response = Client().get(reverse('notifications:inbox'))
+        self.assertEqual(response.status_code, 302)
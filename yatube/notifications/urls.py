@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'notifications'
+
+urlpatterns = [
+    path('', views.notifications, name='inbox'),
+    path('read/', views.mark_all_read, name='mark_all_read'),
+]
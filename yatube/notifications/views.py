@@ -0,0 +1,35 @@
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.shortcuts import redirect, render
+from django.views.decorators.http import require_POST
+
+from posts.models import ArchivedPost
+
+from . import inbox
+
+
+@login_required
+def notifications(request):
+    paginator = Paginator(request.user.notifications.select_related(
+        'post__author'), 20)
+    page = paginator.get_page(request.GET.get('page'))
+    # Шаблон подсвечивает новые, а в базе они уже прочитаны.
+    page.object_list = list(page.object_list)
+    # Пост, уехавший в архив, JOIN не находит: ищем его там.
+    archived = ArchivedPost.objects.select_related('author').in_bulk(
+        [notification.post_id for notification in page.object_list
+         if notification.post_id and notification.post is None])
+    for notification in page.object_list:
+        post = notification.post or archived.get(notification.post_id)
+        notification.target = post
+    inbox.mark_read(request.user, [notification.id
+                                   for notification in page.object_list
+                                   if not notification.is_read])
+    return render(request, 'notifications/inbox.html', {'page': page})
+
+
+@login_required
+@require_POST
+def mark_all_read(request):
+    inbox.mark_read(request.user)
+    return redirect('notifications:inbox')
@@ -1,19 +1,88 @@
 from django.contrib import admin
 
-from .models import Group, Post
+from yatube.paginator import EstimatedCountPaginator
 
+from . import purge, search
+from .models import Comment, Follow, Group, GroupFollow, Post, Tombstone
 
-class PostAdmin(admin.ModelAdmin):
-    list_display = ('text', 'pub_date', 'author', 'group')
-    search_fields = ('text',)
-    list_filter = ('pub_date',)
+
+class ScalableAdmin(admin.ModelAdmin):
+    """Список без полного COUNT(*) и с поиском по FTS-индексу."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if search_term.strip():
+            found = search.search(queryset, search_term)
+            if found is not None:
+                return found, False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class PostAdmin(ScalableAdmin):
+    list_display = ('text', 'pub_date', 'author', 'group', 'is_published')
+    list_select_related = ('author', 'group')
+    # Без date_hierarchy: список лет — DISTINCT по всей таблице, а
+    # фильтр по дате — диапазоны по индексу pub_date.
+    list_filter = ('pub_date', 'is_published')
+    search_fields = ('text',)
+    raw_id_fields = ('author', 'group')
+
+    # Удаление как на сайте: пост сразу скрыт, строки и файлы убирает
+    # posts.purge в фоне (см. users.admin.BackgroundDeleteUserAdmin).
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        purge.delete_post(obj)
+
+    def delete_queryset(self, request, queryset):
+        for post in queryset:
+            purge.delete_post(post)
 
-class GroupAdmin(admin.ModelAdmin):
+
+class GroupAdmin(ScalableAdmin):
     list_display = ('title', 'slug', 'description')
-    empty_value_display = '-пусто-'
+    search_fields = ('title', 'slug')
+
+
+class CommentAdmin(ScalableAdmin):
+    list_display = ('text', 'created', 'author', 'post', 'depth')
+    list_select_related = ('author', 'post')
+    list_filter = ('created',)
+    search_fields = ('text',)
+    raw_id_fields = ('author', 'post', 'parent')
+
+
+class FollowAdmin(ScalableAdmin):
+    list_display = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+    raw_id_fields = ('user', 'author')
+
+
+class GroupFollowAdmin(ScalableAdmin):
+    list_display = ('user', 'group')
+    list_select_related = ('user', 'group')
+    search_fields = ('=user__username', '=group__slug')
+    raw_id_fields = ('user', 'group')
+
+
+class TombstoneAdmin(admin.ModelAdmin):
+    """Ход фоновой очистки удаленного (posts.purge)."""
+    list_display = ('kind', 'object_id', 'label', 'step', 'deleted_rows',
+                    'created', 'purged_at')
+    list_filter = ('kind', 'purged_at')
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
+admin.site.register(GroupFollow, GroupFollowAdmin)
+admin.site.register(Tombstone, TombstoneAdmin)
@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PostsConfig(AppConfig):
     name = 'posts'
+
+    def ready(self):
+        from yatube import checks  # noqa: F401
+
+        from . import signals  # noqa: F401
+        post_migrate.connect(install_search, sender=self)
+
+
+def install_search(sender, using, **kwargs):
+    from . import search
+
+    search.install(using)
@@ -0,0 +1,171 @@
+import datetime as dt
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import timeline
+from .models import ArchivedComment, ArchivedPost, Comment, Post, path_ids
+
+ARCHIVE_VERSION_KEY = 'posts:archive-version'
+POST_FIELDS = ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+               'image_variants', 'reaction_counts')
+COMMENT_FIELDS = ('id', 'post_id', 'author_id', 'parent_id', 'text',
+                  'created', 'path', 'depth', 'reply_count', 'deleted_at')
+
+_local = threading.local()
+
+
+@contextmanager
+def moving():
+    """Удаление постов внутри — перенос, а не удаление: сигналы не
+    освобождают картинку и не уменьшают счетчики групп."""
+    _local.moving = True
+    try:
+        yield
+    finally:
+        _local.moving = False
+
+
+def is_moving():
+    return getattr(_local, 'moving', False)
+
+
+def archive_version():
+    return cache.get_or_set(ARCHIVE_VERSION_KEY, time.time_ns, None)
+
+
+def bump_archive_version():
+    try:
+        cache.incr(ARCHIVE_VERSION_KEY)
+    except ValueError:
+        cache.set(ARCHIVE_VERSION_KEY, time.time_ns(), None)
+
+
+def cutoff():
+    days = getattr(settings, 'POSTS_ARCHIVE_AFTER_DAYS', 90)
+    return timezone.now() - dt.timedelta(days=days)
+
+
+def archive_batch(before, batch_size=500):
+    """Переносит в архив пачку постов старше before вместе с
+    комментариями; возвращает число перенесенных постов.
+
+    Пачка — одна короткая транзакция: блокировка держится на
+    batch_size постов, а не на весь перенос.
+    """
+    with transaction.atomic():
+        rows = list(Post.objects.published().filter(pub_date__lt=before)
+                    .order_by('pub_date', 'id')
+                    .values_list(*POST_FIELDS)[:batch_size])
+        if not rows:
+            return 0
+        ids = [row[0] for row in rows]
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(**dict(zip(POST_FIELDS, row))) for row in rows)
+        ArchivedComment.objects.bulk_create(archived_comments(ids))
+        with moving():
+            Post.objects.filter(id__in=ids).delete()
+    for author_id, group_id in {(row[3], row[4]) for row in rows}:
+        timeline.invalidate(author_id, [group_id])
+    bump_archive_version()
+    return len(rows)
+
+
+def archived_comments(post_ids):
+    """Архивные копии комментариев к постам, родитель раньше ответа
+    (путь родителя — префикс пути ответа).
+
+    Удаленный комментарий без ответов не копируется: строку все равно
+    убрала бы очистка. С ответами он нужен как узел ветки и едет с
+    deleted_at, то есть заглушкой.
+    """
+    rows = [dict(zip(COMMENT_FIELDS, row)) for row in
+            Comment.objects.filter(post_id__in=post_ids)
+            .order_by('post_id', 'path').values_list(*COMMENT_FIELDS)]
+    # reply_count считает всю ветку: выпавший лист вычитается у всех
+    # предков, а не только у родителя.
+    dropped = Counter(ancestor for row in rows
+                      if row['deleted_at'] and not row['reply_count']
+                      for ancestor in path_ids(row['path'])[:-1])
+    return [ArchivedComment(**dict(
+        row, reply_count=row['reply_count'] - dropped[row['id']]))
+        for row in rows if not row['deleted_at'] or row['reply_count']]
+
+
+def archive(before=None, batch_size=500, pause=0, limit=None):
+    before = before or cutoff()
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size,
+                                                    limit - moved)
+        batch = archive_batch(before, size)
+        moved += batch
+        if batch < size:
+            break
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+class HotColdFeed:
+    """Лента, которая за последней горячей страницей продолжается
+    архивом.
+
+    Архив всегда старше горячей таблицы, поэтому срез просто
+    переходит из одной последовательности в другую. Число архивных
+    постов кэшируется по cold_key до следующей пачки переноса: ее
+    версия лежит в общем кэше, а если сброс до процесса не дошел,
+    число живет не дольше POSTS_ARCHIVE_COUNT_TTL.
+    """
+
+    def __init__(self, hot, cold, hot_count=None, cold_count=None,
+                 cold_key=None):
+        self.hot = hot
+        self.cold = cold
+        if hot_count is not None:
+            self.hot_count = hot_count
+        if cold_count is not None:
+            self.cold_count = cold_count
+        self.cold_key = cold_key
+
+    @cached_property
+    def hot_count(self):
+        return self.hot.count()
+
+    @cached_property
+    def cold_count(self):
+        if self.cold_key is None:
+            return self.cold.count()
+        key = f'posts:archive-count:{self.cold_key}:{archive_version()}'
+        return cache.get_or_set(key, self.cold.count,
+                                getattr(settings, 'POSTS_ARCHIVE_COUNT_TTL',
+                                        60))
+
+    def count(self):
+        return self.hot_count + self.cold_count
+
+    def __len__(self):
+        return self.count()
+
+    def first(self):
+        items = self[0:1]
+        return items[0] if items else None
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        items = []
+        if start < self.hot_count:
+            items += list(self.hot[start:min(stop, self.hot_count)])
+        if stop > self.hot_count:
+            items += list(self.cold[max(start - self.hot_count, 0):
+                                    stop - self.hot_count])
+        return items
@@ -0,0 +1,6 @@
+from . import streams
+
+
+def live_updates(request):
+    """Показывать ли плашку о новых записях (см. streams.live_updates)."""
+    return {'live_updates': streams.live_updates(request)}
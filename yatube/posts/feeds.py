@@ -0,0 +1,16 @@
+from django.core.cache import cache
+
+FEED_VERSION_KEY = 'posts:feed-version'
+
+
+def feed_version():
+    """Версия лент: входит в ключи их кэша, так что смена версии
+    разом сбрасывает закэшированные страницы."""
+    return cache.get_or_set(FEED_VERSION_KEY, 1, None)
+
+
+def bump_feed_version():
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        cache.set(FEED_VERSION_KEY, 2, None)
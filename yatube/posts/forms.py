@@ -1,4 +1,6 @@
+from django import forms
 from django.forms import ModelForm
+from django.utils import timezone
 
 from .models import Comment, Post
 
@@ -15,3 +17,20 @@ class CommentForm(ModelForm):
         model = Comment
         fields = ['text']
         labels = {'text': 'Текст комментария'}
+
+
+class SchedulePostForm(forms.Form):
+    publish_at = forms.DateTimeField(
+        required=False,
+        label='Опубликовать в',
+        help_text='Оставьте пустым, чтобы опубликовать сразу',
+        input_formats=['%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M'],
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local'},
+                                   format='%Y-%m-%dT%H:%M'),
+    )
+
+    def clean_publish_at(self):
+        publish_at = self.cleaned_data['publish_at']
+        if publish_at and publish_at <= timezone.now():
+            raise forms.ValidationError('Время публикации уже прошло')
+        return publish_at
@@ -0,0 +1,113 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Count, DateTimeField, F, Max, OuterRef,
+                              Subquery, Value)
+from django.db.models.functions import Coalesce, Greatest
+from django.http import Http404
+
+from .models import Group, GroupSummary, Post
+
+
+def posts_added(group_id, pub_date, count=1):
+    """Учитывает опубликованные в группе посты в ее сводке."""
+    when = Value(pub_date, output_field=DateTimeField())
+    updated = GroupSummary.objects.filter(group_id=group_id).update(
+        post_count=F('post_count') + count,
+        last_post_at=Greatest(Coalesce('last_post_at', when), when))
+    if not updated:
+        rebuild_summary(group_id)
+
+
+def post_removed(group_id, pub_date, count=1):
+    summaries = GroupSummary.objects.filter(group_id=group_id)
+    summaries.update(post_count=F('post_count') - count)
+    # Дату последнего поста пересчитываем, только если ушел он сам.
+    latest = (Post.objects.published().filter(group_id=OuterRef('group_id'))
+              .order_by('-pub_date').values('pub_date')[:1])
+    summaries.filter(last_post_at__lte=pub_date).update(
+        last_post_at=Subquery(latest))
+
+
+def rebuild_summary(group_id):
+    if not Group.objects.filter(id=group_id).exists():
+        return
+    totals = Post.objects.published().filter(group_id=group_id).aggregate(
+        post_count=Count('id'), last_post_at=Max('pub_date'))
+    GroupSummary.objects.update_or_create(group_id=group_id,
+                                          defaults=totals)
+
+
+def directory():
+    """Каталог групп: свежие сверху, без подсчета постов."""
+    return (GroupSummary.objects.select_related('group')
+            .order_by(F('last_post_at').desc(nulls_last=True),
+                      'group__title'))
+
+
+class GroupCache:
+    """Группы по slug в памяти процесса.
+
+    Группы меняются редко, поэтому процесс держит их у себя и не чаще
+    раза в POSTS_GROUPS_REFRESH секунд сверяет версию таблицы — число
+    групп и время последнего изменения — одним запросом к БД. Правка в
+    другом процессе доходит сюда не позже этого срока, а в своем
+    процессе копии сбрасываются сразу.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.checked = None
+        self.groups = {}
+        self.lock = threading.Lock()
+
+    def clear(self):
+        with self.lock:
+            self.version, self.checked, self.groups = None, None, {}
+
+    def current_version(self):
+        now = time.monotonic()
+        refresh = getattr(settings, 'POSTS_GROUPS_REFRESH', 5)
+        with self.lock:
+            if self.checked is not None and now - self.checked < refresh:
+                return self.version
+        totals = Group.objects.aggregate(count=Count('id'),
+                                         updated=Max('updated'))
+        with self.lock:
+            self.checked = now
+        return totals['count'], totals['updated']
+
+    def get(self, slug):
+        # Версия читается до строк: правка между ними сменит версию,
+        # и устаревшая копия уйдет при следующей сверке.
+        version = self.current_version()
+        with self.lock:
+            if version != self.version:
+                self.version, self.groups = version, {}
+            group = self.groups.get(slug)
+        if group is None:
+            group = Group.objects.filter(slug=slug).first()
+            if group is not None:
+                with self.lock:
+                    if self.version == version:
+                        self.groups[slug] = group
+        return group
+
+
+group_cache = GroupCache()
+
+
+def get_group_or_404(slug):
+    group = group_cache.get(slug)
+    if group is None:
+        raise Http404('Группа не найдена')
+    return group
+
+
+def invalidate_groups():
+    # Второй раз — после коммита: иначе другой поток мог успеть
+    # закэшировать старую строку.
+    group_cache.clear()
+    transaction.on_commit(group_cache.clear)
@@ -0,0 +1,66 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+VARIANT_WIDTHS = (320, 640, 960)
+# Пропорции карточки поста, как у прежней миниатюры 960x339.
+ASPECT = 339 / 960
+FORMATS = (
+    ('webp', 'image/webp', {'quality': 80, 'method': 4}),
+    ('jpeg', 'image/jpeg', {'quality': 82, 'progressive': True,
+                            'optimize': True}),
+)
+VARIANTS_DIR = 'posts/variants/'
+
+
+def variant_name(stem, width, extension):
+    return f'{VARIANTS_DIR}{stem}-{width}w.{extension}'
+
+
+def variant_names(image_name):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return [variant_name(stem, width, extension)
+            for width in VARIANT_WIDTHS
+            for extension, _, _ in FORMATS]
+
+
+def build_variants(image_name, storage=default_storage):
+    """Нарезает изображение поста на несколько ширин и форматов.
+
+    Возвращает манифест вида::
+
+        {'source': 'posts/x.jpg',
+         'width': 960, 'height': 339,
+         'sources': {'image/webp': [{'name': ..., 'width': 320}, ...],
+                     'image/jpeg': [...]}}
+    """
+    with storage.open(image_name, 'rb') as f:
+        original = Image.open(f)
+        original.load()
+    original = ImageOps.exif_transpose(original).convert('RGB')
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+
+    manifest = {'source': image_name, 'sources': {}}
+    for width in VARIANT_WIDTHS:
+        height = round(width * ASPECT)
+        resized = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        for extension, mime, options in FORMATS:
+            name = variant_name(stem, width, extension)
+            # Имя исходника — хеш содержимого, так что готовые варианты
+            # совпадающей картинки можно переиспользовать.
+            if not storage.exists(name):
+                buffer = BytesIO()
+                resized.save(buffer, extension.upper(), **options)
+                name = storage.save(name, ContentFile(buffer.getvalue()))
+            manifest['sources'].setdefault(mime, []).append(
+                {'name': name, 'width': width})
+        manifest['width'], manifest['height'] = width, height
+    return manifest
+
+
+def delete_variants(image_name, storage=default_storage):
+    for name in variant_names(image_name):
+        storage.delete(name)
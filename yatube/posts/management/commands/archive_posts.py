@@ -0,0 +1,31 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts import archive
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые посты с комментариями в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Возраст поста, после которого он '
+                                 'уходит в архив (POSTS_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Постов в одной транзакции')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Пауза между пачками, секунд')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Перенести не больше стольких постов')
+
+    def handle(self, *args, **options):
+        before = None
+        if options['days'] is not None:
+            before = timezone.now() - dt.timedelta(days=options['days'])
+        moved = archive.archive(before=before,
+                                batch_size=options['batch_size'],
+                                pause=options['pause'],
+                                limit=options['limit'])
+        self.stdout.write(f'Перенесено в архив постов: {moved}')
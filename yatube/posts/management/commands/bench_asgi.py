@@ -0,0 +1,126 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.test import RequestFactory
+
+from yatube.handlers import AsgiHandler
+
+
+def wsgi_request(app, path, delay):
+    """Запрос так, как его обслуживает поток WSGI-сервера: поток занят,
+    пока медленный клиент присылает запрос и забирает ответ."""
+    time.sleep(delay / 2)
+    environ = RequestFactory().get(path).environ
+    result = app(environ, lambda status, headers, exc_info=None: None)
+    try:
+        for chunk in result:
+            if chunk:
+                time.sleep(delay / 2)
+    finally:
+        result.close()
+
+
+async def asgi_request(app, path, delay):
+    path, _, query = path.partition('?')
+    scope = {'type': 'http', 'method': 'GET', 'path': path,
+             'query_string': query.encode(), 'server': ('testserver', 80),
+             'headers': [(b'host', b'testserver')]}
+    received = False
+
+    async def receive():
+        nonlocal received
+        if received:
+            await asyncio.Event().wait()
+        received = True
+        await asyncio.sleep(delay / 2)
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        if message.get('body'):
+            await asyncio.sleep(delay / 2)
+
+    await app(scope, receive, send)
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+    return (f'p50 {percentile(0.5) * 1000:.0f} мс, '
+            f'p95 {percentile(0.95) * 1000:.0f} мс, '
+            f'max {latencies[-1] * 1000:.0f} мс')
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает WSGI и yatube.asgi под нагрузкой медленных '
+            'клиентов: задержка быстрых запросов при занятом пуле')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4,
+                            help='Потоков у сервера в обоих режимах')
+        parser.add_argument('--slow', type=int, default=16,
+                            help='Число медленных клиентов')
+        parser.add_argument('--fast', type=int, default=50,
+                            help='Число быстрых запросов')
+        parser.add_argument('--delay', type=float, default=1.0,
+                            help='Сколько секунд медленный клиент тратит '
+                                 'на запрос и ответ')
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--slow-path', default=None,
+                            help='Адрес медленных клиентов, например '
+                                 'поток /group/<slug>/stream/')
+
+    def handle(self, *args, **options):
+        app = get_wsgi_application()
+        for name, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+            started = time.monotonic()
+            latencies = run(app, options)
+            self.stdout.write(
+                f'{name}: {options["fast"]} быстрых запросов — '
+                f'{summary(latencies)}; всего '
+                f'{time.monotonic() - started:.2f} с')
+
+    def run_wsgi(self, app, options):
+        slow_path = options['slow_path'] or options['path']
+        latencies = []
+
+        def fast(submitted):
+            wsgi_request(app, options['path'], 0)
+            latencies.append(time.monotonic() - submitted)
+
+        with ThreadPoolExecutor(options['threads']) as pool:
+            for _ in range(options['slow']):
+                pool.submit(wsgi_request, app, slow_path, options['delay'])
+            futures = [pool.submit(fast, time.monotonic())
+                       for _ in range(options['fast'])]
+            for future in futures:
+                future.result()
+        return latencies
+
+    def run_asgi(self, app, options):
+        slow_path = options['slow_path'] or options['path']
+        handler = AsgiHandler(app, max_workers=options['threads'])
+        latencies = []
+
+        async def fast():
+            started = time.monotonic()
+            await asgi_request(handler, options['path'], 0)
+            latencies.append(time.monotonic() - started)
+
+        async def main():
+            slow = [asyncio.ensure_future(asgi_request(
+                handler, slow_path, options['delay']))
+                for _ in range(options['slow'])]
+            await asyncio.gather(*(fast() for _ in range(options['fast'])))
+            await asyncio.gather(*slow)
+
+        try:
+            asyncio.run(main())
+        finally:
+            handler.executor.shutdown()
+        return latencies
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import purge
+
+
+class Command(BaseCommand):
+    help = 'Удаляет пачками строки и файлы удаленных постов и пользователей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Строк этапа в одной транзакции '
+                                 '(PURGE_BATCH_SIZE)')
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Пауза между пачками, секунд')
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Выполнить не больше стольких пачек')
+
+    def handle(self, *args, **options):
+        batches = 0
+        while options['limit'] is None or batches < options['limit']:
+            tombstone = purge.purge_batch(options['batch_size'])
+            if tombstone is None:
+                break
+            batches += 1
+            state = ('очищен' if tombstone.purged_at
+                     else f'этап {tombstone.step}')
+            self.stdout.write(f'{tombstone}: {state}, удалено строк '
+                              f'{tombstone.deleted_rows}')
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f'Выполнено пачек: {batches}')
@@ -0,0 +1,34 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from posts.scheduler import PublishScheduler
+
+
+class Command(BaseCommand):
+    help = 'Публикует отложенные посты, когда наступает их срок'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon', type=int, default=None,
+                            help='На сколько секунд вперед держать '
+                                 'сроки в памяти')
+        parser.add_argument('--refresh', type=int, default=None,
+                            help='Как часто подгружать новые сроки')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--once', action='store_true',
+                            help='Выпустить просроченные посты и выйти')
+
+    def handle(self, *args, **options):
+        scheduler = PublishScheduler(horizon=options['horizon'],
+                                     refresh=options['refresh'],
+                                     batch_size=options['batch_size'])
+        if options['once']:
+            released = scheduler.run_once()
+            self.stdout.write(f'Опубликовано постов: {released}')
+            return
+        stopping = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+            signal.signal(signal.SIGINT, lambda *args: stopping.set())
+        scheduler.run_forever(stopping)
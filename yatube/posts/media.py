@@ -0,0 +1,209 @@
+import hashlib
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified)
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .images import VARIANTS_DIR
+from .models import ArchivedPost, Post
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+VARIANT_RE = re.compile(rf'^{re.escape(VARIANTS_DIR)}(.+)-\d+w\.\w+$')
+PUBLIC = 'public'
+PRIVATE = 'private'
+
+
+class RangeFile:
+    """Кусок файла для ответа 206.
+
+    Сохраняет fileno(), чтобы wsgi.file_wrapper сервера (например,
+    gunicorn) отправил байты через os.sendfile с текущей позиции.
+    """
+
+    def __init__(self, f, start, length):
+        self.file = f
+        self.remaining = length
+        f.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def seek(self, *args):
+        return self.file.seek(*args)
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(path, stat):
+    """ETag по sha256 содержимого; считается один раз на версию файла."""
+    key = f'media-etag:{path}:{stat.st_mtime_ns}:{stat.st_size}'
+    etag = cache.get(key)
+    if etag is None:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+        etag = f'"{digest.hexdigest()[:32]}"'
+        cache.set(key, etag, None)
+    return etag
+
+
+def image_sources(path):
+    """Условие на Post.image для оригинала или его варианта."""
+    match = VARIANT_RE.match(path)
+    if match is None:
+        return Q(image=path)
+    # Вариант назван по имени оригинала без расширения: оригинал
+    # лежит в posts/<2 знака хеша>/ или, до учета ссылок, в posts/.
+    stem = match.group(1)
+    return (Q(image__startswith=f'posts/{stem[:2]}/{stem}.')
+            | Q(image__startswith=f'posts/{stem}.'))
+
+
+def can_access(request, path):
+    """PUBLIC, PRIVATE (только автору, без общих кэшей) или None.
+
+    Картинка опубликованного или архивного поста видна всем, картинка
+    отложенного — только его автору. Миниатюры sorl названы по хешу
+    и к посту не сводятся; их адреса выводятся только в страницах,
+    уже прошедших проверку.
+    """
+    if path.startswith('cache/'):
+        return PUBLIC
+    sources = image_sources(path)
+    if (Post.objects.published().filter(sources).exists()
+            or ArchivedPost.objects.published().filter(sources).exists()):
+        return PUBLIC
+    user = request.user
+    if (user.is_authenticated
+            and Post.objects.alive().filter(sources, author=user).exists()):
+        return PRIVATE
+    return None
+
+
+def parse_range(header, size):
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if start == '':
+        length = min(int(end), size)
+        if not length:
+            raise ValueError('Unsatisfiable range')
+        return size - length, size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        raise ValueError('Unsatisfiable range')
+    return start, end
+
+
+def etag_matches(header, etag):
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag in (etag, '*'):
+            return True
+    return False
+
+
+def handoff(response, name):
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+    if mode == 'x-accel':
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + name)
+    else:
+        response['X-Sendfile'] = safe_join(settings.MEDIA_ROOT, name)
+    return response
+
+
+def serve_media(request, path):
+    """Отдает файл из MEDIA_ROOT после проверки доступа.
+
+    В режимах ``x-accel``/``x-sendfile`` сами байты отдает веб-сервер,
+    в режиме ``django`` они уходят через wsgi.file_wrapper.
+    """
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+        stat = os.stat(full_path)
+    except (ValueError, OSError):
+        raise Http404
+    access = (can_access(request, path) if os.path.isfile(full_path)
+              else None)
+    if access is None:
+        raise Http404
+
+    etag = file_etag(full_path, stat)
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    not_modified = (
+        etag_matches(if_none_match, etag) if if_none_match
+        else not was_modified_since(
+            request.META.get('HTTP_IF_MODIFIED_SINCE'),
+            stat.st_mtime, stat.st_size))
+    content_type = (mimetypes.guess_type(full_path)[0]
+                    or 'application/octet-stream')
+
+    if not_modified:
+        response = HttpResponseNotModified()
+    elif getattr(settings, 'MEDIA_SERVE_MODE', 'django') != 'django':
+        response = handoff(HttpResponse(content_type=content_type), path)
+    else:
+        response = file_response(request, full_path, stat, etag,
+                                 content_type)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Accept-Ranges'] = 'bytes'
+    if access == PUBLIC:
+        response['Cache-Control'] = 'public, max-age=86400'
+    else:
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ['Cookie'])
+    return response
+
+
+def file_response(request, full_path, stat, etag, content_type):
+    size = stat.st_size
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (not if_range or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    f = open(full_path, 'rb')
+    if byte_range is None:
+        return FileResponse(f, content_type=content_type)
+    start, end = byte_range
+    length = end - start + 1
+    response = FileResponse(RangeFile(f, start, length),
+                            content_type=content_type, status=206)
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
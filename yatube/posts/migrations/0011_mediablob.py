@@ -0,0 +1,39 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:44
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Имя файла')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='sha256')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Размер')),
+                ('phash', models.BigIntegerField(blank=True, null=True, verbose_name='Перцептивный хеш')),
+                ('phash_band0', models.PositiveIntegerField(db_index=True, null=True)),
+                ('phash_band1', models.PositiveIntegerField(db_index=True, null=True)),
+                ('phash_band2', models.PositiveIntegerField(db_index=True, null=True)),
+                ('phash_band3', models.PositiveIntegerField(db_index=True, null=True)),
+                ('refcount', models.IntegerField(default=0, verbose_name='Число ссылок')),
+                ('released_at', models.DateTimeField(blank=True, null=True, verbose_name='Без ссылок с')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/'),
+        ),
+        migrations.AddIndex(
+            model_name='mediablob',
+            index=models.Index(fields=['refcount', 'released_at'], name='posts_media_refcoun_9166c3_idx'),
+        ),
+    ]
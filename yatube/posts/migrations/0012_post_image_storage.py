@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:46
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_mediablob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, null=True, storage=posts.storage.PostImageStorage(), upload_to='posts/'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 2.2.28 on 2026-10-19 08:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Копия posts.models на момент миграции: модель может измениться.
+PATH_STEP = 8
+PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BATCH_SIZE = 1000
+
+
+def path_segment(pk):
+    digits = ''
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits = PATH_DIGITS[digit] + digits
+    return digits.rjust(PATH_STEP, '0')
+
+
+def fill_paths(apps, schema_editor):
+    # Существующие комментарии становятся корнями веток.
+    Comment = apps.get_model('posts', 'Comment')
+    last = 0
+    while True:
+        batch = list(Comment.objects.filter(pk__gt=last)
+                     .order_by('pk').only('pk')[:BATCH_SIZE])
+        if not batch:
+            return
+        for comment in batch:
+            comment.path = path_segment(comment.pk)
+        Comment.objects.bulk_update(batch, ['path'])
+        last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Глубина'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment', verbose_name='Ответ на'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=248, verbose_name='Путь в дереве'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='reply_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Ответов в ветке'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='posts_comme_post_id_abd11d_idx'),
+        ),
+        migrations.RunPython(fill_paths, migrations.RunPython.noop),
+    ]
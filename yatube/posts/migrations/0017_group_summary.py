@@ -0,0 +1,41 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_summaries(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    GroupSummary = apps.get_model('posts', 'GroupSummary')
+    groups = Group.objects.annotate(
+        post_count=models.Count(
+            'posts', filter=models.Q(posts__is_published=True)),
+        last_post_at=models.Max(
+            'posts__pub_date', filter=models.Q(posts__is_published=True)))
+    GroupSummary.objects.bulk_create(
+        GroupSummary(group_id=group.id, post_count=group.post_count,
+                     last_post_at=group.last_post_at)
+        for group in groups.iterator())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_admin_date_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GroupSummary',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='posts.Group', verbose_name='Группа')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('last_post_at', models.DateTimeField(blank=True, null=True, verbose_name='Последний пост')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='groupsummary',
+            index=models.Index(fields=['-last_post_at'], name='posts_group_last_po_4f2c93_idx'),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'пользователь'), ('post', 'пост')], max_length=8, verbose_name='Что удаляется')),
+                ('object_id', models.PositiveIntegerField(verbose_name='id')),
+                ('label', models.CharField(blank=True, max_length=150, verbose_name='Описание')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Удален')),
+                ('step', models.CharField(blank=True, max_length=32, verbose_name='Этап')),
+                ('deleted_rows', models.PositiveIntegerField(default=0, verbose_name='Удалено строк')),
+                ('purged_at', models.DateTimeField(blank=True, null=True, verbose_name='Очищен')),
+            ],
+            options={
+                'ordering': ['created'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='post',
+            name='posts_post_is_publ_a74d82_idx',
+        ),
+        migrations.AddField(
+            model_name='archivedcomment',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedpost',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Удален'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Удален'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Удален'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['is_published', 'deleted_at', '-pub_date'], name='posts_post_is_publ_110474_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['purged_at', 'created'], name='posts_tombs_purged__1fd2d9_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+
+# Копия posts.models на момент миграции: модель может измениться.
+PATH_STEP = 8
+PATH_MAX = 36 ** PATH_STEP - 1
+PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+BATCH_SIZE = 1000
+
+
+def path_segment(pk):
+    digits = ''
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits = PATH_DIGITS[digit] + digits
+    return digits.rjust(PATH_STEP, '0')
+
+
+def invert_roots(apps, schema_editor):
+    # Корень ветки теперь хранится дополнением id, см. root_segment.
+    for name in ('Comment', 'ArchivedComment'):
+        model = apps.get_model('posts', name)
+        last = 0
+        while True:
+            batch = list(model.objects.filter(pk__gt=last)
+                         .order_by('pk').only('pk', 'path')[:BATCH_SIZE])
+            if not batch:
+                break
+            for row in batch:
+                root = PATH_MAX - int(row.path[:PATH_STEP], 36)
+                row.path = path_segment(root) + row.path[PATH_STEP:]
+            model.objects.bulk_update(batch, ['path'])
+            last = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_tombstones'),
+    ]
+
+    operations = [
+        migrations.RunPython(invert_roots, invert_roots),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_group_updated'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='postrevision',
+            name='post',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='revisions', to='posts.Post', verbose_name='Пост'),
+        ),
+        migrations.AlterField(
+            model_name='reaction',
+            name='post',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='reactions', to='posts.Post', verbose_name='Пост'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.28 on 2026-10-19 09:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_post_rows_without_constraint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['kind', 'object_id'], name='posts_tombs_kind_71dbac_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+import hashlib
+from collections import Counter
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def file_digest(storage, name):
+    digest = hashlib.sha256()
+    try:
+        with storage.open(name) as content:
+            for chunk in content.chunks():
+                digest.update(chunk)
+            return digest.hexdigest(), content.size
+    except OSError:
+        return None, 0
+
+
+def backfill(apps, schema_editor):
+    """Заводит MediaBlob для картинок, загруженных до учета ссылок,
+    чтобы их счетчики и сборка мусора работали как у новых."""
+    Post = apps.get_model('posts', 'Post')
+    ArchivedPost = apps.get_model('posts', 'ArchivedPost')
+    MediaBlob = apps.get_model('posts', 'MediaBlob')
+    storage = Post._meta.get_field('image').storage
+
+    refs = Counter()
+    for model in (Post, ArchivedPost):
+        refs.update(model.objects.exclude(image='').exclude(image=None)
+                    .values_list('image', flat=True).iterator())
+    names = sorted(refs)
+    for start in range(0, len(names), BATCH_SIZE):
+        batch = names[start:start + BATCH_SIZE]
+        known = set(MediaBlob.objects.filter(name__in=batch)
+                    .values_list('name', flat=True))
+        blobs = []
+        for name in batch:
+            if name in known:
+                continue
+            digest, size = file_digest(storage, name)
+            if digest is None:
+                continue
+            # Одинаковое содержимое под разными старыми именами: sha256
+            # уникален, так что дубликат учитываем под хешем имени.
+            if (MediaBlob.objects.filter(sha256=digest).exists()
+                    or any(blob.sha256 == digest for blob in blobs)):
+                digest = hashlib.sha256(f'legacy:{name}'.encode()).hexdigest()
+            blobs.append(MediaBlob(name=name, sha256=digest, size=size,
+                                   refcount=refs[name]))
+        MediaBlob.objects.bulk_create(blobs)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_tombstone_object_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
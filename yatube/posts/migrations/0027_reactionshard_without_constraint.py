@@ -0,0 +1,19 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0026_backfill_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reactionshard',
+            name='post',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='posts.Post'),
+        ),
+    ]
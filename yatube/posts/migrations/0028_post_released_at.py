@@ -0,0 +1,26 @@
+# Generated by Django 2.2.28 on 2026-10-19 10:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def fill_released_at(apps, schema_editor):
+    # Уже вышедшие посты вышли в момент публикации.
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(released_at=models.F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_reactionshard_without_constraint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='released_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, editable=False, verbose_name='Вышел в ленту'),
+        ),
+        migrations.RunPython(fill_released_at, migrations.RunPython.noop),
+    ]
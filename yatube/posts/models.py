@@ -1,8 +1,19 @@
+import json
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .storage import PHASH_BANDS, phash_bands, post_image_storage
 
 User = get_user_model()
 
+PATH_STEP = 8
+PATH_MAX = 36 ** PATH_STEP - 1
+PATH_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+COMMENT_MAX_DEPTH = 30
+
 
 class Group(models.Model):
 
@@ -17,6 +28,11 @@ class Group(models.Model):
     description = models.TextField(
         verbose_name='Описание',
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        db_index=True,
+        verbose_name='Изменена',
+    )
 
     class Meta:
         ordering = ['title']
@@ -25,14 +41,70 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class GroupSummary(models.Model):
+    """Опубликованные посты группы: число и время последнего.
+
+    Поддерживается сигналами Post (см. posts.groups), чтобы каталог
+    групп не считал посты на каждый показ.
+    """
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='summary',
+        verbose_name='Группа',
+    )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Постов',
+    )
+    last_post_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Последний пост',
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=['-last_post_at'])]
+
+
+class PostQuerySet(models.QuerySet):
+    def alive(self):
+        """Без постов, удаленных и ждущих posts.purge."""
+        return self.filter(deleted_at__isnull=True)
+
+    def published(self):
+        return self.alive().filter(is_published=True)
+
+
+class PostDisplay:
+    """Общее для Post и ArchivedPost, что нужно шаблонам ленты."""
+    is_archived = False
+
+    @property
+    def variants(self):
+        """Манифест уменьшенных копий изображения, см. posts.images."""
+        if not self.image_variants:
+            return {}
+        return json.loads(self.image_variants)
+
+    @property
+    def reaction_totals(self):
+        """Сведенные счетчики реакций, см. posts.reactions."""
+        if not self.reaction_counts:
+            return {}
+        return json.loads(self.reaction_counts)
+
+
+class Post(PostDisplay, models.Model):
 
     text = models.TextField(
         verbose_name='Текст',
     )
     pub_date = models.DateTimeField(
         verbose_name='Дата публикации',
-        auto_now_add=True
+        auto_now_add=True,
+        db_index=True,
     )
     author = models.ForeignKey(
         User,
@@ -50,17 +122,111 @@ class Post(models.Model):
     )
     image = models.ImageField(
         upload_to='posts/',
+        storage=post_image_storage,
+        blank=True,
+        null=True,
+        db_index=True,
+    )
+    image_variants = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Варианты изображения',
+    )
+    reaction_counts = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Счетчики реакций',
+    )
+    publish_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Опубликовать в',
+    )
+    is_published = models.BooleanField(
+        default=True,
+        editable=False,
+        verbose_name='Опубликован',
+    )
+    # Курсор потоков (posts.streams): id отложенного поста старше
+    # вышедших после него, а момент выхода — нет.
+    released_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        db_index=True,
+        verbose_name='Вышел в ленту',
+    )
+    deleted_at = models.DateTimeField(
         blank=True,
-        null=True
+        null=True,
+        editable=False,
+        verbose_name='Удален',
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            # published(): оба условия — префикс индекса ленты.
+            models.Index(fields=['is_published', 'deleted_at', '-pub_date']),
+            models.Index(fields=['is_published', 'publish_at']),
+            # Ленты источников для posts.timeline.
+            models.Index(fields=['author', '-pub_date']),
+            models.Index(fields=['group', '-pub_date']),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+def path_segment(pk):
+    """id в base36 фиксированной ширины: строки сравниваются как числа."""
+    digits = ''
+    while pk:
+        pk, digit = divmod(pk, 36)
+        digits = PATH_DIGITS[digit] + digits
+    return digits.rjust(PATH_STEP, '0')
+
+
+def root_segment(pk):
+    """Сегмент корня — дополнение id: ветки по возрастанию пути идут
+    от новых корней к старым, а ответы внутри ветки — по порядку."""
+    return path_segment(PATH_MAX - pk)
+
+
+def path_ids(path):
+    """id комментариев пути от корня до последнего."""
+    ids = [int(path[i:i + PATH_STEP], 36)
+           for i in range(0, len(path), PATH_STEP)]
+    if ids:
+        ids[0] = PATH_MAX - ids[0]
+    return ids
+
+
+class CommentQuerySet(models.QuerySet):
+    def thread(self, post, max_depth=None):
+        """Все комментарии поста в порядке дерева одним запросом:
+        новые ветки сверху, ответы под родителем по порядку."""
+        comments = self.filter(post=post).order_by('path')
+        if max_depth is not None:
+            comments = comments.filter(depth__lte=max_depth)
+        return comments
+
+    def subtree(self, comment, max_depth=None):
+        """Комментарий и его ответы: диапазон по индексу (post, path)."""
+        comments = self.filter(
+            post_id=comment.post_id, path__gte=comment.path,
+            path__lte=comment.path.ljust(
+                Comment._meta.get_field('path').max_length, 'z'),
+        ).order_by('path')
+        if max_depth is not None:
+            comments = comments.filter(depth__lte=comment.depth + max_depth)
+        return comments
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post,
@@ -74,16 +240,191 @@ class Comment(models.Model):
         related_name='comments',
         verbose_name='Автор комментария',
     )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='replies',
+        verbose_name='Ответ на',
+    )
+    text = models.TextField(
+        verbose_name='Текст комментария',
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата публикации',
+        auto_now_add=True,
+        db_index=True,
+    )
+    path = models.CharField(
+        max_length=PATH_STEP * (COMMENT_MAX_DEPTH + 1),
+        default='',
+        editable=False,
+        verbose_name='Путь в дереве',
+    )
+    depth = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Глубина',
+    )
+    reply_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Ответов в ветке',
+    )
+    deleted_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        editable=False,
+        verbose_name='Удален',
+    )
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-created']
+        indexes = [models.Index(fields=['post', 'path'])]
+
+    def __str__(self):
+        return self.text[:30]
+
+    @property
+    def ancestor_ids(self):
+        return path_ids(self.path)[:-1]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            return super().save(*args, **kwargs)
+        if self.parent is not None and self.parent.depth >= COMMENT_MAX_DEPTH:
+            # Слишком глубокие ответы продолжают ветку на последнем уровне.
+            self.parent = self.parent.parent
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            prefix = self.parent.path if self.parent else ''
+            self.path = prefix + (path_segment(self.pk) if self.parent
+                                  else root_segment(self.pk))
+            self.depth = self.parent.depth + 1 if self.parent else 0
+            Comment.objects.filter(pk=self.pk).update(path=self.path,
+                                                      depth=self.depth)
+            Comment.objects.filter(pk__in=self.ancestor_ids).update(
+                reply_count=F('reply_count') + 1)
+
+
+class ArchivedPostQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(deleted_at__isnull=True)
+
+
+class ArchivedPost(PostDisplay, models.Model):
+    """Пост, перенесенный posts.archive из горячей таблицы.
+
+    Архив только читается: реакции сведены в reaction_counts, правки,
+    комментарии и реакции к нему не принимаются.
+    """
+    is_archived = True
+    is_published = True
+    publish_at = None
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField(
+        verbose_name='Текст',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_posts',
+        verbose_name='Автор',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='archived_posts',
+        verbose_name='Группа',
+    )
+    image = models.ImageField(
+        upload_to='posts/',
+        storage=post_image_storage,
+        blank=True,
+        null=True,
+    )
+    image_variants = models.TextField(
+        blank=True,
+        default='',
+    )
+    reaction_counts = models.TextField(
+        blank=True,
+        default='',
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Перенесен в архив',
+    )
+    deleted_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Удален',
+    )
+
+    objects = ArchivedPostQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date', '-id']),
+            models.Index(fields=['author', '-pub_date']),
+            models.Index(fields=['group', '-pub_date']),
+        ]
+
+    def __str__(self):
+        return self.text[:15]
+
+
+class ArchivedComment(models.Model):
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        verbose_name='Комментарий к посту',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_comments',
+        verbose_name='Автор комментария',
+    )
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='replies',
+        verbose_name='Ответ на',
+    )
     text = models.TextField(
         verbose_name='Текст комментария',
     )
     created = models.DateTimeField(
         verbose_name='Дата публикации',
-        auto_now_add=True
     )
+    path = models.CharField(
+        max_length=PATH_STEP * (COMMENT_MAX_DEPTH + 1),
+        default='',
+    )
+    depth = models.PositiveSmallIntegerField(default=0)
+    reply_count = models.PositiveIntegerField(default=0)
+    deleted_at = models.DateTimeField(blank=True, null=True)
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created']
+        indexes = [models.Index(fields=['post', 'path'])]
 
     def __str__(self):
         return self.text[:30]
@@ -102,3 +443,228 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='following',
     )
+
+
+class PostRevision(models.Model):
+    """Прежняя версия текста поста (см. posts.revisions).
+
+    Хранится обратной дельтой к следующей версии, а каждая
+    POSTS_REVISION_SNAPSHOT_EVERY-я — целиком; текущий текст — в Post.
+    """
+    # Без ограничения в БД: при переносе в архив пост сохраняет id, и
+    # версии остаются при нем; при удалении их удаляет сигнал.
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='revisions',
+        verbose_name='Пост',
+    )
+    number = models.PositiveIntegerField(
+        verbose_name='Версия',
+    )
+    is_snapshot = models.BooleanField(
+        default=False,
+        verbose_name='Полный текст',
+    )
+    data = models.BinaryField(
+        verbose_name='Сжатая дельта или текст',
+    )
+    replaced_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Заменена',
+    )
+
+    class Meta:
+        ordering = ['post', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'number'],
+                                    name='unique_post_revision'),
+        ]
+
+
+class GroupFollow(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_follows',
+        verbose_name='Подписчик',
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='followers',
+        verbose_name='Группа',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'group'],
+                                    name='unique_group_follow'),
+        ]
+
+
+class MediaBlob(models.Model):
+    """Файл из хранилища по содержимому и число ссылающихся постов."""
+
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Имя файла',
+    )
+    sha256 = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='sha256',
+    )
+    size = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Размер',
+    )
+    phash = models.BigIntegerField(
+        blank=True,
+        null=True,
+        verbose_name='Перцептивный хеш',
+    )
+    phash_band0 = models.PositiveIntegerField(null=True, db_index=True)
+    phash_band1 = models.PositiveIntegerField(null=True, db_index=True)
+    phash_band2 = models.PositiveIntegerField(null=True, db_index=True)
+    phash_band3 = models.PositiveIntegerField(null=True, db_index=True)
+    refcount = models.IntegerField(
+        default=0,
+        verbose_name='Число ссылок',
+    )
+    released_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Без ссылок с',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'released_at']),
+        ]
+
+    def __str__(self):
+        return self.name
+
+    @staticmethod
+    def bands_for(phash):
+        if phash is None:
+            return {f'phash_band{i}': None for i in range(PHASH_BANDS)}
+        return {f'phash_band{i}': band
+                for i, band in enumerate(phash_bands(phash))}
+
+
+REACTION_KINDS = [
+    ('like', '👍'),
+    ('love', '❤️'),
+    ('laugh', '😂'),
+]
+
+
+class Reaction(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='reactions',
+        verbose_name='Пользователь',
+    )
+    # Переживает перенос поста в архив, как и PostRevision.post.
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='reactions',
+        verbose_name='Пост',
+    )
+    kind = models.CharField(
+        max_length=16,
+        choices=REACTION_KINDS,
+        verbose_name='Реакция',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата',
+    )
+
+    class Meta:
+        unique_together = ['user', 'post', 'kind']
+
+
+class ReactionShard(models.Model):
+    """Несведенное приращение счетчика реакции.
+
+    Писатели размазаны по REACTIONS_SHARDS строкам на пост и реакцию,
+    так что лайки популярного поста не ждут друг друга на одной
+    строке; задача posts.tasks.flush_reaction_counts переносит
+    приращения в Post.reaction_counts. Как и реакции, шарды
+    переживают перенос поста в архив и сводятся уже туда.
+    """
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    kind = models.CharField(max_length=16)
+    shard = models.PositiveSmallIntegerField()
+    delta = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['post', 'kind', 'shard']
+
+
+class Tombstone(models.Model):
+    """Удаление, которое posts.purge доводит до конца в фоне.
+
+    Содержимое скрыто сразу, когда строка создается; строки и файлы
+    удаляются пачками, а step и deleted_rows показывают, докуда
+    дошла очистка.
+    """
+    USER = 'user'
+    POST = 'post'
+    KINDS = [
+        (USER, 'пользователь'),
+        (POST, 'пост'),
+    ]
+
+    kind = models.CharField(
+        max_length=8,
+        choices=KINDS,
+        verbose_name='Что удаляется',
+    )
+    object_id = models.PositiveIntegerField(
+        verbose_name='id',
+    )
+    label = models.CharField(
+        max_length=150,
+        blank=True,
+        verbose_name='Описание',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Удален',
+    )
+    step = models.CharField(
+        max_length=32,
+        blank=True,
+        verbose_name='Этап',
+    )
+    deleted_rows = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Удалено строк',
+    )
+    purged_at = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Очищен',
+    )
+
+    class Meta:
+        ordering = ['created']
+        indexes = [models.Index(fields=['purged_at', 'created']),
+                   models.Index(fields=['kind', 'object_id'])]
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.label or self.object_id}'
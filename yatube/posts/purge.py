@@ -0,0 +1,181 @@
+import datetime as dt
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from users.lookup import invalidate_username
+
+from . import archive, feeds, groups, reactions, timeline
+from .models import (ArchivedComment, ArchivedPost, Comment, Follow, Post,
+                     Reaction, Tombstone, User)
+
+PURGE_SCHEDULED_KEY = 'posts:purge-scheduled'
+
+
+def _group_totals(posts):
+    """{group_id: (постов, последняя дата)} для вычета из сводок групп."""
+    return {
+        group_id: (count, last)
+        for group_id, count, last in posts.exclude(group=None).order_by()
+        .values('group_id').annotate(n=Count('id'), last=Max('pub_date'))
+        .values_list('group_id', 'n', 'last')
+    }
+
+
+def _forget(author_id, totals):
+    for group_id, (count, last) in totals.items():
+        groups.post_removed(group_id, last, count)
+    timeline.invalidate(author_id, list(totals))
+    feeds.bump_feed_version()
+
+
+def delete_post(post):
+    """Скрывает пост одним UPDATE и оставляет его строки очистке.
+
+    Возвращает надгробие или None, если пост уже удален.
+    """
+    with transaction.atomic():
+        posts = Post.objects.published().filter(id=post.id)
+        totals = _group_totals(posts)
+        hidden = Post.objects.alive().filter(id=post.id).update(
+            deleted_at=timezone.now())
+        if not hidden:
+            return None
+        _forget(post.author_id, totals)
+        tombstone = Tombstone.objects.create(
+            kind=Tombstone.POST, object_id=post.id, label=str(post))
+    schedule_purge()
+    return tombstone
+
+
+def delete_user(user):
+    """Удаляет пользователя так, что сайт сразу его не показывает.
+
+    Синхронно — только вход и несколько UPDATE по индексу автора:
+    посты и комментарии помечаются deleted_at и пропадают из лент и
+    веток. Сами строки, подписки с обеих сторон, реакции и файлы
+    убирает posts.purge пачками.
+
+    Возвращает надгробие или None, если пользователь уже удален.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Повторное удаление (двойной клик, админка) ждет первое и не
+        # заводит второе надгробие.
+        User.objects.select_for_update().filter(id=user.id).first()
+        if Tombstone.objects.filter(kind=Tombstone.USER,
+                                    object_id=user.id).exists():
+            return None
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        totals = _group_totals(
+            Post.objects.published().filter(author_id=user.id))
+        for group_id, (count, last) in _group_totals(
+                ArchivedPost.objects.published().filter(
+                    author_id=user.id)).items():
+            hot_count, hot_last = totals.get(group_id, (0, last))
+            totals[group_id] = (hot_count + count, max(hot_last, last))
+        for model in (Post, Comment, ArchivedPost, ArchivedComment):
+            model.objects.filter(author_id=user.id, deleted_at=None).update(
+                deleted_at=now)
+        _forget(user.id, totals)
+        tombstone = Tombstone.objects.create(
+            kind=Tombstone.USER, object_id=user.id, label=user.username)
+        # Сводка по имени могла попасть в кэш до надгробия.
+        transaction.on_commit(lambda: invalidate_username(user.username))
+    archive.bump_archive_version()
+    schedule_purge()
+    return tombstone
+
+
+def schedule_purge():
+    """Одна задача очистки на окно PURGE_DELAY."""
+    from .tasks import purge_deleted
+
+    delay = getattr(settings, 'PURGE_DELAY', 5)
+    if cache.add(PURGE_SCHEDULED_KEY, True, delay):
+        transaction.on_commit(lambda: purge_deleted.schedule(
+            dt.timedelta(seconds=delay)))
+
+
+def _steps(tombstone):
+    """Этапы очистки по порядку: сначала листья, последним — сам объект,
+    чтобы каскад при его удалении был пустым."""
+    if tombstone.kind == Tombstone.POST:
+        post_id = tombstone.object_id
+        return [
+            # Ответы раньше родителей: путь ответа длиннее пути родителя.
+            ('comments', Comment.objects.filter(post_id=post_id)
+             .order_by('-path')),
+            ('post', Post.objects.filter(id=post_id)),
+        ]
+    user_id = tombstone.object_id
+    return [
+        ('comments', Comment.objects.filter(author_id=user_id)
+         .order_by('-path')),
+        ('post_comments', Comment.objects.filter(post__author_id=user_id)
+         .order_by('-path')),
+        ('posts', Post.objects.filter(author_id=user_id).order_by('id')),
+        ('archived_comments', ArchivedComment.objects.filter(
+            Q(author_id=user_id) | Q(post__author_id=user_id))
+         .order_by('-path')),
+        ('archived_posts', ArchivedPost.objects.filter(author_id=user_id)
+         .order_by('id')),
+        ('reactions', Reaction.objects.filter(user_id=user_id)
+         .order_by('id')),
+        ('follows', Follow.objects.filter(
+            Q(user_id=user_id) | Q(author_id=user_id)).order_by('id')),
+        ('user', User.objects.filter(id=user_id)),
+    ]
+
+
+def _delete(step, queryset, batch_size):
+    if step == 'reactions':
+        rows = list(queryset.values_list('id', 'post_id',
+                                         'kind')[:batch_size])
+        deleted, _ = Reaction.objects.filter(
+            id__in=[row[0] for row in rows]).delete()
+        for _, post_id, kind in rows:
+            reactions.bump(post_id, kind, -1)
+        if rows:
+            reactions.schedule_flush()
+        return len(rows), deleted
+    ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+    deleted, _ = queryset.model.objects.filter(pk__in=ids).delete()
+    return len(ids), deleted
+
+
+def purge_batch(batch_size=None):
+    """Одна пачка самого старого незавершенного удаления.
+
+    Пачка — одна короткая транзакция на batch_size строк этапа (с их
+    каскадом). Картинки постов освобождаются сигналами, а файлы
+    удаляет collect_media_garbage. Возвращает надгробие, над которым
+    шла работа, или None, если очищать нечего.
+    """
+    batch_size = batch_size or getattr(settings, 'PURGE_BATCH_SIZE', 200)
+    with transaction.atomic():
+        tombstone = (Tombstone.objects.select_for_update(skip_locked=True)
+                     .filter(purged_at=None).first())
+        if tombstone is None:
+            return None
+        steps = _steps(tombstone)
+        names = [name for name, _ in steps]
+        start = names.index(tombstone.step) if tombstone.step in names else 0
+        for step, queryset in steps[start:]:
+            tombstone.step = step
+            found, deleted = _delete(step, queryset, batch_size)
+            tombstone.deleted_rows += deleted
+            if found:
+                break
+        else:
+            tombstone.purged_at = timezone.now()
+        tombstone.save(update_fields=['step', 'deleted_rows', 'purged_at'])
+    return tombstone
+
+
+def pending():
+    return Tombstone.objects.filter(purged_at=None).exists()
@@ -0,0 +1,76 @@
+import datetime as dt
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Reaction, ReactionShard
+from .tasks import flush_reaction_counts
+
+FLUSH_SCHEDULED_KEY = 'posts:reactions:flush-scheduled'
+
+
+def bump(post_id, kind, delta):
+    """Приращение в случайный шард: UPDATE, а при первой реакции INSERT."""
+    shard = random.randrange(getattr(settings, 'REACTIONS_SHARDS', 8))
+    shards = ReactionShard.objects.filter(post_id=post_id, kind=kind,
+                                          shard=shard)
+    if shards.update(delta=F('delta') + delta):
+        return
+    try:
+        with transaction.atomic():
+            ReactionShard.objects.create(post_id=post_id, kind=kind,
+                                         shard=shard, delta=delta)
+    except IntegrityError:
+        shards.update(delta=F('delta') + delta)
+
+
+def schedule_flush():
+    """Одна задача сведения на окно REACTIONS_FLUSH_DELAY, а не на клик."""
+    delay = getattr(settings, 'REACTIONS_FLUSH_DELAY', 5)
+    if cache.add(FLUSH_SCHEDULED_KEY, True, delay):
+        transaction.on_commit(lambda: flush_reaction_counts.schedule(
+            dt.timedelta(seconds=delay)))
+
+
+def toggle(user, post_id, kind):
+    """Ставит или снимает реакцию; возвращает, стоит ли она теперь."""
+    with transaction.atomic():
+        removed, _ = Reaction.objects.filter(
+            user=user, post_id=post_id, kind=kind).delete()
+        if removed:
+            bump(post_id, kind, -1)
+        else:
+            try:
+                with transaction.atomic():
+                    Reaction.objects.create(user=user, post_id=post_id,
+                                            kind=kind)
+            except IntegrityError:
+                # Двойной клик: реакцию уже поставил параллельный запрос.
+                return True
+            bump(post_id, kind, 1)
+    schedule_flush()
+    return not removed
+
+
+def user_reactions(user, posts):
+    """Реакции пользователя на пачку постов одним запросом:
+    {post_id: {kind, ...}}."""
+    found = defaultdict(set)
+    if user.is_authenticated and posts:
+        for post_id, kind in Reaction.objects.filter(
+                user=user, post__in=posts).values_list('post_id', 'kind'):
+            found[post_id].add(kind)
+    return found
+
+
+def attach(user, posts):
+    """Проставляет постам ``my_reactions`` для шаблона post_reactions."""
+    posts = list(posts)
+    found = user_reactions(user, [post.id for post in posts])
+    for post in posts:
+        post.my_reactions = found.get(post.id, set())
+    return posts
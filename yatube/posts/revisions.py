@@ -0,0 +1,97 @@
+import json
+import re
+import zlib
+from difflib import SequenceMatcher
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from .models import PostRevision
+
+TOKENS = re.compile(r'\S+|\s+')
+
+
+def snapshot_every():
+    return getattr(settings, 'POSTS_REVISION_SNAPSHOT_EVERY', 10)
+
+
+def pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode(), 9)
+
+
+def unpack(data):
+    return json.loads(zlib.decompress(bytes(data)).decode())
+
+
+def diff(base, target):
+    """Дельта, превращающая base в target, по словам и пробелам.
+
+    Операции: [n] — взять n слов из base, [-n] — пропустить n,
+    'строка' — вставить.
+    """
+    base, target = TOKENS.findall(base), TOKENS.findall(target)
+    ops = []
+    matcher = SequenceMatcher(None, base, target, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(''.join(target[j1:j2]))
+    return ops
+
+
+def patch(base, ops):
+    tokens, position, result = TOKENS.findall(base), 0, []
+    for op in ops:
+        if isinstance(op, str):
+            result.append(op)
+        elif op > 0:
+            result.extend(tokens[position:position + op])
+            position += op
+        else:
+            position -= op
+    return ''.join(result)
+
+
+def record(post, old_text):
+    """Сохраняет вытесненный правкой текст как новую старую версию.
+
+    Версии хранятся обратными дельтами к следующей, так что записи
+    только добавляются: новая правка не трогает прежние строки.
+    """
+    with transaction.atomic():
+        last = post.revisions.aggregate(last=Max('number'))['last'] or 0
+        number = last + 1
+        is_snapshot = number % snapshot_every() == 0
+        data = pack(old_text if is_snapshot else diff(post.text, old_text))
+        return PostRevision.objects.create(
+            post=post, number=number, is_snapshot=is_snapshot, data=data)
+
+
+def rebuild(post, number):
+    """Текст версии number (версия 1 — исходный текст) или None.
+
+    Цепочка от ближайшего более нового снимка или текущего текста
+    не длиннее POSTS_REVISION_SNAPSHOT_EVERY дельт, поэтому версия
+    собирается за ограниченное число строк независимо от длины
+    истории.
+    """
+    # По post_id, а не post.revisions: пост может быть и архивным.
+    newer = PostRevision.objects.filter(post_id=post.id,
+                                        number__gte=number).order_by('number')
+    rows = []
+    for row in newer.iterator(chunk_size=snapshot_every()):
+        rows.append(row)
+        if row.is_snapshot:
+            break
+    if not rows or rows[0].number != number:
+        return None
+    text = post.text
+    for row in reversed(rows):
+        text = unpack(row.data) if row.is_snapshot else patch(
+            text, unpack(row.data))
+    return text
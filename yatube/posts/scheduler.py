@@ -0,0 +1,113 @@
+import datetime as dt
+import heapq
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from . import groups, timeline
+from .feeds import bump_feed_version
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+
+class PublishScheduler:
+    """Выпускает отложенные посты по мин-куче сроков.
+
+    В куче лежат только посты, срок которых наступает в пределах
+    ``horizon`` секунд: раз в ``refresh`` секунд их подгружает узкий
+    запрос по индексу (is_published, publish_at), а не обход таблицы.
+    Между подгрузками планировщик спит ровно до ближайшего срока.
+    """
+
+    def __init__(self, horizon=None, refresh=None, batch_size=None):
+        self.horizon = horizon or getattr(
+            settings, 'POSTS_SCHEDULER_HORIZON', 600)
+        self.refresh_interval = refresh or getattr(
+            settings, 'POSTS_SCHEDULER_REFRESH', 30)
+        self.batch_size = batch_size or getattr(
+            settings, 'POSTS_SCHEDULER_BATCH_SIZE', 100)
+        self.heap = []
+        self.queued = set()
+        self.next_refresh = 0
+
+    def refresh(self, now):
+        until = now + dt.timedelta(seconds=self.horizon)
+        upcoming = (Post.objects.alive().filter(is_published=False,
+                                                publish_at__lte=until)
+                    .values_list('publish_at', 'id'))
+        for publish_at, post_id in upcoming:
+            if post_id not in self.queued:
+                heapq.heappush(self.heap, (publish_at, post_id))
+                self.queued.add(post_id)
+        self.next_refresh = time.monotonic() + self.refresh_interval
+
+    def pop_due(self, now):
+        due = []
+        while (self.heap and self.heap[0][0] <= now
+               and len(due) < self.batch_size):
+            _, post_id = heapq.heappop(self.heap)
+            self.queued.discard(post_id)
+            due.append(post_id)
+        return due
+
+    def release(self, post_ids, now):
+        """Публикует пачку; перенесенные и удаленные посты пропускает."""
+        due = Post.objects.alive().filter(id__in=post_ids, is_published=False,
+                                          publish_at__lte=now)
+        released = list(due.values_list('id', 'author_id', 'group_id',
+                                        'publish_at'))
+        if not released:
+            return 0
+        # pub_date — момент выхода в ленту, а не создания черновика.
+        Post.objects.filter(id__in=[row[0] for row in released],
+                            is_published=False).update(
+            is_published=True, pub_date=F('publish_at'),
+            released_at=timezone.now())
+        # Подписчиков потоков в этом процессе нет: выпущенные посты
+        # находит опрос FeedHub в каждом веб-процессе.
+        bump_feed_version()
+        by_group = defaultdict(list)
+        for post_id, author_id, group_id, publish_at in released:
+            if group_id:
+                by_group[group_id].append(publish_at)
+            timeline.invalidate(author_id, [group_id])
+        for group_id, dates in by_group.items():
+            groups.posts_added(group_id, max(dates), len(dates))
+        return len(released)
+
+    def run_once(self, now=None):
+        now = now or timezone.now()
+        if time.monotonic() >= self.next_refresh:
+            self.refresh(now)
+        released = 0
+        while True:
+            due = self.pop_due(now)
+            if not due:
+                return released
+            released += self.release(due, now)
+
+    def sleep_time(self):
+        wait = self.next_refresh - time.monotonic()
+        if self.heap:
+            until_due = (self.heap[0][0] - timezone.now()).total_seconds()
+            wait = min(wait, until_due)
+        return max(wait, 0)
+
+    def run_forever(self, stopping):
+        while not stopping.is_set():
+            try:
+                close_old_connections()
+                released = self.run_once()
+                if released:
+                    logger.info('Published %s scheduled posts', released)
+            except Exception:
+                logger.exception('Publish scheduler failed')
+                stopping.wait(self.refresh_interval)
+                continue
+            stopping.wait(self.sleep_time())
@@ -0,0 +1,80 @@
+from django.db import DatabaseError, connections
+
+from .models import Comment, Post
+
+# Модель -> колонка, по которой строится полнотекстовый индекс.
+INDEXED = {Post: 'text', Comment: 'text'}
+
+_available = {}
+
+
+def fts_table(model):
+    return f'{model._meta.db_table}_fts'
+
+
+def install(using='default'):
+    """Заводит FTS5-индексы и триггеры, которые держат их в актуальном виде.
+
+    Вызывается после каждого migrate: SQLite пересоздает таблицу при
+    изменении схемы и теряет ее триггеры — тогда индекс перестраивается.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for model, column in INDEXED.items():
+            table, fts = model._meta.db_table, fts_table(model)
+            cursor.execute(
+                "SELECT COUNT(*) FROM sqlite_master "
+                "WHERE type = 'trigger' AND tbl_name = %s AND name LIKE %s",
+                [table, f'{fts}_a_'])
+            if cursor.fetchone()[0] == 3:
+                continue
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+                    f"{column}, content='{table}', content_rowid='id')")
+            except DatabaseError:
+                # SQLite собран без FTS5: поиск останется на LIKE.
+                return
+            delete = (f"INSERT INTO {fts}({fts}, rowid, {column}) "
+                      f"VALUES ('delete', old.id, old.{column});")
+            insert = (f"INSERT INTO {fts}(rowid, {column}) "
+                      f"VALUES (new.id, new.{column});")
+            for name, event, body in (
+                    ('ai', 'INSERT', insert),
+                    ('ad', 'DELETE', delete),
+                    ('au', f'UPDATE OF {column}', delete + insert)):
+                cursor.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS {fts}_{name} "
+                    f"AFTER {event} ON {table} BEGIN {body} END")
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    _available.pop(using, None)
+
+
+def available(model, using='default'):
+    if using not in _available:
+        connection = connections[using]
+        _available[using] = (
+            set(connection.introspection.table_names())
+            if connection.vendor == 'sqlite' else set())
+    return fts_table(model) in _available[using]
+
+
+def match_expression(search_term):
+    """Слова запроса как префиксы через AND, без синтаксиса FTS5."""
+    words = search_term.split()
+    return ' '.join('"{}"*'.format(word.replace('"', '""'))
+                    for word in words)
+
+
+def search(queryset, search_term):
+    """Сужает queryset по индексу или возвращает None, если его нет."""
+    model = queryset.model
+    if model not in INDEXED or not available(model, queryset.db):
+        return None
+    fts = fts_table(model)
+    return queryset.extra(
+        where=[f'{model._meta.db_table}.id IN '
+               f'(SELECT rowid FROM {fts} WHERE {fts} MATCH %s)'],
+        params=[match_expression(search_term)])
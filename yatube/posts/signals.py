@@ -0,0 +1,160 @@
+from django.db import transaction
+from django.db.models import DEFERRED, F
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import archive, groups, revisions, streams, timeline
+from .models import (ArchivedPost, Comment, Group, GroupSummary, MediaBlob,
+                     Post, PostRevision, Reaction, ReactionShard)
+from .tasks import (MEDIA_GC_GRACE, build_image_variants,
+                    collect_media_garbage)
+
+
+def _image_name(post):
+    # Читаем из __dict__, чтобы не подгружать отложенное поле.
+    if 'image' not in post.__dict__:
+        return None
+    image = post.__dict__['image']
+    return getattr(image, 'name', image) or ''
+
+
+def _release(name):
+    if name:
+        MediaBlob.objects.filter(name=name).update(
+            refcount=F('refcount') - 1, released_at=timezone.now())
+        collect_media_garbage.schedule(MEDIA_GC_GRACE)
+
+
+@receiver(post_init, sender=Post)
+def remember_image(sender, instance, **kwargs):
+    instance._saved_image = _image_name(instance)
+    instance._saved_group = instance.__dict__.get('group_id', DEFERRED)
+    instance._saved_text = instance.__dict__.get('text', DEFERRED)
+
+
+@receiver(post_save, sender=Post)
+def track_image(sender, instance, created, raw=False, **kwargs):
+    # Фикстуры приходят со своими вариантами и счетчиками.
+    if raw:
+        return
+    image = _image_name(instance)
+    previous = '' if created else instance._saved_image
+    if image is None or previous is None or image == previous:
+        return
+    if image:
+        MediaBlob.objects.filter(name=image).update(
+            refcount=F('refcount') + 1, released_at=None)
+    _release(previous)
+    instance._saved_image = image
+    # Варианты нарезаются один раз на смену картинки, а не на каждое
+    # сохранение, пока задача еще не отработала.
+    if image != instance.variants.get('source', ''):
+        build_image_variants.delay(instance.id)
+
+
+@receiver(post_save, sender=Post)
+def keep_revision(sender, instance, created, **kwargs):
+    previous = instance._saved_text
+    instance._saved_text = instance.__dict__.get('text', DEFERRED)
+    if (not created and previous is not DEFERRED
+            and instance._saved_text is not DEFERRED
+            and previous != instance._saved_text):
+        revisions.record(instance, previous)
+
+
+@receiver(post_save, sender=Post)
+def announce_post(sender, instance, created, **kwargs):
+    if created and instance.is_published:
+        channels = streams.post_channels(instance.author_id,
+                                         instance.group_id)
+        stamp = streams.release_stamp(instance.released_at)
+        transaction.on_commit(
+            lambda: streams.hub.publish(instance.id, channels, stamp))
+
+
+@receiver(post_save, sender=Post)
+def drop_feed_sources(sender, instance, created, **kwargs):
+    # Порядок постов в источниках меняют только новый пост и переход
+    # в другую группу; правка текста списки не трогает.
+    group_id = instance.__dict__.get('group_id', DEFERRED)
+    if created:
+        timeline.invalidate(instance.author_id, [group_id])
+    elif DEFERRED not in (group_id, instance._saved_group) and (
+            group_id != instance._saved_group):
+        timeline.invalidate(None, [group_id, instance._saved_group])
+
+
+@receiver(post_save, sender=Post)
+def count_group_post(sender, instance, created, **kwargs):
+    group_id = instance.__dict__.get('group_id', DEFERRED)
+    previous = None if created else instance._saved_group
+    instance._saved_group = group_id
+    if (DEFERRED in (group_id, previous) or group_id == previous
+            or not instance.is_published):
+        return
+    if previous:
+        groups.post_removed(previous, instance.pub_date)
+    if group_id:
+        groups.posts_added(group_id, instance.pub_date)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    if not archive.is_moving():
+        _release(_image_name(instance))
+
+
+@receiver(post_delete, sender=ArchivedPost)
+def release_archived_image(sender, instance, **kwargs):
+    _release(_image_name(instance))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=ArchivedPost)
+def delete_post_rows(sender, instance, **kwargs):
+    # Реакции и версии ссылаются на пост без каскада, чтобы пережить
+    # перенос в архив; удаление поста из любой таблицы уносит их.
+    if sender is Post and archive.is_moving():
+        return
+    Reaction.objects.filter(post_id=instance.id).delete()
+    ReactionShard.objects.filter(post_id=instance.id).delete()
+    PostRevision.objects.filter(post_id=instance.id).delete()
+
+
+@receiver(post_delete, sender=Post)
+def drop_deleted_from_sources(sender, instance, **kwargs):
+    timeline.invalidate(instance.author_id,
+                        [instance.__dict__.get('group_id')])
+
+
+@receiver(post_delete, sender=Post)
+def uncount_group_post(sender, instance, **kwargs):
+    # Архивный пост остается в группе, просто в другой таблице, а
+    # удаленный через posts.purge уже вычтен при удалении.
+    if archive.is_moving() or instance.__dict__.get('deleted_at'):
+        return
+    if instance.__dict__.get('group_id') and instance.is_published:
+        groups.post_removed(instance.group_id, instance.pub_date)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if created:
+        GroupSummary.objects.get_or_create(group=instance)
+    groups.invalidate_groups()
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    groups.invalidate_groups()
+
+
+@receiver(post_delete, sender=Comment)
+def uncount_reply(sender, instance, **kwargs):
+    if archive.is_moving():
+        return
+    # Каскад удаляет ветку целиком, и каждый удаленный ответ вычитает
+    # себя из предков — так счетчики уменьшаются ровно на размер ветки.
+    Comment.objects.filter(pk__in=instance.ancestor_ids).update(
+        reply_count=F('reply_count') - 1)
@@ -0,0 +1,159 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.test.signals import setting_changed
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+from django.utils.module_loading import import_string
+from PIL import Image
+
+from yatube.s3 import S3Storage
+
+PHASH_BANDS = 4
+PHASH_DISTANCE = 3
+
+
+def content_hash(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def perceptual_hash(content):
+    """64-битный dHash: устойчив к пережатию и небольшому ресайзу."""
+    content.seek(0)
+    try:
+        image = Image.open(content)
+        image = image.convert('L').resize((9, 8), Image.LANCZOS)
+    except (OSError, ValueError):
+        return None
+    finally:
+        content.seek(0)
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (left > right)
+    # Храним как знаковое 64-битное, чтобы влезть в BigIntegerField.
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def phash_bands(phash):
+    unsigned = phash & ((1 << 64) - 1)
+    return [(unsigned >> (16 * i)) & 0xFFFF for i in range(PHASH_BANDS)]
+
+
+def hamming(a, b):
+    return bin((a ^ b) & ((1 << 64) - 1)).count('1')
+
+
+class ContentAddressedMixin:
+    """Называет файлы по sha256 содержимого.
+
+    Одинаковые загрузки ложатся в один файл (а значит, делят и миниатюры
+    sorl, и варианты из posts.images). Учет ссылок ведется в
+    ``posts.models.MediaBlob``, удаление — задачей
+    ``posts.tasks.collect_media_garbage``.
+    """
+
+    def save(self, name, content, max_length=None):
+        from .models import MediaBlob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            from django.core.files import File
+            content = File(content, name)
+
+        digest = content_hash(content)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        target = os.path.join(directory, digest[:2], digest + extension)
+
+        blob = MediaBlob.objects.filter(sha256=digest).first()
+        if blob is None and getattr(settings, 'MEDIA_PERCEPTUAL_DEDUP',
+                                    False):
+            blob = self.find_similar(content)
+        if blob is not None and self.exists(blob.name):
+            if blob.refcount <= 0:
+                # Продлеваем отсрочку сборщика мусора.
+                MediaBlob.objects.filter(id=blob.id).update(
+                    released_at=timezone.now())
+            return blob.name
+
+        if not self.exists(target):
+            target = self._save(target, content)
+        phash = perceptual_hash(content)
+        MediaBlob.objects.update_or_create(
+            sha256=digest,
+            defaults={
+                'name': target,
+                'size': content.size,
+                'phash': phash,
+                'released_at': timezone.now(),
+                **MediaBlob.bands_for(phash),
+            })
+        return target
+
+    def find_similar(self, content):
+        from django.db.models import Q
+
+        from .models import MediaBlob
+
+        phash = perceptual_hash(content)
+        if phash is None:
+            return None
+        query = Q()
+        for field, band in MediaBlob.bands_for(phash).items():
+            query |= Q(**{field: band})
+        for blob in MediaBlob.objects.filter(query):
+            if hamming(blob.phash, phash) <= PHASH_DISTANCE:
+                return blob
+        return None
+
+
+@deconstructible
+class ContentAddressedStorage(ContentAddressedMixin, FileSystemStorage):
+    pass
+
+
+@deconstructible
+class S3ContentAddressedStorage(ContentAddressedMixin, S3Storage):
+    pass
+
+
+@deconstructible
+class PostImageStorage:
+    """Хранилище картинок постов, выбираемое настройкой
+    POSTS_IMAGE_STORAGE; в миграциях всегда выглядит одинаково."""
+
+    def __init__(self):
+        self._backend = None
+        setting_changed.connect(self._reset)
+
+    def _reset(self, setting, **kwargs):
+        if setting == 'POSTS_IMAGE_STORAGE':
+            self._backend = None
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = import_string(getattr(
+                settings, 'POSTS_IMAGE_STORAGE',
+                'posts.storage.ContentAddressedStorage'))()
+        return self._backend
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.backend, name)
+
+
+post_image_storage = PostImageStorage()
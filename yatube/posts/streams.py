@@ -0,0 +1,351 @@
+import asyncio
+import datetime as dt
+import json
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+HISTORY = 1000
+EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+MICROSECOND = dt.timedelta(microseconds=1)
+
+
+def release_stamp(moment):
+    """Post.released_at в микросекундах: курсор и id событий потока."""
+    return (moment - EPOCH) // MICROSECOND
+
+
+def stamp_moment(stamp):
+    return EPOCH + stamp * MICROSECOND
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+def group_channel(group_id):
+    return f'group:{group_id}'
+
+
+def post_channels(author_id, group_id):
+    channels = [author_channel(author_id)]
+    if group_id:
+        channels.append(group_channel(group_id))
+    return channels
+
+
+class FeedHub:
+    """Раздача событий о новых постах подписчикам SSE и long-poll.
+
+    Событие — момент выхода поста (release_stamp), его id и каналы
+    (автор, группа). Курсор подписчика — момент, а не id: отложенный
+    пост выходит со старым id. Ожидающие подписчики спят на одном
+    Condition, так что простаивающее соединение ничего не стоит, а
+    новый пост будит их один раз. Посты из других процессов находит
+    фоновый поток, делающий один запрос за интервал на весь процесс,
+    а не на соединение.
+    """
+
+    def __init__(self, history=HISTORY):
+        self.condition = threading.Condition()
+        self.events = deque(maxlen=history)
+        self.recent = OrderedDict()
+        self.latest = 0
+        self.connections = Counter()
+        self.poller = None
+        self.async_waiters = set()
+
+    def publish(self, post_id, channels, stamp=None):
+        """Добавляет событие; возвращает его момент или None, если
+        пост уже публиковался.
+
+        Момент не меньше уже выданных: пост, чья транзакция закрылась
+        позже соседней, все равно попадет после курсоров подписчиков.
+        """
+        if stamp is None:
+            stamp = release_stamp(timezone.now())
+        with self.condition:
+            if post_id in self.recent:
+                return None
+            self.recent[post_id] = True
+            if len(self.recent) > self.events.maxlen:
+                self.recent.popitem(last=False)
+            stamp = max(stamp, self.latest + 1)
+            self.events.append((stamp, post_id, frozenset(channels)))
+            self.latest = stamp
+            self.condition.notify_all()
+            waiters = list(self.async_waiters)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+        return stamp
+
+    def collect(self, channels, after):
+        return [(stamp, post_id)
+                for stamp, post_id, post_channels in self.events
+                if stamp > after and not channels.isdisjoint(post_channels)]
+
+    def wait(self, channels, after, timeout):
+        """Ждет новых постов в каналах; возвращает пары (момент, id)."""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                found = self.collect(channels, after)
+                remaining = deadline - time.monotonic()
+                if found or remaining <= 0:
+                    return found
+                self.condition.wait(remaining)
+
+    async def wait_async(self, channels, after, timeout):
+        """То же, что wait(), но без потока: корутина спит на
+        asyncio.Event, который publish() взводит из любого потока."""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self.condition:
+            found = self.collect(channels, after)
+            if found:
+                return found
+            self.async_waiters.add(waiter)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), remaining)
+                except asyncio.TimeoutError:
+                    return []
+                waiter[1].clear()
+                with self.condition:
+                    found = self.collect(channels, after)
+                if found:
+                    return found
+        finally:
+            with self.condition:
+                self.async_waiters.discard(waiter)
+
+    def connect(self, feed):
+        with self.condition:
+            self.connections[feed] += 1
+        self.ensure_poller()
+
+    def disconnect(self, feed):
+        with self.condition:
+            self.connections[feed] -= 1
+            if not self.connections[feed]:
+                del self.connections[feed]
+
+    def stats(self):
+        with self.condition:
+            by_feed = dict(self.connections)
+        return {'connections': sum(by_feed.values()), 'by_feed': by_feed,
+                'latest': self.latest}
+
+    def ensure_poller(self):
+        interval = getattr(settings, 'STREAMS_POLL_INTERVAL', 1.0)
+        if not interval:
+            return
+        with self.condition:
+            if self.poller is not None and self.poller.is_alive():
+                return
+            self.poller = threading.Thread(
+                target=self.poll_forever, args=(interval,),
+                name='feed-hub-poller', daemon=True)
+            self.poller.start()
+
+    def poll_forever(self, interval):
+        cursor = None
+        while True:
+            try:
+                close_old_connections()
+                cursor = self.poll(cursor)
+            except Exception:
+                logger.exception('Feed hub poll failed')
+            time.sleep(interval)
+
+    def poll(self, cursor=None):
+        """Публикует посты, вышедшие после ``cursor``, и возвращает
+        новый курсор — последний увиденный released_at.
+
+        Отложенные посты выпускает run_scheduler в своем процессе, и
+        released_at им ставится в момент выхода, как бы давно ни прошел
+        publish_at. Опрос захватывает STREAMS_RELEASE_OVERLAP секунд до
+        курсора: пост, чья транзакция закрылась позже более нового,
+        не теряется, а повтор отсекает publish().
+        """
+        from .models import Post
+
+        if cursor is None:
+            return timezone.now()
+        overlap = dt.timedelta(
+            seconds=getattr(settings, 'STREAMS_RELEASE_OVERLAP', 5))
+        new = (Post.objects.published()
+               .filter(released_at__gt=cursor - overlap)
+               .order_by('released_at')
+               .values_list('id', 'author_id', 'group_id', 'released_at'))
+        for post_id, author_id, group_id, released_at in new:
+            self.publish(post_id, post_channels(author_id, group_id),
+                         release_stamp(released_at))
+            cursor = max(cursor, released_at)
+        return cursor
+
+
+hub = FeedHub()
+
+
+def format_event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.extend(f'data: {line}' for line in data.splitlines() or [''])
+    return '\n'.join(lines) + '\n\n'
+
+
+def render_cards(request, posts, ids):
+    from django.template.loader import render_to_string
+
+    return ''.join(
+        render_to_string('includes/post_item.html', {'post': post},
+                         request=request)
+        for post in posts.filter(id__in=ids))
+
+
+def run_sync(func, *args):
+    """Запрос к БД из пула потоков: соединение не переживает вызов."""
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+def new_releases(posts, after):
+    """Посты, вышедшие после момента ``after``: пары (момент, id)."""
+    return [(release_stamp(released_at), post_id)
+            for released_at, post_id in posts.filter(
+                released_at__gt=stamp_moment(after)).order_by(
+                'released_at').values_list('released_at', 'id')]
+
+
+def posts_event(new):
+    latest = max(stamp for stamp, _ in new)
+    return latest, format_event(
+        'posts', f'{{"count": {len(new)}, "latest": {latest}}}',
+        event_id=latest)
+
+
+def sse_events(request, feed, channels, posts, after, render=False):
+    """Поток событий ``posts`` (и ``card``, если render) для EventSource.
+
+    Начинает с постов, вышедших после момента ``after`` (Last-Event-ID
+    при переподключении), затем ждет новых в хабе, отправляя пинги.
+    """
+    heartbeat = getattr(settings, 'STREAMS_HEARTBEAT', 15)
+    deadline = time.monotonic() + getattr(settings,
+                                          'STREAMS_MAX_DURATION', 300)
+    hub.connect(feed)
+    try:
+        yield 'retry: 3000\n\n'
+        new = new_releases(posts, after)
+        while True:
+            if new:
+                after, event = posts_event(new)
+                yield event
+                if render:
+                    yield format_event('card', render_cards(
+                        request, posts, [post_id for _, post_id in new]))
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            new = hub.wait(channels, after, min(heartbeat, remaining))
+            if not new:
+                yield ': ping\n\n'
+    finally:
+        hub.disconnect(feed)
+
+
+async def sse_events_async(request, feed, channels, posts, after,
+                           render=False):
+    """Двойник sse_events() для yatube.asgi: соединение ждет на event
+    loop, а поток из пула занимают только запросы к БД."""
+    loop = asyncio.get_running_loop()
+    heartbeat = getattr(settings, 'STREAMS_HEARTBEAT', 15)
+    deadline = time.monotonic() + getattr(settings,
+                                          'STREAMS_MAX_DURATION', 300)
+    hub.connect(feed)
+    try:
+        yield 'retry: 3000\n\n'
+        new = await loop.run_in_executor(None, run_sync, new_releases,
+                                         posts, after)
+        while True:
+            if new:
+                after, event = posts_event(new)
+                yield event
+                if render:
+                    cards = await loop.run_in_executor(
+                        None, run_sync, render_cards, request, posts,
+                        [post_id for _, post_id in new])
+                    yield format_event('card', cards)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            new = await hub.wait_async(channels, after,
+                                       min(heartbeat, remaining))
+            if not new:
+                yield ': ping\n\n'
+    finally:
+        hub.disconnect(feed)
+
+
+def poll_result(new, after):
+    return json.dumps({'count': len(new), 'latest': max(
+        (stamp for stamp, _ in new), default=after)})
+
+
+def long_poll(feed, channels, after, timeout):
+    hub.connect(feed)
+    try:
+        new = hub.wait(channels, after, timeout)
+    finally:
+        hub.disconnect(feed)
+    yield poll_result(new, after)
+
+
+async def long_poll_async(feed, channels, after, timeout):
+    hub.connect(feed)
+    try:
+        new = await hub.wait_async(channels, after, timeout)
+    finally:
+        hub.disconnect(feed)
+    yield poll_result(new, after)
+
+
+def live_updates(request):
+    """Включены ли SSE и long-poll для этого запроса.
+
+    Под WSGI каждое открытое соединение держит поток воркера до
+    STREAMS_MAX_DURATION, поэтому там ленты отключены, пока их явно
+    не разрешит STREAMS_UNDER_WSGI.
+    """
+    return bool(request.META.get('yatube.asgi')
+                or getattr(settings, 'STREAMS_UNDER_WSGI', False))
+
+
+def stream_response(events, async_events, content_type):
+    """Потоковый ответ с асинхронным двойником.
+
+    Под WSGI отдается ``events``; yatube.asgi берет
+    ``async_streaming_content`` и не держит поток на время ожидания.
+    """
+    from django.http import StreamingHttpResponse
+
+    response = StreamingHttpResponse(events, content_type=content_type)
+    response.async_streaming_content = async_events
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,107 @@
+import datetime as dt
+import json
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from sorl.thumbnail import delete as delete_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from jobs.tasks import task
+
+from . import images
+from .models import ArchivedPost, MediaBlob, Post, ReactionShard
+from .storage import post_image_storage
+
+MEDIA_GC_GRACE = dt.timedelta(
+    seconds=getattr(settings, 'MEDIA_GC_GRACE', 3600))
+
+
+@task
+def build_image_variants(post_id):
+    post = Post.objects.filter(id=post_id).first()
+    if post is None:
+        return
+    if not post.image:
+        Post.objects.filter(id=post_id).update(image_variants='')
+    elif post.variants.get('source') != post.image.name:
+        manifest = images.build_variants(post.image.name)
+        # Картинку могли успеть заменить, пока мы ее нарезали.
+        Post.objects.filter(id=post_id, image=post.image.name).update(
+            image_variants=json.dumps(manifest))
+
+
+@task
+def collect_media_garbage(grace_seconds=None):
+    """Удаляет файлы, на которые давно не ссылается ни один пост,
+    вместе с их вариантами и миниатюрами."""
+    grace = (MEDIA_GC_GRACE if grace_seconds is None
+             else dt.timedelta(seconds=grace_seconds))
+    cutoff = timezone.now() - grace
+    candidates = MediaBlob.objects.filter(
+        refcount__lte=0, released_at__lte=cutoff)
+    for blob in candidates.iterator():
+        # Условное удаление: blob мог снова понадобиться, а если его
+        # успели взять и снова отпустить, отсрочка считается заново.
+        deleted, _ = MediaBlob.objects.filter(
+            id=blob.id, refcount__lte=0, released_at__lte=cutoff).delete()
+        if not deleted:
+            continue
+        delete_thumbnails(ImageFile(blob.name, storage=post_image_storage),
+                          delete_file=False)
+        images.delete_variants(blob.name)
+        post_image_storage.delete(blob.name)
+
+
+@task
+def flush_reaction_counts():
+    """Сводит шарды реакций в Post.reaction_counts (или в архивный
+    пост, если пост успели перенести).
+
+    Из шарда вычитается ровно то, что перенесено, поэтому клики,
+    пришедшие во время сведения, дождутся следующего запуска.
+    """
+    pending = defaultdict(list)
+    for row in (ReactionShard.objects.exclude(delta=0)
+                .values_list('id', 'post_id', 'kind', 'delta')):
+        pending[row[1]].append(row)
+    for post_id, rows in pending.items():
+        with transaction.atomic():
+            for model in (Post, ArchivedPost):
+                post = (model.objects.select_for_update()
+                        .filter(id=post_id).only('id', 'reaction_counts')
+                        .first())
+                if post is not None:
+                    break
+            else:
+                # Пост удален: сводить некуда.
+                ReactionShard.objects.filter(post_id=post_id).delete()
+                continue
+            counts = post.reaction_totals
+            for shard_id, _, kind, delta in rows:
+                counts[kind] = counts.get(kind, 0) + delta
+                ReactionShard.objects.filter(id=shard_id).update(
+                    delta=F('delta') - delta)
+            model.objects.filter(id=post_id).update(
+                reaction_counts=json.dumps(
+                    {kind: count for kind, count in counts.items()
+                     if count}))
+    ReactionShard.objects.filter(delta=0).delete()
+
+
+@task
+def purge_deleted():
+    """Очищает удаленное пачками и, если работа осталась, ставит себя
+    снова: одна задача не держит воркер дольше PURGE_BATCHES_PER_RUN
+    пачек."""
+    # purge сам ставит задачи этого модуля, поэтому импорт здесь.
+    from . import purge
+
+    for _ in range(getattr(settings, 'PURGE_BATCHES_PER_RUN', 20)):
+        if purge.purge_batch() is None:
+            return
+    if purge.pending():
+        purge_deleted.schedule(dt.timedelta(
+            seconds=getattr(settings, 'PURGE_DELAY', 5)))
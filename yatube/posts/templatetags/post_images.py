@@ -0,0 +1,33 @@
+from django import template
+from django.core.files.storage import default_storage
+
+register = template.Library()
+
+FEED_SIZES = '(max-width: 576px) 100vw, 720px'
+
+
+def srcset(variants):
+    return ', '.join(f'{default_storage.url(variant["name"])} '
+                     f'{variant["width"]}w' for variant in variants)
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post, sizes=FEED_SIZES):
+    manifest = post.variants
+    context = {'post': post, 'sizes': sizes, 'sources': [],
+               'fallback': None}
+    if not manifest.get('sources'):
+        return context
+    sources = manifest['sources']
+    fallback = sources.get('image/jpeg', [])
+    context['sources'] = [{'type': mime, 'srcset': srcset(variants)}
+                          for mime, variants in sources.items()
+                          if mime != 'image/jpeg']
+    if fallback:
+        context['fallback'] = {
+            'src': default_storage.url(fallback[0]['name']),
+            'srcset': srcset(fallback),
+            'width': manifest['width'],
+            'height': manifest['height'],
+        }
+    return context
@@ -0,0 +1,21 @@
+from django import template
+
+from ..models import REACTION_KINDS
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/post_reactions.html', takes_context=True)
+def post_reactions(context, post):
+    """Кнопки реакций: счетчики из Post.reaction_counts, свои реакции —
+    из ``my_reactions``, проставленных posts.reactions.attach()."""
+    counts = post.reaction_totals
+    mine = getattr(post, 'my_reactions', set())
+    return {
+        'post': post,
+        'user': context.get('user'),
+        'csrf_token': context.get('csrf_token'),
+        'reactions': [{'kind': kind, 'label': label,
+                       'count': counts.get(kind, 0), 'active': kind in mine}
+                      for kind, label in REACTION_KINDS],
+    }
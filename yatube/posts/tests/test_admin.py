@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from yatube.paginator import EstimatedCountPaginator
+
+from .. import search
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class SearchIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def found(self, term):
+        return set(search.search(Post.objects.all(), term))
+
+    def test_index_follows_table(self):
+        """Триггеры держат индекс в актуальном виде."""
+        post = Post.objects.create(text='Рыбалка на Волге',
+                                   author=SearchIndexTests.author)
+        Post.objects.create(text='Другое', author=SearchIndexTests.author)
+        self.assertEqual(self.found('волг'), {post})
+        Post.objects.filter(id=post.id).update(text='Охота')
+        self.assertEqual(self.found('волг'), set())
+        self.assertEqual(self.found('охота'), {post})
+        post.delete()
+        self.assertEqual(self.found('охота'), set())
+
+    def test_query_syntax_is_escaped(self):
+        post = Post.objects.create(text='say "hi" OR NOT',
+                                   author=SearchIndexTests.author)
+        self.assertEqual(self.found('"hi" OR'), {post})
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        group = Group.objects.create(title='Группа', slug='group')
+        posts = [Post(text=f'пост номер {number}', author=cls.admin,
+                      group=group) for number in range(30)]
+        Post.objects.bulk_create(posts)
+        post = Post.objects.first()
+        Comment.objects.create(post=post, author=cls.admin, text='ответ')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(AdminChangelistTests.admin)
+
+    def test_changelists_open(self):
+        for model in ('post', 'group', 'comment', 'follow'):
+            with self.subTest(model=model):
+                response = self.client.get(
+                    reverse(f'admin:posts_{model}_changelist'))
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_changelist_query_cost(self):
+        """Без COUNT по всей таблице и без запроса на каждую строку."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'номер 1'})
+        self.assertEqual(response.context['cl'].result_count, 11)
+        sqls = [query['sql'] for query in queries]
+        self.assertLess(len(sqls), 12)
+        self.assertFalse([sql for sql in sqls if 'COUNT(*)' in sql
+                          and 'LIMIT' not in sql and 'posts_post' in sql])
+
+    @override_settings(ADMIN_COUNT_LIMIT=10)
+    def test_estimated_count(self):
+        """Большой список считается по статистике, фильтр — до границы."""
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        with self.assertNumQueries(3):
+            self.assertGreaterEqual(paginator.count, 30)
+        filtered = EstimatedCountPaginator(
+            Post.objects.filter(text__contains='пост'), 10)
+        self.assertEqual(filtered.count, 10)
+
+    @override_settings(ADMIN_COUNT_LIMIT=10)
+    def test_estimate_after_archiving(self):
+        """Оценка не считает унесенные в архив старые строки, а
+        короткий список считается точно."""
+        ids = sorted(Post.objects.values_list('id', flat=True))
+        # Посты заведены bulk_create мимо счетчиков группы.
+        Post.objects.update(group=None)
+        Post.objects.filter(id__in=ids[:15]).delete()
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 15)
+        Post.objects.filter(id__in=ids[15:25]).delete()
+        paginator = EstimatedCountPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 5)
+
+    def test_changelist_skips_year_scan(self):
+        """Список постов не строит перечень лет по всей таблице."""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertFalse([query['sql'] for query in queries
+                          if 'DISTINCT' in query['sql']
+                          and 'posts_post' in query['sql']])
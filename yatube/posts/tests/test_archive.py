@@ -0,0 +1,139 @@
+import datetime as dt
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from notifications.models import COMMENT, Notification
+
+from .. import archive, revisions
+from ..models import (ArchivedComment, ArchivedPost, Comment, Group,
+                      GroupSummary, Post, PostRevision, Reaction)
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        old = timezone.now() - dt.timedelta(days=200)
+        for number in range(15):
+            post = Post.objects.create(text=f'post {number}',
+                                       author=cls.author, group=cls.group)
+            Post.objects.filter(id=post.id).update(
+                pub_date=old + dt.timedelta(days=number * 10))
+        cls.old_post = Post.objects.order_by('pub_date').first()
+        root = Comment.objects.create(post=cls.old_post, author=cls.author,
+                                      text='корень')
+        Comment.objects.create(post=cls.old_post, author=cls.author,
+                               text='ответ', parent=root)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_batches_move_posts_with_comments(self):
+        """Старые посты уезжают пачками, группа их не теряет."""
+        summary = GroupSummary.objects.get(group=ArchiveTests.group)
+        moved = archive.archive(
+            before=timezone.now() - dt.timedelta(days=95), batch_size=3)
+        self.assertEqual(moved, 11)
+        self.assertEqual(Post.objects.count(), 4)
+        self.assertEqual(ArchivedPost.objects.count(), 11)
+        self.assertFalse(Comment.objects.exists())
+        reply = ArchivedComment.objects.get(text='ответ')
+        self.assertEqual(reply.parent.text, 'корень')
+        self.assertEqual(
+            GroupSummary.objects.get(group=ArchiveTests.group).post_count,
+            summary.post_count)
+
+    def test_deleted_comments_keep_tombstones(self):
+        """Удаленный комментарий с ответами едет заглушкой, без
+        ответов — не едет вовсе."""
+        root = Comment.objects.get(text='корень')
+        leaf = Comment.objects.create(post=ArchiveTests.old_post,
+                                      author=ArchiveTests.author,
+                                      text='лишний', parent=root)
+        Comment.objects.filter(id__in=[root.id, leaf.id]).update(
+            deleted_at=timezone.now())
+        archive.archive(before=timezone.now() - dt.timedelta(days=95))
+        archived = ArchivedComment.objects.get(id=root.id)
+        self.assertIsNotNone(archived.deleted_at)
+        self.assertEqual(archived.reply_count, 1)
+        self.assertFalse(ArchivedComment.objects.filter(id=leaf.id).exists())
+        response = Client().get(reverse(
+            'posts:post', args=['author', ArchiveTests.old_post.id]))
+        self.assertNotContains(response, 'корень')
+        self.assertContains(response, 'Комментарий удален')
+
+    def test_dropped_leaf_leaves_every_ancestor(self):
+        """Выпавший удаленный лист вычитается из счетчиков всей ветки."""
+        root = Comment.objects.get(text='корень')
+        reply = Comment.objects.get(text='ответ')
+        leaf = Comment.objects.create(post=ArchiveTests.old_post,
+                                      author=ArchiveTests.author,
+                                      text='лишний', parent=reply)
+        Comment.objects.filter(id=leaf.id).update(deleted_at=timezone.now())
+        archive.archive(before=timezone.now() - dt.timedelta(days=95))
+        self.assertEqual(ArchivedComment.objects.get(id=root.id).reply_count,
+                         1)
+        self.assertEqual(
+            ArchivedComment.objects.get(id=reply.id).reply_count, 0)
+
+    def test_post_rows_survive_archive(self):
+        """Реакции, версии и уведомления остаются при архивном посте и
+        уходят, только когда удаляют его самого."""
+        post = ArchiveTests.old_post
+        Reaction.objects.create(post=post, kind='like',
+                                user=User.objects.create_user('reader'))
+        revisions.record(post, 'первая редакция')
+        Notification.objects.create(recipient=ArchiveTests.author,
+                                    verb=COMMENT, post=post)
+        archive.archive(before=timezone.now() - dt.timedelta(days=95))
+        self.assertFalse(Post.objects.filter(id=post.id).exists())
+        self.assertEqual(Reaction.objects.filter(post_id=post.id).count(), 1)
+        client = Client()
+        client.force_login(ArchiveTests.author)
+        self.assertContains(client.get(reverse('notifications:inbox')),
+                            reverse('posts:post', args=['author', post.id]))
+        self.assertContains(
+            client.get(reverse('posts:post_history', args=['author', post.id]),
+                       {'version': 1}),
+            'первая редакция')
+        ArchivedPost.objects.filter(id=post.id).delete()
+        self.assertFalse(Reaction.objects.exists())
+        self.assertFalse(PostRevision.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_feeds_cross_into_archive(self):
+        """Пагинация продолжается архивом в том же порядке."""
+        expected = list(Post.objects.order_by('-pub_date').values_list(
+            'id', flat=True))
+        call_command('archive_posts', days=95, pause=0, stdout=StringIO())
+        client = Client()
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_posts', args=['group']),
+                    reverse('posts:profile', args=['author'])):
+            with self.subTest(url=url):
+                first = client.get(url).context['page']
+                second = client.get(url, {'page': 2}).context['page']
+                self.assertEqual(first.paginator.count, 15)
+                self.assertEqual([post.id for post in first]
+                                 + [post.id for post in second], expected)
+                self.assertFalse(first[0].is_archived)
+                self.assertTrue(all(post.is_archived for post in second))
+
+    def test_archived_post_page(self):
+        archive.archive(before=timezone.now() - dt.timedelta(days=95))
+        client = Client()
+        client.force_login(ArchiveTests.author)
+        response = client.get(reverse(
+            'posts:post', args=['author', ArchiveTests.old_post.id]))
+        self.assertContains(response, 'ответ')
+        self.assertNotContains(response, 'comment-form')
@@ -0,0 +1,150 @@
+import importlib
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import COMMENT_MAX_DEPTH, Comment, Post
+
+User = get_user_model()
+
+
+class CommentTreeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(text='test', author=cls.user)
+
+    def reply(self, parent=None, post=None):
+        return Comment.objects.create(post=post or CommentTreeTests.post,
+                                      author=CommentTreeTests.user,
+                                      text='text', parent=parent)
+
+    def test_path_and_depth(self):
+        """Путь ответа продолжает путь родителя."""
+        root = self.reply()
+        child = self.reply(root)
+        grandchild = self.reply(child)
+        self.assertEqual(grandchild.depth, 2)
+        self.assertTrue(grandchild.path.startswith(child.path))
+        self.assertEqual(grandchild.ancestor_ids, [root.id, child.id])
+
+    def test_thread_shows_newest_roots_first(self):
+        old = self.reply()
+        old_reply = self.reply(old)
+        new = self.reply()
+        self.assertEqual(
+            list(Comment.objects.thread(CommentTreeTests.post)),
+            [new, old, old_reply])
+
+    def test_root_order_migration_is_reversible(self):
+        """Миграция порядка корней пакетами переводит пути туда и
+        обратно, не завися от текущих posts.models."""
+        root = self.reply()
+        child = self.reply(root)
+        paths = list(Comment.objects.order_by('pk')
+                     .values_list('path', flat=True))
+        migration = importlib.import_module(
+            'posts.migrations.0022_comment_root_order')
+        migration.BATCH_SIZE = 1
+        self.addCleanup(setattr, migration, 'BATCH_SIZE', 1000)
+
+        migration.invert_roots(apps, None)
+        child.refresh_from_db()
+        self.assertEqual(child.path[:8], migration.path_segment(root.id))
+        migration.invert_roots(apps, None)
+        self.assertEqual(list(Comment.objects.order_by('pk')
+                              .values_list('path', flat=True)), paths)
+
+    def test_reply_counts_are_incremental(self):
+        """Ответ увеличивает счетчики всех предков, удаление — уменьшает."""
+        root = self.reply()
+        child = self.reply(root)
+        self.reply(child)
+        self.reply(root)
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 3)
+
+        child.delete()
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 1)
+
+    def test_subtree_is_one_query(self):
+        """Ветка загружается одним запросом в порядке дерева."""
+        root = self.reply()
+        child = self.reply(root)
+        other = self.reply()
+        grandchild = self.reply(child)
+        sibling = self.reply(root)
+        with self.assertNumQueries(1):
+            subtree = list(Comment.objects.subtree(root))
+        self.assertEqual(subtree, [root, child, grandchild, sibling])
+        self.assertNotIn(other, subtree)
+
+    def test_depth_limited_thread(self):
+        """thread() отрезает ответы глубже max_depth."""
+        root = self.reply()
+        child = self.reply(root)
+        self.reply(child)
+        self.assertEqual(
+            list(Comment.objects.thread(CommentTreeTests.post, max_depth=1)),
+            [root, child])
+
+    def test_max_depth_is_capped(self):
+        """Ответы глубже предела остаются на последнем уровне."""
+        comment = self.reply()
+        for _ in range(COMMENT_MAX_DEPTH + 2):
+            comment = self.reply(comment)
+        self.assertEqual(comment.depth, COMMENT_MAX_DEPTH)
+
+
+class CommentViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(text='test', author=cls.user)
+        cls.other_post = Post.objects.create(text='other', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(CommentViewsTests.user)
+        self.url = reverse('posts:add_comment', kwargs={
+            'username': 'user', 'post_id': CommentViewsTests.post.id})
+
+    def test_reply_via_form(self):
+        """Форма комментария принимает родителя."""
+        root = Comment.objects.create(post=CommentViewsTests.post,
+                                      author=CommentViewsTests.user,
+                                      text='root')
+        self.client.post(self.url, {'text': 'reply', 'parent': root.id})
+        reply = Comment.objects.get(text='reply')
+        self.assertEqual(reply.parent, root)
+        self.assertEqual(reply.depth, 1)
+
+    def test_reply_to_other_post_is_rejected(self):
+        """Нельзя ответить на комментарий к другому посту."""
+        foreign = Comment.objects.create(post=CommentViewsTests.other_post,
+                                         author=CommentViewsTests.user,
+                                         text='foreign')
+        self.client.post(self.url, {'text': 'reply', 'parent': foreign.id})
+        self.assertFalse(Comment.objects.filter(text='reply').exists())
+
+    def test_thread_page_shows_subtree(self):
+        """Страница ветки показывает ответы, скрытые на странице поста."""
+        comment = None
+        for depth in range(6):
+            comment = Comment.objects.create(
+                post=CommentViewsTests.post, author=CommentViewsTests.user,
+                text=f'depth {depth}', parent=comment)
+        response = self.client.get(reverse('posts:post', kwargs={
+            'username': 'user', 'post_id': CommentViewsTests.post.id}))
+        self.assertNotContains(response, 'depth 4')
+        hidden = Comment.objects.get(text='depth 3')
+        thread_url = reverse('posts:comment_thread', kwargs={
+            'username': 'user', 'post_id': CommentViewsTests.post.id,
+            'comment_id': hidden.id})
+        self.assertContains(response, thread_url)
+        self.assertContains(self.client.get(thread_url), 'depth 5')
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -68,7 +69,8 @@ class NewPostFormTests(TestCase):
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.author, NewPostFormTests.user)
         self.assertEqual(post.group_id, NewPostFormTests.group.id)
-        self.assertEqual(post.image, 'posts/small.gif')
+        digest = hashlib.sha256(small_gif).hexdigest()
+        self.assertEqual(post.image, f'posts/{digest[:2]}/{digest}.gif')
 
 
 class EditPostFormTests(TestCase):
@@ -0,0 +1,107 @@
+import datetime as dt
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import groups
+from ..models import Group, GroupSummary, Post
+from ..scheduler import PublishScheduler
+
+User = get_user_model()
+
+
+class GroupSummaryTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.first = Group.objects.create(title='Первая', slug='first')
+        cls.second = Group.objects.create(title='Вторая', slug='second')
+
+    def summary(self, group):
+        return GroupSummary.objects.get(group=group)
+
+    def test_signals_keep_summary(self):
+        """Создание, перенос и удаление поста меняют сводку групп."""
+        old = Post.objects.create(text='old', author=GroupSummaryTests.author,
+                                  group=GroupSummaryTests.first)
+        new = Post.objects.create(text='new', author=GroupSummaryTests.author,
+                                  group=GroupSummaryTests.first)
+        summary = self.summary(GroupSummaryTests.first)
+        self.assertEqual(summary.post_count, 2)
+        self.assertEqual(summary.last_post_at, new.pub_date)
+
+        new.group = GroupSummaryTests.second
+        new.save()
+        summary = self.summary(GroupSummaryTests.first)
+        self.assertEqual(summary.post_count, 1)
+        self.assertEqual(summary.last_post_at, old.pub_date)
+        self.assertEqual(self.summary(GroupSummaryTests.second).post_count,
+                         1)
+
+        old.delete()
+        summary = self.summary(GroupSummaryTests.first)
+        self.assertEqual(summary.post_count, 0)
+        self.assertIsNone(summary.last_post_at)
+
+    def test_scheduled_post_counts_on_release(self):
+        Post.objects.create(
+            text='later', author=GroupSummaryTests.author,
+            group=GroupSummaryTests.first, is_published=False,
+            publish_at=timezone.now() - dt.timedelta(minutes=1))
+        self.assertEqual(self.summary(GroupSummaryTests.first).post_count, 0)
+        PublishScheduler(horizon=600).run_once()
+        self.assertEqual(self.summary(GroupSummaryTests.first).post_count, 1)
+
+
+class GroupCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_served_from_memory(self):
+        groups.group_cache.get('group')
+        with self.assertNumQueries(0):
+            self.assertEqual(groups.group_cache.get('group'),
+                             GroupCacheTests.group)
+
+    def test_change_invalidates_other_workers(self):
+        """Другой процесс без общего кэша увидит правку по версии в БД,
+        как только истечет срок сверки."""
+        worker = groups.GroupCache()
+        worker.get('group')
+        Group.objects.filter(id=GroupCacheTests.group.id).update(
+            title='Новое')
+        with mock.patch.object(groups, 'group_cache', groups.GroupCache()):
+            Group.objects.get(id=GroupCacheTests.group.id).save()
+        self.assertEqual(worker.get('group').title, 'Группа')
+        worker.checked -= settings.POSTS_GROUPS_REFRESH
+        self.assertEqual(worker.get('group').title, 'Новое')
+
+    def test_deleted_group_disappears(self):
+        worker = groups.GroupCache()
+        worker.get('group')
+        with mock.patch.object(groups, 'group_cache', groups.GroupCache()):
+            Group.objects.filter(id=GroupCacheTests.group.id).delete()
+        worker.checked -= settings.POSTS_GROUPS_REFRESH
+        self.assertIsNone(worker.get('group'))
+
+    def test_directory_page(self):
+        Post.objects.create(text='post', group=GroupCacheTests.group,
+                            author=User.objects.create_user('author'))
+        with self.assertNumQueries(2):
+            response = Client().get(reverse('posts:group_list'))
+        self.assertContains(response, 'Записей: 1')
+        self.assertEqual(
+            Client().get(reverse('posts:group_posts',
+                                 args=['missing'])).status_code, 404)
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from jobs.models import Job
+from jobs.worker import run_pending
+
+from ..images import VARIANT_WIDTHS
+from ..models import Post
+from ..tasks import build_image_variants, collect_media_garbage
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+RED_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\xFF\x00\x00')
+
+
+class ImageVariantsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        cls.user = User.objects.create_user(username='foo')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self):
+        return Post.objects.create(
+            text='test',
+            author=ImageVariantsTests.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    def test_variants_are_built_in_background(self):
+        """Варианты нарезаются фоновой задачей и попадают в манифест."""
+        post = self.create_post()
+        self.assertEqual(post.variants, {})
+        run_pending()
+        post.refresh_from_db()
+        manifest = post.variants
+        self.assertEqual(manifest['source'], post.image.name)
+        for mime in ('image/webp', 'image/jpeg'):
+            with self.subTest(mime=mime):
+                variants = manifest['sources'][mime]
+                self.assertEqual([v['width'] for v in variants],
+                                 list(VARIANT_WIDTHS))
+                for variant in variants:
+                    self.assertTrue(os.path.exists(
+                        os.path.join(ImageVariantsTests.media_root,
+                                     variant['name'])))
+
+    def test_resave_does_not_queue_variants_again(self):
+        post = self.create_post()
+        post.text = 'правка'
+        post.save()
+        self.assertEqual(Job.objects.filter(
+            name=build_image_variants.name).count(), 1)
+
+    def test_feed_renders_srcset_and_lazy_loading(self):
+        """Лента выводит picture со srcset и ленивой загрузкой."""
+        self.create_post()
+        run_pending()
+        cache.clear()
+        content = self.client.get(reverse('posts:index')).content.decode()
+        self.assertIn('type="image/webp"', content)
+        self.assertIn('320w', content)
+        self.assertIn('loading="lazy"', content)
+
+    def test_replacing_image_drops_old_variants(self):
+        """После замены картинки сборщик мусора удаляет старые
+        варианты."""
+        post = self.create_post()
+        run_pending()
+        post.refresh_from_db()
+        old_names = [v['name'] for v in post.variants['sources']['image/webp']]
+
+        post.image = SimpleUploadedFile('other.gif', RED_GIF, 'image/gif')
+        post.save()
+        run_pending()
+        collect_media_garbage(grace_seconds=0)
+        post.refresh_from_db()
+        self.assertEqual(post.variants['source'], post.image.name)
+        for name in old_names:
+            self.assertFalse(os.path.exists(
+                os.path.join(ImageVariantsTests.media_root, name)))
+
+    def test_variant_is_served(self):
+        """Вариант доступен через /media/."""
+        post = self.create_post()
+        run_pending()
+        post.refresh_from_db()
+        name = post.variants['sources']['image/webp'][0]['name']
+        response = self.client.get(f'{settings.MEDIA_URL}{name}')
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,139 @@
+import datetime as dt
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import archive
+from ..models import Post
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def gif_with_comment(comment):
+    """Та же картинка с другими байтами: отдельный файл в хранилище."""
+    return SMALL_GIF[:-1] + b'\x21\xFE' + bytes([len(comment)]) + \
+        comment + b'\x00\x3B'
+
+
+class MediaServingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        cls.user = User.objects.create_user(username='foo')
+        cls.post = Post.objects.create(
+            text='test',
+            author=cls.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        cls.url = cls.post.image.url
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_full_file(self):
+        """Файл поста отдается целиком с ETag и Accept-Ranges."""
+        response = self.client.get(MediaServingTests.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), SMALL_GIF)
+        self.assertEqual(response['Content-Type'], 'image/gif')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_range_request(self):
+        """Запрос с Range получает 206 и нужный кусок."""
+        response = self.client.get(MediaServingTests.url,
+                                   HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'],
+                         f'bytes 2-5/{len(SMALL_GIF)}')
+        self.assertEqual(b''.join(response.streaming_content),
+                         SMALL_GIF[2:6])
+
+        response = self.client.get(MediaServingTests.url,
+                                   HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content),
+                         SMALL_GIF[-3:])
+
+    def test_unsatisfiable_range(self):
+        """Диапазон за концом файла дает 416."""
+        response = self.client.get(MediaServingTests.url,
+                                   HTTP_RANGE='bytes=1000-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_conditional_get(self):
+        """Повторный запрос с ETag получает 304."""
+        etag = self.client.get(MediaServingTests.url)['ETag']
+        response = self.client.get(MediaServingTests.url,
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_unreferenced_file_is_hidden(self):
+        """Файлы, не принадлежащие постам, не отдаются."""
+        with open(f'{MediaServingTests.media_root}/secret.txt', 'w') as f:
+            f.write('secret')
+        response = self.client.get(f'{settings.MEDIA_URL}secret.txt')
+        self.assertEqual(response.status_code, 404)
+
+    def create_post(self, comment, **kwargs):
+        return Post.objects.create(
+            text='test', author=MediaServingTests.user,
+            image=SimpleUploadedFile('other.gif', gif_with_comment(comment),
+                                     'image/gif'), **kwargs)
+
+    def test_archived_post_image(self):
+        """Картинка поста, перенесенного в архив, по-прежнему видна."""
+        post = self.create_post(b'old')
+        url = post.image.url
+        Post.objects.filter(id=post.id).update(
+            pub_date=timezone.now() - dt.timedelta(days=400))
+        archive.archive_batch(timezone.now() - dt.timedelta(days=365))
+        self.assertFalse(Post.objects.filter(id=post.id).exists())
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=86400')
+
+    def test_scheduled_post_image_is_private(self):
+        """Картинку отложенного поста видит только автор, и общие
+        кэши ее не сохраняют."""
+        post = self.create_post(
+            b'later', is_published=False,
+            publish_at=timezone.now() + dt.timedelta(hours=1))
+        self.assertEqual(self.client.get(post.image.url).status_code, 404)
+        other = User.objects.create_user(username='other')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(post.image.url).status_code, 404)
+
+        self.client.force_login(MediaServingTests.user)
+        response = self.client.get(post.image.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        self.assertIn('Cookie', response['Vary'])
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel',
+                       MEDIA_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        """В режиме x-accel тело отдает nginx."""
+        response = self.client.get(MediaServingTests.url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         f'/protected-media/{MediaServingTests.post.image}')
+        self.assertEqual(response.content, b'')
@@ -0,0 +1,148 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import purge
+from ..models import (Comment, Follow, Group, GroupSummary, Post, Reaction,
+                      Tombstone)
+
+User = get_user_model()
+
+
+class PurgeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.posts = [Post.objects.create(text=f'post {number}',
+                                         author=cls.author, group=cls.group)
+                     for number in range(5)]
+        cls.other = Post.objects.create(text='чужой', author=cls.reader,
+                                        group=cls.group)
+        root = Comment.objects.create(post=cls.posts[0], author=cls.reader,
+                                      text='вопрос')
+        Comment.objects.create(post=cls.posts[0], author=cls.author,
+                               text='ответ автора', parent=root)
+        Comment.objects.create(post=cls.other, author=cls.author,
+                               text='комментарий автора')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.reader)
+        Reaction.objects.create(user=cls.author, post=cls.other,
+                                kind='like')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_deleted_user_disappears_at_once(self):
+        # Число запросов не зависит от того, сколько у автора постов.
+        with self.assertNumQueries(14):
+            purge.delete_user(PurgeTests.author)
+        client = Client()
+        self.assertEqual(
+            client.get(reverse('posts:profile', args=['author'])).status_code,
+            404)
+        page = client.get(reverse('posts:index')).context['page']
+        self.assertEqual(list(page), [PurgeTests.other])
+        self.assertEqual(
+            GroupSummary.objects.get(group=PurgeTests.group).post_count, 1)
+        response = client.get(reverse('posts:post',
+                                      args=['reader', PurgeTests.other.id]))
+        self.assertNotContains(response, 'комментарий автора')
+        self.assertContains(response, 'Комментарий удален')
+        # Строки пока на месте: их удаляет очистка.
+        self.assertEqual(Post.objects.filter(author=PurgeTests.author).count(),
+                         5)
+
+    def test_repeated_delete_keeps_one_tombstone(self):
+        """Повторное удаление пользователя не заводит второе надгробие."""
+        self.assertIsNotNone(purge.delete_user(PurgeTests.author))
+        self.assertIsNone(purge.delete_user(PurgeTests.author))
+        self.assertEqual(Tombstone.objects.filter(
+            kind=Tombstone.USER, object_id=PurgeTests.author.id).count(), 1)
+
+    def test_admin_deletes_post_in_background(self):
+        """Удаление поста в админке скрывает его и оставляет строки
+        очистке, как удаление на сайте."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        post = PurgeTests.posts[1]
+        response = client.post(
+            reverse('admin:posts_post_delete', args=[post.id]),
+            {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertIsNotNone(Post.objects.get(id=post.id).deleted_at)
+        self.assertTrue(Tombstone.objects.filter(
+            kind=Tombstone.POST, object_id=post.id).exists())
+
+    def test_inactive_user_is_not_deleted(self):
+        """Скрывает профиль надгробие, а не is_active."""
+        client = Client()
+        url = reverse('posts:profile', args=['reader'])
+        self.assertEqual(client.get(url).status_code, 200)
+        User.objects.filter(username='reader').update(is_active=False)
+        cache.clear()
+        self.assertEqual(client.get(url).status_code, 200)
+        purge.delete_user(PurgeTests.reader)
+        cache.clear()
+        self.assertEqual(client.get(url).status_code, 404)
+
+    def test_purge_removes_rows_in_batches(self):
+        purge.delete_user(PurgeTests.author)
+        out = StringIO()
+        call_command('purge_deleted', batch_size=2, pause=0, stdout=out)
+        self.assertIn('очищен', out.getvalue())
+        self.assertFalse(User.objects.filter(username='author').exists())
+        self.assertEqual(list(Post.objects.all()), [PurgeTests.other])
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(Reaction.objects.exists())
+        tombstone = Tombstone.objects.get()
+        self.assertIsNotNone(tombstone.purged_at)
+        self.assertEqual(tombstone.step, 'user')
+        self.assertGreaterEqual(tombstone.deleted_rows, 13)
+        # Вычтенные при удалении посты не вычитаются второй раз.
+        self.assertEqual(
+            GroupSummary.objects.get(group=PurgeTests.group).post_count, 1)
+
+    def test_batch_is_bounded(self):
+        purge.delete_user(PurgeTests.author)
+        tombstone = purge.purge_batch(batch_size=1)
+        self.assertEqual(tombstone.step, 'comments')
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertIsNone(tombstone.purged_at)
+
+
+class DeletePostViewTests(TestCase):
+    def test_author_deletes_post(self):
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(text='удалить', author=author)
+        Comment.objects.create(post=post, author=author, text='коммент')
+        client = Client()
+        client.force_login(author)
+        url = reverse('posts:delete_post', args=['author', post.id])
+        self.assertEqual(client.get(url).status_code, 405)
+        client.post(url)
+        self.assertEqual(client.get(reverse(
+            'posts:post', args=['author', post.id])).status_code, 404)
+        while purge.purge_batch() is not None:
+            pass
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+
+    def test_only_author_deletes(self):
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(text='чужой пост', author=author)
+        client = Client()
+        client.force_login(User.objects.create_user(username='other'))
+        response = client.post(reverse('posts:delete_post',
+                                       args=['author', post.id]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Tombstone.objects.exists())
@@ -0,0 +1,121 @@
+import datetime as dt
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import archive, reactions
+from ..models import ArchivedPost, Post, Reaction, ReactionShard
+from ..tasks import flush_reaction_counts
+
+User = get_user_model()
+
+
+class ReactionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='test', author=cls.author)
+
+    def totals(self):
+        return Post.objects.get(id=ReactionsTests.post.id).reaction_totals
+
+    def test_toggle(self):
+        """Повторная реакция снимает первую."""
+        post_id = ReactionsTests.post.id
+        self.assertTrue(reactions.toggle(ReactionsTests.author, post_id,
+                                         'like'))
+        self.assertFalse(reactions.toggle(ReactionsTests.author, post_id,
+                                          'like'))
+        self.assertFalse(Reaction.objects.exists())
+        flush_reaction_counts()
+        self.assertEqual(self.totals(), {})
+        self.assertFalse(ReactionShard.objects.exists())
+
+    @override_settings(REACTIONS_SHARDS=4)
+    def test_flush_sums_shards(self):
+        """Сведение складывает все шарды в счетчик поста."""
+        for number in range(20):
+            user = User.objects.create_user(username=f'user{number}')
+            reactions.toggle(user, ReactionsTests.post.id, 'like')
+        reactions.toggle(ReactionsTests.author, ReactionsTests.post.id,
+                         'love')
+        self.assertGreater(ReactionShard.objects.count(), 2)
+        flush_reaction_counts()
+        self.assertEqual(self.totals(), {'like': 20, 'love': 1})
+
+        reactions.toggle(ReactionsTests.author, ReactionsTests.post.id,
+                         'love')
+        flush_reaction_counts()
+        self.assertEqual(self.totals(), {'like': 20})
+
+    def test_unflushed_shards_survive_archiving(self):
+        """Несведенные клики переезжают с постом в архив и сводятся
+        туда; удаление архивного поста уносит шарды."""
+        post = Post.objects.create(text='old', author=ReactionsTests.author)
+        Post.objects.filter(id=post.id).update(
+            pub_date=timezone.now() - dt.timedelta(days=400))
+        reactions.toggle(ReactionsTests.author, post.id, 'like')
+        archive.archive_batch(timezone.now() - dt.timedelta(days=365))
+        self.assertTrue(ReactionShard.objects.filter(post_id=post.id))
+
+        flush_reaction_counts()
+        archived = ArchivedPost.objects.get(id=post.id)
+        self.assertEqual(archived.reaction_totals, {'like': 1})
+
+        reactions.toggle(ReactionsTests.author, post.id, 'like')
+        archived.delete()
+        self.assertFalse(ReactionShard.objects.filter(post_id=post.id))
+
+    def test_user_reactions_batch(self):
+        """Свои реакции на страницу постов — одним запросом."""
+        posts = [Post.objects.create(text=str(n), author=ReactionsTests.author)
+                 for n in range(10)]
+        reactions.toggle(ReactionsTests.author, posts[3].id, 'laugh')
+        with self.assertNumQueries(1):
+            found = reactions.user_reactions(ReactionsTests.author,
+                                             [post.id for post in posts])
+        self.assertEqual(dict(found), {posts[3].id: {'laugh'}})
+
+
+class ReactionViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.post = Post.objects.create(text='test', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ReactionViewsTests.user)
+        self.url = reverse('posts:react', kwargs={
+            'username': 'user', 'post_id': ReactionViewsTests.post.id,
+            'kind': 'like'})
+
+    def test_react(self):
+        """POST ставит реакцию, аноним отправляется на вход."""
+        self.client.post(self.url)
+        self.assertTrue(Reaction.objects.filter(
+            user=ReactionViewsTests.user, kind='like').exists())
+        response = Client().post(self.url)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Reaction.objects.count(), 1)
+
+    def test_feed_renders_counts_without_count_queries(self):
+        """Лента показывает счетчики и свои реакции без COUNT."""
+        self.client.post(self.url)
+        flush_reaction_counts()
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        reaction_queries = [query['sql'] for query in queries
+                            if 'posts_reaction' in query['sql']]
+        self.assertEqual(len(reaction_queries), 1)
+        self.assertNotIn('COUNT', reaction_queries[0])
+        self.assertContains(response, '👍 1')
+        self.assertContains(response, 'btn-warning')
@@ -0,0 +1,62 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import revisions
+from ..models import Post, PostRevision
+
+User = get_user_model()
+
+
+class RevisionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def test_diff_roundtrip(self):
+        base = 'Съешь же ещё этих мягких\nфранцузских булок'
+        target = 'Съешь ещё этих мягких  французских\nбулок, да выпей чаю'
+        self.assertEqual(revisions.patch(base, revisions.diff(base, target)),
+                         target)
+
+    @override_settings(POSTS_REVISION_SNAPSHOT_EVERY=4)
+    def test_every_version_rebuilds(self):
+        """Любая версия восстанавливается, снимок — каждая четвертая."""
+        versions = [f'версия {number} ' + 'общий текст ' * 50
+                    for number in range(1, 12)]
+        post = Post.objects.create(text=versions[0],
+                                   author=RevisionsTests.author)
+        for text in versions[1:]:
+            post.text = text
+            post.save()
+        self.assertEqual(
+            list(post.revisions.filter(is_snapshot=True).values_list(
+                'number', flat=True)), [4, 8])
+        for number, text in enumerate(versions[:-1], start=1):
+            with self.subTest(number=number):
+                with self.assertNumQueries(1):
+                    self.assertEqual(revisions.rebuild(post, number), text)
+        self.assertIsNone(revisions.rebuild(post, 11))
+        delta = PostRevision.objects.get(post=post, number=1)
+        self.assertLess(len(delta.data), len(versions[0].encode()) // 4)
+
+    def test_unchanged_text_is_not_recorded(self):
+        post = Post.objects.create(text='text', author=RevisionsTests.author)
+        post.save()
+        self.assertFalse(post.revisions.exists())
+
+
+class PostHistoryViewTests(TestCase):
+    def test_edit_then_view_history(self):
+        author = User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(author)
+        post = Post.objects.create(text='первый вариант', author=author)
+        client.post(reverse('posts:edit_post', args=['author', post.id]),
+                    {'text': 'второй вариант'})
+        url = reverse('posts:post_history', args=['author', post.id])
+        response = client.get(url, {'version': 1})
+        self.assertContains(response, 'первый вариант')
+        self.assertEqual(Post.objects.get(id=post.id).text, 'второй вариант')
+        self.assertEqual(client.get(url, {'version': 2}).status_code, 404)
@@ -0,0 +1,165 @@
+import datetime as dt
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..feeds import feed_version
+from ..models import Comment, Group, Post, Reaction
+from ..scheduler import PublishScheduler
+from ..streams import FeedHub, author_channel, new_releases, release_stamp
+
+User = get_user_model()
+
+
+def schedule(author, minutes, **kwargs):
+    return Post.objects.create(
+        text='scheduled', author=author, is_published=False,
+        publish_at=timezone.now() + dt.timedelta(minutes=minutes), **kwargs)
+
+
+class PublishSchedulerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_heap_holds_only_horizon(self):
+        """В кучу попадают только посты в пределах горизонта."""
+        near = schedule(PublishSchedulerTests.author, 5)
+        schedule(PublishSchedulerTests.author, 60 * 24)
+        scheduler = PublishScheduler(horizon=600)
+        scheduler.refresh(timezone.now())
+        self.assertEqual(scheduler.queued, {near.id})
+
+    def test_releases_due_posts_in_batches(self):
+        """Просроченные посты выходят пачками с датой выхода."""
+        posts = [schedule(PublishSchedulerTests.author, -minutes)
+                 for minutes in range(1, 6)]
+        later = schedule(PublishSchedulerTests.author, 5)
+        version = feed_version()
+        scheduler = PublishScheduler(horizon=600, batch_size=2)
+        self.assertEqual(scheduler.run_once(), 5)
+        for post in posts:
+            post.refresh_from_db()
+            self.assertTrue(post.is_published)
+            self.assertEqual(post.pub_date, post.publish_at)
+        self.assertFalse(Post.objects.get(id=later.id).is_published)
+        self.assertEqual(scheduler.queued, {later.id})
+        self.assertGreater(feed_version(), version)
+
+    def test_release_reaches_other_processes(self):
+        """Опрос хаба в веб-процессе находит пост, выпущенный
+        планировщиком, хотя id у него старый."""
+        post = schedule(PublishSchedulerTests.author, 1)
+        newer = Post.objects.create(text='newer',
+                                    author=PublishSchedulerTests.author)
+        # Клиент уже видел самый новый пост.
+        after = release_stamp(newer.released_at)
+        feed_hub = FeedHub()
+        cursor = feed_hub.poll()
+        PublishScheduler().run_once(
+            now=timezone.now() + dt.timedelta(minutes=2))
+        feed_hub.poll(cursor)
+        channels = {author_channel(PublishSchedulerTests.author.id)}
+        self.assertEqual([post_id for _, post_id
+                          in feed_hub.collect(channels, after)], [post.id])
+        self.assertEqual(
+            [post_id for _, post_id in new_releases(
+                Post.objects.published(), after)], [post.id])
+
+    def test_late_release_reaches_other_processes(self):
+        """Пост, чей срок прошел до запуска хаба (планировщик
+        отставал), находится опросом в момент выхода."""
+        post = schedule(PublishSchedulerTests.author, -10)
+        feed_hub = FeedHub()
+        cursor = feed_hub.poll()
+        PublishScheduler().run_once()
+        feed_hub.poll(cursor)
+        channels = {author_channel(PublishSchedulerTests.author.id)}
+        self.assertEqual([post_id for _, post_id
+                          in feed_hub.collect(channels, 0)], [post.id])
+
+    def test_rescheduled_post_waits(self):
+        """Перенесенный после загрузки в кучу пост не выходит раньше."""
+        post = schedule(PublishSchedulerTests.author, 1)
+        scheduler = PublishScheduler(horizon=600)
+        scheduler.refresh(timezone.now())
+        Post.objects.filter(id=post.id).update(
+            publish_at=timezone.now() + dt.timedelta(days=1))
+        scheduler.run_once(now=timezone.now() + dt.timedelta(minutes=2))
+        self.assertFalse(Post.objects.get(id=post.id).is_published)
+
+
+class ScheduledPostViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.post = schedule(cls.author, 60, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(ScheduledPostViewsTests.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(ScheduledPostViewsTests.reader)
+
+    def test_hidden_from_feeds(self):
+        """Отложенный пост не виден в лентах."""
+        for url in (reverse('posts:index'),
+                    reverse('posts:group_posts', args=['group']),
+                    reverse('posts:profile', args=['author'])):
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertNotIn(ScheduledPostViewsTests.post,
+                                 response.context['page'])
+        post_url = reverse('posts:post', args=[
+            'author', ScheduledPostViewsTests.post.id])
+        self.assertEqual(self.reader_client.get(post_url).status_code, 404)
+
+    def test_author_sees_own_scheduled_post(self):
+        """Автор видит отложенный пост в профиле и по ссылке."""
+        response = self.author_client.get(
+            reverse('posts:profile', args=['author']))
+        self.assertIn(ScheduledPostViewsTests.post, response.context['page'])
+        self.assertEqual(response.context['posts_count'], 0)
+        self.assertContains(response, 'Будет опубликован')
+
+    def test_readers_cannot_react_or_comment(self):
+        """Реакции и комментарии к отложенному посту — только автору."""
+        args = ['author', ScheduledPostViewsTests.post.id]
+        self.assertEqual(self.reader_client.post(
+            reverse('posts:react', args=args + ['like'])).status_code, 404)
+        self.assertEqual(self.reader_client.post(
+            reverse('posts:add_comment', args=args),
+            {'text': 'рано'}).status_code, 404)
+        self.assertFalse(Reaction.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.author_client.post(reverse('posts:add_comment', args=args),
+                                {'text': 'заметка'})
+        self.assertTrue(Comment.objects.exists())
+
+    def test_new_post_with_publish_time(self):
+        """Форма создает отложенный пост и не принимает прошедшее время."""
+        url = reverse('posts:new_post')
+        future = timezone.localtime() + dt.timedelta(hours=2)
+        self.author_client.post(url, {
+            'text': 'later', 'publish_at': future.strftime('%Y-%m-%dT%H:%M')})
+        post = Post.objects.get(text='later')
+        self.assertFalse(post.is_published)
+        self.assertIsNotNone(post.publish_at)
+
+        past = timezone.localtime() - dt.timedelta(hours=2)
+        response = self.author_client.post(url, {
+            'text': 'past', 'publish_at': past.strftime('%Y-%m-%dT%H:%M')})
+        self.assertFalse(Post.objects.filter(text='past').exists())
+        self.assertContains(response, 'Время публикации уже прошло')
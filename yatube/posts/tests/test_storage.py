@@ -0,0 +1,120 @@
+import importlib
+import os
+import shutil
+import tempfile
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from ..models import MediaBlob, Post
+from ..storage import hamming, perceptual_hash
+from ..tasks import collect_media_garbage
+
+User = get_user_model()
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+# Та же картинка, но с комментарием: другие байты, тот же вид.
+SAME_LOOKING_GIF = SMALL_GIF[:-1] + b'\x21\xFE\x02hi\x00\x3B'
+
+
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+        cls.user = User.objects.create_user(username='foo')
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def create_post(self, content=SMALL_GIF, name='meme.gif'):
+        return Post.objects.create(
+            text='test',
+            author=ContentAddressedStorageTests.user,
+            image=SimpleUploadedFile(name, content, 'image/gif'),
+        )
+
+    def test_identical_uploads_share_one_file(self):
+        """Одинаковые загрузки хранятся одним файлом с учетом ссылок."""
+        first = self.create_post(name='a.gif')
+        second = self.create_post(name='b.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(MediaBlob.objects.get().refcount, 2)
+        directory = os.path.dirname(
+            os.path.join(ContentAddressedStorageTests.media_root,
+                         first.image.name))
+        self.assertEqual(len(os.listdir(directory)), 1)
+
+    def test_file_is_collected_after_last_post_deleted(self):
+        """Файл удаляется только когда на него не ссылается ни один пост."""
+        first = self.create_post()
+        second = self.create_post()
+        path = first.image.path
+
+        first.delete()
+        collect_media_garbage(grace_seconds=0)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(MediaBlob.objects.get().refcount, 1)
+
+        second.delete()
+        collect_media_garbage(grace_seconds=0)
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_grace_period_protects_released_files(self):
+        """Сборщик не трогает файлы до истечения отсрочки."""
+        post = self.create_post()
+        path = post.image.path
+        post.delete()
+        collect_media_garbage()
+        self.assertTrue(os.path.exists(path))
+
+    def test_legacy_images_are_backfilled(self):
+        """Миграция заводит MediaBlob для картинок, загруженных до
+        учета ссылок, и сборщик потом их находит."""
+        first = self.create_post()
+        self.create_post()
+        path = first.image.path
+        MediaBlob.objects.all().delete()
+        migration = importlib.import_module(
+            'posts.migrations.0026_backfill_media_blobs')
+
+        migration.backfill(apps, None)
+        migration.backfill(apps, None)
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.name, first.image.name)
+        self.assertEqual(blob.refcount, 2)
+        self.assertEqual(blob.size, len(SMALL_GIF))
+
+        Post.objects.all().delete()
+        collect_media_garbage(grace_seconds=0)
+        self.assertFalse(os.path.exists(path))
+
+    def test_perceptual_hash_ignores_metadata(self):
+        """Перцептивный хеш совпадает у картинок с одинаковым видом."""
+        first = perceptual_hash(SimpleUploadedFile('a.gif', SMALL_GIF))
+        second = perceptual_hash(
+            SimpleUploadedFile('b.gif', SAME_LOOKING_GIF))
+        self.assertEqual(hamming(first, second), 0)
+
+    @override_settings(MEDIA_PERCEPTUAL_DEDUP=True)
+    def test_near_duplicates_are_deduplicated(self):
+        """При включенной опции похожие картинки делят один файл."""
+        first = self.create_post(SMALL_GIF)
+        second = self.create_post(SAME_LOOKING_GIF)
+        self.assertEqual(first.image.name, second.image.name)
@@ -0,0 +1,129 @@
+import json
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Group, Post
+from ..streams import FeedHub, hub, post_channels, release_stamp
+
+User = get_user_model()
+
+
+class FeedHubTests(TestCase):
+    def test_wait_returns_published_posts(self):
+        """Ожидающий подписчик получает пост из своего канала."""
+        feed_hub = FeedHub()
+        threading.Timer(0.05, feed_hub.publish,
+                        args=(7, ['author:1', 'group:2'], 100)).start()
+        self.assertEqual(feed_hub.wait({'group:2'}, 0, timeout=2),
+                         [(100, 7)])
+
+    def test_wait_ignores_other_channels(self):
+        """Посты чужих каналов не будят подписчика."""
+        feed_hub = FeedHub()
+        feed_hub.publish(7, ['author:1'])
+        self.assertEqual(feed_hub.wait({'group:2'}, 0, timeout=0.05), [])
+
+    def test_duplicate_publish_is_ignored(self):
+        """Один пост из сигнала и из опроса БД учитывается один раз."""
+        feed_hub = FeedHub()
+        feed_hub.publish(7, ['author:1'], 100)
+        self.assertIsNone(feed_hub.publish(7, ['author:1'], 200))
+        self.assertEqual(feed_hub.wait({'author:1'}, 0, timeout=0),
+                         [(100, 7)])
+
+    def test_late_commit_lands_after_cursor(self):
+        """Пост, замеченный позже более нового, не теряется для
+        подписчика, уже получившего новый."""
+        feed_hub = FeedHub()
+        feed_hub.publish(8, ['author:1'], 200)
+        stamp = feed_hub.publish(7, ['author:1'], 100)
+        self.assertEqual(feed_hub.collect({'author:1'}, 200), [(stamp, 7)])
+
+
+@override_settings(STREAMS_POLL_INTERVAL=0, STREAMS_HEARTBEAT=0.05,
+                   STREAMS_MAX_DURATION=0.2, STREAMS_LONGPOLL_TIMEOUT=1,
+                   STREAMS_UNDER_WSGI=True)
+class FeedStreamViewTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(text='test', author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FeedStreamViewTests.reader)
+
+    def read_stream(self, response):
+        return ''.join(chunk.decode() for chunk in response.streaming_content)
+
+    def test_group_stream_reports_missed_posts(self):
+        """После переподключения поток сообщает о пропущенных постах."""
+        response = self.client.get(
+            reverse('posts:group_stream',
+                    kwargs={'slug': FeedStreamViewTests.group.slug}),
+            HTTP_LAST_EVENT_ID='0')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = self.read_stream(response)
+        self.assertIn('event: posts', body)
+        latest = release_stamp(FeedStreamViewTests.post.released_at)
+        self.assertIn(f'"latest": {latest}', body)
+        self.assertIn(': ping', body)
+
+    def test_follow_stream_renders_cards(self):
+        """С render=1 поток присылает готовые карточки постов."""
+        response = self.authorized_client.get(
+            reverse('posts:follow_stream'), {'after': 0, 'render': 1})
+        body = self.read_stream(response)
+        self.assertIn('event: card', body)
+        self.assertIn(f'post_{FeedStreamViewTests.post.id}', body)
+
+    def test_follow_stream_requires_login(self):
+        """Анонимный пользователь не получает поток подписок."""
+        response = self.client.get(reverse('posts:follow_stream'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_long_poll_waits_for_new_post(self):
+        """Long-poll возвращается, как только появляется новый пост."""
+        after = release_stamp(FeedStreamViewTests.post.released_at)
+        stamp = after + 10 ** 9
+        threading.Timer(
+            0.05, hub.publish,
+            args=(FeedStreamViewTests.post.id + 1000, post_channels(
+                FeedStreamViewTests.author.id, None), stamp)).start()
+        response = self.authorized_client.get(
+            reverse('posts:follow_stream'), {'poll': 1, 'after': after})
+        self.assertEqual(json.loads(self.read_stream(response)),
+                         {'count': 1, 'latest': stamp})
+
+    @override_settings(STREAMS_UNDER_WSGI=False)
+    def test_wsgi_does_not_hold_connections(self):
+        """Под WSGI плашки нет, а поток сразу отвечает 204."""
+        slug = FeedStreamViewTests.group.slug
+        page = self.client.get(reverse('posts:group_posts',
+                                       kwargs={'slug': slug}))
+        self.assertNotContains(page, 'new-posts')
+        response = self.client.get(
+            reverse('posts:group_stream', kwargs={'slug': slug}))
+        self.assertEqual(response.status_code, 204)
+
+        page = self.client.get(reverse('posts:group_posts',
+                                       kwargs={'slug': slug}),
+                               **{'yatube.asgi': True})
+        self.assertContains(page, 'new-posts')
+
+    def test_stats_for_staff(self):
+        """Число подключений доступно персоналу."""
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        response = client.get(reverse('posts:stream_stats'))
+        self.assertIn('connections', json.loads(response.content))
@@ -0,0 +1,122 @@
+import datetime as dt
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Group, GroupFollow, Post
+from ..timeline import MergedFeed
+
+User = get_user_model()
+
+
+class MergedFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.alice = User.objects.create_user(username='alice')
+        cls.bob = User.objects.create_user(username='bob')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        start = timezone.now() - dt.timedelta(days=1)
+        cls.posts = []
+        for number in range(12):
+            author = cls.alice if number % 2 else cls.bob
+            post = Post.objects.create(
+                text=str(number), author=author,
+                group=cls.group if number % 3 == 0 else None)
+            Post.objects.filter(id=post.id).update(
+                pub_date=start + dt.timedelta(minutes=number))
+            cls.posts.append(post)
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self, posts):
+        return sorted((post.id for post in posts), key=lambda pk: -pk)
+
+    def test_merge_is_ordered_and_deduplicated(self):
+        """Пост и автора, и группы попадает в ленту один раз."""
+        feed = MergedFeed([MergedFeedTests.alice.id],
+                          [MergedFeedTests.group.id])
+        wanted = [post for number, post in enumerate(MergedFeedTests.posts)
+                  if number % 2 or number % 3 == 0]
+        self.assertEqual([post.id for post in feed[0:100]],
+                         self.expected(wanted))
+        self.assertEqual(len(feed), len(wanted))
+
+    def test_warm_page_is_one_query(self):
+        """На теплом кэше — сверка голов списков (по запросу на вид
+        источника) и сама страница."""
+        MergedFeed([MergedFeedTests.alice.id],
+                   [MergedFeedTests.group.id])[0:5]
+        feed = MergedFeed([MergedFeedTests.alice.id],
+                          [MergedFeedTests.group.id])
+        with self.assertNumQueries(3):
+            self.assertEqual(len(feed[0:5]), 5)
+
+    @override_settings(FEED_SOURCE_LENGTH=3)
+    def test_truncated_sources_fall_back_to_sql(self):
+        feed = MergedFeed([MergedFeedTests.alice.id, MergedFeedTests.bob.id],
+                          [])
+        self.assertEqual([post.id for post in feed[0:12]],
+                         self.expected(MergedFeedTests.posts))
+        self.assertEqual(feed.count(), 12)
+
+    def test_new_post_resets_source(self):
+        feed = MergedFeed([MergedFeedTests.bob.id], [])
+        self.assertEqual(len(feed), 6)
+        Post.objects.create(text='new', author=MergedFeedTests.bob)
+        self.assertEqual(len(MergedFeed([MergedFeedTests.bob.id], [])), 7)
+
+    def test_post_from_other_process_is_seen(self):
+        """Сброс списка из другого процесса не дошел — свежий пост
+        находит сверка головы списка."""
+        self.assertEqual(len(MergedFeed([MergedFeedTests.bob.id], [])), 6)
+        with mock.patch('posts.timeline.invalidate'):
+            post = Post.objects.create(text='new', author=MergedFeedTests.bob)
+        feed = MergedFeed([MergedFeedTests.bob.id], [])
+        self.assertEqual(feed[0].id, post.id)
+        self.assertEqual(len(feed), 7)
+
+    def test_deleted_post_does_not_shorten_page(self):
+        feed = MergedFeed([MergedFeedTests.bob.id], [])
+        self.assertEqual(len(feed[0:3]), 3)
+        Post.objects.filter(id=MergedFeedTests.posts[8].id).update(
+            deleted_at=timezone.now())
+        feed = MergedFeed([MergedFeedTests.bob.id], [])
+        self.assertEqual([post.id for post in feed[0:3]],
+                         [MergedFeedTests.posts[number].id
+                          for number in (10, 6, 4)])
+        self.assertEqual(len(MergedFeed([MergedFeedTests.bob.id], [])), 5)
+
+
+class GroupFollowViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='user')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(text='в группе', author=cls.author,
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(GroupFollowViewsTests.user)
+
+    def test_follow_group_feeds_follow_index(self):
+        self.client.get(reverse('posts:group_follow', args=['group']))
+        self.assertTrue(GroupFollow.objects.filter(
+            user=GroupFollowViewsTests.user).exists())
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertIs(type(response.context['page']), Page)
+        self.assertEqual(list(response.context['page']),
+                         [GroupFollowViewsTests.post])
+        self.client.get(reverse('posts:group_unfollow', args=['group']))
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(len(response.context['page']), 0)
@@ -0,0 +1,146 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils.functional import cached_property
+
+from .models import Group, Post, User
+
+AUTHOR = 'author'
+GROUP = 'group'
+
+
+def source_key(kind, source_id):
+    return f'posts:source:{kind}:{source_id}'
+
+
+def source_length():
+    return getattr(settings, 'FEED_SOURCE_LENGTH', 500)
+
+
+def invalidate(author_id=None, group_ids=()):
+    """Сбрасывает списки источников, в которых пост появился или исчез."""
+    keys = [source_key(GROUP, group_id) for group_id in group_ids
+            if group_id]
+    if author_id:
+        keys.append(source_key(AUTHOR, author_id))
+    # Повторно после коммита: список, перестроенный другим воркером
+    # до коммита, не должен пережить сброс.
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def load_source(kind, source_id):
+    """Свежие (pub_date, id) источника по убыванию — по индексу
+    (author, -pub_date) или (group, -pub_date)."""
+    return list(Post.objects.published().filter(**{f'{kind}_id': source_id})
+                .order_by('-pub_date', '-id')
+                .values_list('pub_date', 'id')[:source_length()])
+
+
+def newest_ids(sources):
+    """id самого свежего поста каждого источника: запрос на вид
+    источника, в нем по подзапросу LIMIT 1 на источник по тем же
+    индексам, что и у load_source."""
+    newest = {}
+    for kind, model in ((AUTHOR, User), (GROUP, Group)):
+        ids = [pk for source_kind, pk in sources if source_kind == kind]
+        if not ids:
+            continue
+        latest = (Post.objects.published()
+                  .filter(**{f'{kind}_id': OuterRef('pk')})
+                  .order_by('-pub_date', '-id').values('id')[:1])
+        newest.update(
+            ((kind, pk), post_id) for pk, post_id in
+            model.objects.filter(pk__in=ids).order_by()
+            .annotate(newest=Subquery(latest)).values_list('pk', 'newest'))
+    return newest
+
+
+class MergedFeed:
+    """Лента из нескольких источников: авторов и групп.
+
+    У каждого источника в кэше лежит готовый список последних постов,
+    отсортированный по убыванию. Страница собирается потоковым
+    k-путевым слиянием этих списков на куче: чтобы дойти до ее конца,
+    нужно O((offset + page_size) · log k) шагов, а не соединение всех
+    подписок в SQL. Пост автора из группы, на которую тоже есть
+    подписка, приходит из двух списков подряд и пропускается.
+
+    Списки обрезаны до FEED_SOURCE_LENGTH. Слияние верно, пока не
+    кончился ни один обрезанный список; глубже лента читается
+    обычным запросом.
+
+    Сброс списков (invalidate) может не дойти из другого процесса,
+    поэтому голова каждого списка сверяется с самым свежим постом
+    источника (newest_ids), а список живет FEED_SOURCE_TIMEOUT.
+    Посты, исчезнувшие из середины списка, замечает __getitem__:
+    страница тогда читается запросом, а списки строятся заново.
+    """
+
+    def __init__(self, author_ids, group_ids):
+        self.sources = ([(AUTHOR, pk) for pk in author_ids]
+                        + [(GROUP, pk) for pk in group_ids])
+        self.queryset = (Post.objects.published()
+                         .filter(Q(author_id__in=author_ids)
+                                 | Q(group_id__in=group_ids))
+                         .select_related('author', 'group')
+                         .order_by('-pub_date', '-id'))
+
+    @cached_property
+    def lists(self):
+        keys = {source_key(*source): source for source in self.sources}
+        cached = cache.get_many(keys)
+        newest = newest_ids(self.sources)
+        lists, missing = [], {}
+        for key, source in keys.items():
+            items = cached.get(key)
+            if items is None or ((items[0][1] if items else None)
+                                 != newest.get(source)):
+                items = missing[key] = load_source(*source)
+            lists.append(items)
+        if missing:
+            cache.set_many(missing,
+                           getattr(settings, 'FEED_SOURCE_TIMEOUT', 60))
+        return lists
+
+    @cached_property
+    def horizon(self):
+        """Самая старая запись, до которой слияние еще полное."""
+        ends = [items[-1] for items in self.lists
+                if len(items) >= source_length()]
+        return max(ends) if ends else None
+
+    def ids(self):
+        previous = None
+        for item in heapq.merge(*self.lists, reverse=True):
+            if self.horizon is not None and item < self.horizon:
+                return
+            if item[1] != previous:
+                yield item[1]
+            previous = item[1]
+
+    def count(self):
+        if self.horizon is not None:
+            return self.queryset.count()
+        return len({item[1] for items in self.lists for item in items})
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop = index.start or 0, index.stop
+        ids = list(islice(self.ids(), start, stop))
+        if self.horizon is not None and len(ids) < stop - start:
+            return list(self.queryset[start:stop])
+        posts = self.queryset.in_bulk(ids)
+        if len(posts) < len(ids):
+            cache.delete_many([source_key(*source)
+                               for source in self.sources])
+            return list(self.queryset[start:stop])
+        return [posts[pk] for pk in ids]
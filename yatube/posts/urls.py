@@ -7,9 +7,18 @@ app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
     path('new/', views.new_post, name='new_post'),
+    path('group/', views.group_list, name='group_list'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
+    path('group/<slug:slug>/stream/', views.group_stream,
+         name='group_stream'),
+    path('group/<slug:slug>/follow/', views.group_follow,
+         name='group_follow'),
+    path('group/<slug:slug>/unfollow/', views.group_unfollow,
+         name='group_unfollow'),
 
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/stream/', views.follow_stream, name='follow_stream'),
+    path('streams/stats/', views.stream_stats, name='stream_stats'),
     path('<str:username>/follow/', views.profile_follow,
          name='profile_follow'),
     path('<str:username>/unfollow/', views.profile_unfollow,
@@ -19,6 +28,14 @@ urlpatterns = [
     path('<str:username>/<int:post_id>/', views.post_view, name='post'),
     path('<str:username>/<int:post_id>/edit/', views.edit_post_view,
          name='edit_post'),
+    path('<str:username>/<int:post_id>/delete/', views.delete_post,
+         name='delete_post'),
+    path('<str:username>/<int:post_id>/history/', views.post_history,
+         name='post_history'),
     path('<str:username>/<int:post_id>/comment', views.add_comment,
          name='add_comment'),
+    path('<str:username>/<int:post_id>/react/<slug:kind>/', views.react,
+         name='react'),
+    path('<str:username>/<int:post_id>/comments/<int:comment_id>/',
+         views.post_view, name='comment_thread'),
 ]
@@ -1,97 +1,213 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import (Exists, F, Func, IntegerField, OuterRef, Q,
+                              Subquery)
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from analytics.counter import record_view
+from analytics.models import POST as POST_PAGE, PROFILE as PROFILE_PAGE
+from users.lookup import get_user_or_404
 
-from .forms import CommentForm, PostForm
-from .models import Group, Post, User
+from . import (archive, feeds, groups, purge, reactions, revisions,
+               streams, timeline)
+from .forms import CommentForm, PostForm, SchedulePostForm
+from .models import (REACTION_KINDS, ArchivedComment, ArchivedPost, Comment,
+                     Follow, GroupFollow, Post, PostRevision, User)
 
 
 def paginator_page(request, posts):
     posts_per_page = 10
     paginator = Paginator(posts, posts_per_page)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    page = paginator.get_page(page_number)
+    page.object_list = reactions.attach(request.user, page.object_list)
+    return page
+
+
+def visible_post_or_404(user, author, post_id):
+    """Живой пост автора, который видит пользователь: опубликованный
+    или свой черновик."""
+    posts = Post.objects.alive().filter(Q(is_published=True)
+                                        | Q(author_id=user.id))
+    return get_object_or_404(posts, author_id=author.id, id=post_id)
+
+
+def _count(queryset):
+    return Subquery(queryset.order_by().annotate(
+        n=Func(F('id'), function='COUNT')).values('n'),
+        output_field=IntegerField())
+
+
+def author_counters(author, user):
+    """Счетчики карточки автора одним запросом вместо четырех."""
+    return User.objects.filter(pk=author.pk).values(
+        posts_count=_count(Post.objects.published().filter(
+            author=OuterRef('pk'))),
+        archived_count=_count(ArchivedPost.objects.published().filter(
+            author=OuterRef('pk'))),
+        followers_count=_count(Follow.objects.filter(author=OuterRef('pk'))),
+        following_count=_count(Follow.objects.filter(user=OuterRef('pk'))),
+        is_following=Exists(Follow.objects.filter(author=OuterRef('pk'),
+                                                  user_id=user.id)),
+    ).get()
 
 
 def index(request):
-    posts = Post.objects.all()
+    posts = archive.HotColdFeed(
+        Post.objects.published(),
+        ArchivedPost.objects.published().select_related('author', 'group'),
+        cold_key='index')
     page = paginator_page(request, posts)
-    return render(request, 'index.html', {'page': page})
+    return render(request, 'index.html',
+                  {'page': page, 'feed_version': feeds.feed_version()})
+
+
+def group_list(request):
+    paginator = Paginator(groups.directory(), 20)
+    page = paginator.get_page(request.GET.get('page'))
+    return render(request, 'groups.html', {'page': page})
 
 
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = groups.get_group_or_404(slug)
+    posts = archive.HotColdFeed(
+        group.posts.published(),
+        group.archived_posts.published().select_related('author', 'group'),
+        cold_key=f'group:{group.id}')
 
     page = paginator_page(request, posts)
 
-    context = {"group": group, "page": page}
+    context = {"group": group, "page": page,
+               "following": request.user.is_authenticated
+               and GroupFollow.objects.filter(user_id=request.user.id,
+                                              group_id=group.id).exists()}
     return render(request, "group.html", context)
 
 
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-
-    posts = author.posts.all()
-    posts_count = author.posts.count()
-    top_post = posts.first()
-
-    followers_count = author.following.count()
-    following_count = author.follower.count()
-    is_following = author.following.exists()
-
+    author = get_user_or_404(username)
+
+    counters = author_counters(author, request.user)
+    cold = author.archived_posts.published().select_related('group')
+    archived_count = counters.pop('archived_count')
+    if request.user == author:
+        # Свои отложенные посты автор видит в профиле, остальные — нет.
+        posts = archive.HotColdFeed(author.posts.alive(), cold,
+                                    cold_count=archived_count)
+    else:
+        posts = archive.HotColdFeed(author.posts.published(), cold,
+                                    hot_count=counters['posts_count'],
+                                    cold_count=archived_count)
+    counters['posts_count'] += archived_count
+    record_view(request, PROFILE_PAGE, author.id)
     page = paginator_page(request, posts)
+    if page.number == 1:
+        top_post = page.object_list[0] if page.object_list else None
+    else:
+        top_post = posts.first()
 
     context = {'author': author,
-               'posts_count': posts_count,
                'top_post': top_post,
                'page': page,
-               'followers_count': followers_count,
-               'following_count': following_count,
-               'is_following': is_following}
+               **counters}
     return render(request, 'profile.html', context)
 
 
-def post_view(request, username, post_id):
-    post = get_object_or_404(Post.objects.select_related('author'),
-                             author__username=username, id=post_id)
-    author = post.author
-    posts_count = author.posts.count()
-
-    followers_count = author.following.count()
-    following_count = author.follower.count()
-    is_following = author.following.exists()
-
-    comments = post.comments.all()
+def post_view(request, username, post_id, comment_id=None):
+    author = get_user_or_404(username)
+    post = Post.objects.alive().filter(author_id=author.id,
+                                       id=post_id).first()
+    comment_model = Comment
+    if post is None:
+        post = get_object_or_404(ArchivedPost.objects.published(),
+                                 author_id=author.id, id=post_id)
+        comment_model = ArchivedComment
+    post.author = author
+    if not post.is_published and request.user != author:
+        raise Http404
+    if comment_id is None:
+        record_view(request, POST_PAGE, post.id)
+    counters = author_counters(author, request.user)
+    counters['posts_count'] += counters.pop('archived_count')
+    reactions.attach(request.user, [post])
+
+    depth = getattr(settings, 'COMMENTS_DEPTH', 3)
+    if comment_id is None:
+        base = 0
+        comments = comment_model.objects.thread(post, max_depth=depth)
+    else:
+        root = get_object_or_404(comment_model, post=post, id=comment_id)
+        base = root.depth
+        comments = comment_model.objects.subtree(root, max_depth=depth)
+    comments = list(comments.select_related('author'))
+    for comment in comments:
+        comment.indent = (comment.depth - base) * 2
     form = CommentForm()
 
     context = {'author': author,
                'post': post,
-               'posts_count': posts_count,
                'form': form,
                'comments': comments,
+               'depth_limit': base + depth,
+               'reply_to': request.GET.get('reply', ''),
                'comment_url': reverse('posts:add_comment',
                                       kwargs={'username': author.username,
                                               'post_id': post.id}),
-               'followers_count': followers_count,
-               'following_count': following_count,
-               'is_following': is_following
-               }
+               **counters}
     return render(request, 'post.html', context)
 
 
+def post_history(request, username, post_id):
+    author = get_user_or_404(username)
+    post = Post.objects.alive().filter(author_id=author.id,
+                                       id=post_id).first()
+    if post is None:
+        post = get_object_or_404(ArchivedPost.objects.published(),
+                                 author_id=author.id, id=post_id)
+    post.author = author
+    if not post.is_published and request.user != author:
+        raise Http404
+    versions = list(PostRevision.objects.filter(post_id=post.id)
+                    .values_list('number', 'replaced_at'))
+    number = request.GET.get('version', '')
+    text = None
+    if number.isdigit():
+        text = revisions.rebuild(post, int(number))
+        if text is None:
+            raise Http404
+    context = {'author': author,
+               'post': post,
+               'versions': versions,
+               'current': int(number) if text is not None else None,
+               'text': text}
+    return render(request, 'post_history.html', context)
+
+
 @login_required()
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
-    if form.is_valid():
+    schedule_form = SchedulePostForm(request.POST or None)
+    if form.is_valid() and schedule_form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
+        publish_at = schedule_form.cleaned_data['publish_at']
+        if publish_at:
+            post.publish_at = publish_at
+            post.is_published = False
         post.save()
         return redirect('posts:index')
 
     form = PostForm()
-    return render(request, 'post_form.html', {'form': form})
+    return render(request, 'post_form.html',
+                  {'form': form, 'schedule_form': schedule_form})
 
 
 @login_required()
@@ -99,9 +215,8 @@ def edit_post_view(request, username, post_id):
     if request.user.username != username:
         return redirect('posts:post', username=username, post_id=post_id)
 
-    original_post = (Post.objects.select_related('author')
-                     .filter(author__username=username,
-                     id=post_id).first())
+    original_post = get_object_or_404(Post.objects.alive(),
+                                      author_id=request.user.id, id=post_id)
 
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
@@ -121,18 +236,51 @@ def edit_post_view(request, username, post_id):
 
 @login_required()
 def add_comment(request, username, post_id):
+    visible_post_or_404(request.user, get_user_or_404(username), post_id)
     form = CommentForm(request.POST or None)
     if form.is_valid():
         comment = form.save(commit=False)
+        parent_id = request.POST.get('parent', '')
+        if parent_id:
+            # Отвечать можно только на комментарии к этому же посту.
+            comment.parent = Comment.objects.filter(
+                id=parent_id if parent_id.isdigit() else None,
+                post_id=post_id, deleted_at=None).first()
+            if comment.parent is None:
+                return redirect('posts:post', username=username,
+                                post_id=post_id)
         comment.post_id = post_id
         comment.author = request.user
         comment.save()
     return redirect('posts:post', username=username, post_id=post_id)
 
 
+@login_required
+@require_POST
+def delete_post(request, username, post_id):
+    post = get_object_or_404(Post.objects.alive(), author_id=request.user.id,
+                             id=post_id)
+    purge.delete_post(post)
+    return redirect('posts:profile', username=request.user.username)
+
+
+@login_required
+@require_POST
+def react(request, username, post_id, kind):
+    if kind not in dict(REACTION_KINDS):
+        return redirect('posts:post', username=username, post_id=post_id)
+    post = visible_post_or_404(request.user, get_user_or_404(username),
+                               post_id)
+    reactions.toggle(request.user, post.id, kind)
+    return redirect(request.META.get('HTTP_REFERER',
+                                     reverse('posts:post',
+                                             kwargs={'username': username,
+                                                     'post_id': post_id})))
+
+
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(username)
     if (author == request.user
        or author.following.filter(user_id=request.user.id).exists()):
         return redirect(request.META.get('HTTP_REFERER',
@@ -146,20 +294,108 @@ def profile_follow(request, username):
 
 @login_required
 def profile_unfollow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_user_or_404(username)
     following = author.following.filter(user_id=request.user.id)
     following.delete()
     return redirect(request.META.get('HTTP_REFERER',
                                      reverse('posts:index')))
 
 
+@login_required
+def group_follow(request, slug):
+    group = groups.get_group_or_404(slug)
+    GroupFollow.objects.get_or_create(user_id=request.user.id,
+                                      group_id=group.id)
+    return redirect(request.META.get('HTTP_REFERER',
+                                     reverse('posts:group_posts',
+                                             args=[slug])))
+
+
+@login_required
+def group_unfollow(request, slug):
+    group = groups.get_group_or_404(slug)
+    GroupFollow.objects.filter(user_id=request.user.id,
+                               group_id=group.id).delete()
+    return redirect(request.META.get('HTTP_REFERER',
+                                     reverse('posts:group_posts',
+                                             args=[slug])))
+
+
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page = paginator_page(request, posts)
+    authors = sorted(Follow.objects.filter(user=request.user).values_list(
+        'author_id', flat=True))
+    group_ids = sorted(GroupFollow.objects.filter(
+        user=request.user).values_list('group_id', flat=True))
+    sources = hashlib.md5(f'{authors}:{group_ids}'.encode()).hexdigest()
+    feed = archive.HotColdFeed(
+        timeline.MergedFeed(authors, group_ids),
+        ArchivedPost.objects.published().filter(
+            Q(author_id__in=authors) | Q(group_id__in=group_ids)
+        ).select_related('author', 'group'),
+        cold_key=f'follow:{sources}')
+    page = paginator_page(request, feed)
     return render(request, "follow.html", {'page': page})
 
 
+def feed_stream(request, feed, channels, posts):
+    if not streams.live_updates(request):
+        # 204 останавливает переподключения EventSource.
+        return HttpResponse(status=204)
+    after = (request.GET.get('after')
+             or request.META.get('HTTP_LAST_EVENT_ID'))
+    # Курсор — момент выхода (streams.release_stamp), а не id поста.
+    if after and after.isdigit():
+        after = int(after)
+    else:
+        after = streams.release_stamp(timezone.now())
+
+    if request.GET.get('poll'):
+        new = streams.new_releases(posts, after)
+        if new:
+            return HttpResponse(streams.poll_result(new, after),
+                                content_type='application/json')
+        timeout = getattr(settings, 'STREAMS_LONGPOLL_TIMEOUT', 25)
+        return streams.stream_response(
+            streams.long_poll(feed, channels, after, timeout),
+            streams.long_poll_async(feed, channels, after, timeout),
+            'application/json')
+
+    channels = set(channels)
+    render_cards = bool(request.GET.get('render'))
+    return streams.stream_response(
+        streams.sse_events(request, feed, channels, posts, after,
+                           render=render_cards),
+        streams.sse_events_async(request, feed, channels, posts, after,
+                                 render=render_cards),
+        'text/event-stream')
+
+
+@login_required
+def follow_stream(request):
+    authors = list(Follow.objects.filter(
+        user=request.user).values_list('author_id', flat=True))
+    group_ids = list(GroupFollow.objects.filter(
+        user=request.user).values_list('group_id', flat=True))
+    channels = ({streams.author_channel(author) for author in authors}
+                | {streams.group_channel(group) for group in group_ids})
+    posts = Post.objects.published().filter(
+        Q(author_id__in=authors) | Q(group_id__in=group_ids))
+    return feed_stream(request, 'follow', channels, posts)
+
+
+def group_stream(request, slug):
+    group = groups.get_group_or_404(slug)
+    return feed_stream(request, 'group',
+                       {streams.group_channel(group.id)},
+                       group.posts.published())
+
+
+@staff_member_required
+def stream_stats(request):
+    return JsonResponse(streams.hub.stats())
+
+
 def page_not_found(request, exception):
     return render(
         request,
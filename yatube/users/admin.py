@@ -0,0 +1,30 @@
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
+
+from posts import purge
+
+User = get_user_model()
+
+
+class BackgroundDeleteUserAdmin(UserAdmin):
+    """Удаление пользователя без синхронного каскада.
+
+    Пользователь сразу выключается, а его посты и комментарии
+    скрываются; строки удаляет posts.purge в фоне. Страница
+    подтверждения поэтому не собирает список связанных объектов.
+    """
+
+    def get_deleted_objects(self, objs, request):
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        purge.delete_user(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            purge.delete_user(user)
+
+
+admin.site.unregister(User)
+admin.site.register(User, BackgroundDeleteUserAdmin)
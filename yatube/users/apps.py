@@ -3,3 +3,14 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .validators import get_password_list
+
+        # Открываем список до форка воркеров, чтобы первая регистрация
+        # не платила за его загрузку.
+        try:
+            get_password_list()
+        except (OSError, ValueError):
+            pass
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+
+from posts.models import Tombstone
+
+User = get_user_model()
+
+# Поля, которых хватает страницам автора; остальные догрузятся лениво.
+SUMMARY_FIELDS = ('id', 'username', 'first_name', 'last_name')
+MISSING = 0
+
+
+def username_key(username):
+    return f'users:username:{username}'
+
+
+def invalidate_username(username):
+    if username:
+        cache.delete(username_key(username))
+
+
+def user_summary(username):
+    """Сводка пользователя по имени из кэша или None.
+
+    Неизвестные имена тоже кэшируются, но ненадолго: боты, которые
+    перебирают профили, получают 404 без запроса к auth_user, а
+    только что зарегистрированный пользователь сбрасывает свою
+    отрицательную запись сигналом.
+    """
+    key = username_key(username)
+    summary = cache.get(key)
+    if summary is None:
+        # Удаленного (posts.purge) не показываем еще до очистки, а
+        # просто неактивного — показываем.
+        deleted = Tombstone.objects.filter(kind=Tombstone.USER)
+        summary = (User.objects.filter(username=username)
+                   .exclude(id__in=deleted.values('object_id'))
+                   .values_list(*SUMMARY_FIELDS).first() or MISSING)
+        timeout = (getattr(settings, 'USERS_SUMMARY_TIMEOUT', 300) if summary
+                   else getattr(settings, 'USERS_MISSING_TIMEOUT', 60))
+        cache.set(key, summary, timeout)
+    return summary or None
+
+
+def get_user_or_404(username):
+    """Пользователь по имени без запроса к БД на теплом кэше.
+
+    Возвращается экземпляр с загруженными SUMMARY_FIELDS, как после
+    ``only()``: связи и сравнение по pk работают как обычно.
+    """
+    summary = user_summary(username)
+    if summary is None:
+        raise Http404('Пользователь не найден')
+    return User.from_db(DEFAULT_DB_ALIAS, SUMMARY_FIELDS, summary)
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.contrib.auth import password_validation
+from django.core.management.base import BaseCommand
+
+from users.validators import build_password_file
+
+
+class Command(BaseCommand):
+    help = ('Собирает отсортированный список распространенных паролей '
+            'для CommonPasswordValidator')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sources', nargs='*',
+            help='Текстовые или .gz файлы, по одному паролю в строке')
+        parser.add_argument('--output',
+                            default=settings.COMMON_PASSWORDS_FILE)
+
+    def handle(self, *args, **options):
+        sources = options['sources'] or [str(
+            password_validation.CommonPasswordValidator
+            .DEFAULT_PASSWORD_LIST_PATH)]
+        count = build_password_file(sources, options['output'])
+        self.stdout.write(f'Записано паролей: {count}')
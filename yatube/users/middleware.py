@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+
+def user_key(user_id):
+    return f'users:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(user_key(user_id))
+
+
+def get_user(request):
+    """Как django.contrib.auth.get_user, но пользователь — из кэша.
+
+    Запись сбрасывается сигналом при любом сохранении пользователя
+    (профиль, пароль, last_login), а хэш пароля в сессии по-прежнему
+    сверяется на каждом запросе, так что смена пароля разлогинивает
+    остальные сессии сразу. USERS_CACHE_TIMEOUT = 0 выключает кэш:
+    без общего кэша сброс не дошел бы до других процессов.
+    """
+    try:
+        user_id = auth._get_user_session_key(request)
+        backend_path = request.session[auth.BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    timeout = getattr(settings, 'USERS_CACHE_TIMEOUT', 300)
+    user = cache.get(user_key(user_id)) if timeout else None
+    if user is None:
+        user = auth.load_backend(backend_path).get_user(user_id)
+        if user is None:
+            return AnonymousUser()
+        if timeout:
+            cache.set(user_key(user_id), user, timeout)
+    session_hash = request.session.get(auth.HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(
+            session_hash, user.get_session_auth_hash())):
+        request.session.flush()
+        return AnonymousUser()
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """AuthenticationMiddleware без запроса к auth_user на теплом кэше."""
+
+    def process_request(self, request):
+        request.user = SimpleLazyObject(lambda: get_user(request))
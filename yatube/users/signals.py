@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .lookup import invalidate_username
+from .middleware import invalidate_user
+
+User = get_user_model()
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    instance._saved_username = instance.__dict__.get('username')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+    # И прежнее имя, и новое: новое могло быть закэшировано как
+    # несуществующее.
+    invalidate_username(instance._saved_username)
+    invalidate_username(instance.__dict__.get('username'))
+    instance._saved_username = instance.__dict__.get('username')
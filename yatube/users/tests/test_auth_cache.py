@@ -0,0 +1,72 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+User = get_user_model()
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    USERS_CACHE_TIMEOUT=300)
+class CachedAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader',
+                                             password='secret-pass')
+        self.client = Client()
+        self.client.login(username='reader', password='secret-pass')
+        self.url = reverse('posts:follow_index')
+
+    def auth_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries
+                if 'django_session' in query['sql']
+                or 'FROM "auth_user" WHERE "auth_user"."id"' in query['sql']]
+
+    def test_warm_feed_needs_no_auth_queries(self):
+        """На теплом кэше ни сессия, ни пользователь не читаются из БД."""
+        self.auth_queries()
+        self.assertEqual(self.auth_queries(), [])
+
+    def test_profile_change_invalidates(self):
+        self.auth_queries()
+        self.user.first_name = 'Имя'
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['user'].first_name, 'Имя')
+
+    def test_password_change_logs_out(self):
+        self.auth_queries()
+        self.user.set_password('another-pass')
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db',
+                   USERS_CACHE_TIMEOUT=0)
+class ProcessCacheAuthTests(TestCase):
+    """Без общего кэша доступ отзывается сразу, даже если сброс кэша
+    в этот процесс не пришел."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reader',
+                                             password='secret-pass')
+        self.client = Client()
+        self.client.login(username='reader', password='secret-pass')
+        self.url = reverse('posts:follow_index')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_deactivation_revokes_access(self):
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_logout_elsewhere_revokes_session(self):
+        Session.objects.all().delete()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
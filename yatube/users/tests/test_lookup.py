@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.http import Http404
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..lookup import get_user_or_404, user_summary
+
+User = get_user_model()
+
+
+class UsernameLookupTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='author',
+                                             first_name='Имя')
+
+    def test_warm_lookup_skips_db(self):
+        user_summary('author')
+        with self.assertNumQueries(0):
+            author = get_user_or_404('author')
+        self.assertEqual(author, self.user)
+        self.assertEqual(author.first_name, 'Имя')
+
+    def test_unknown_username_is_cached(self):
+        """Перебор несуществующих имен не ходит в БД повторно."""
+        with self.assertRaises(Http404):
+            get_user_or_404('ghost')
+        with self.assertNumQueries(0), self.assertRaises(Http404):
+            get_user_or_404('ghost')
+        User.objects.create_user(username='ghost')
+        self.assertEqual(get_user_or_404('ghost').username, 'ghost')
+
+    def test_rename_invalidates(self):
+        user_summary('author')
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertIsNone(user_summary('author'))
+        self.assertEqual(user_summary('renamed')[0], self.user.id)
+
+    def test_post_page_skips_user_lookup(self):
+        post = Post.objects.create(text='text', author=self.user)
+        url = reverse('posts:post', args=['author', post.id])
+        Client().get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = Client().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query['sql'] for query in queries
+                          if '"auth_user"."username" =' in query['sql']])
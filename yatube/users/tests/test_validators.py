@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model, password_validation
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from ..validators import (CommonPasswordValidator,
+                          UserAttributeSimilarityValidator,
+                          build_password_file, get_password_list)
+
+User = get_user_model()
+
+
+class CommonPasswordValidatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        source = os.path.join(cls.tmpdir.name, 'source.txt')
+        with open(source, 'w') as f:
+            f.write('Zebra\napple\n\nmango\napple\n')
+        cls.path = os.path.join(cls.tmpdir.name, 'passwords.txt')
+        build_password_file([source], cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def test_built_file_is_sorted_and_unique(self):
+        """Собранный файл отсортирован, без повторов и в нижнем регистре."""
+        with open(CommonPasswordValidatorTests.path) as f:
+            self.assertEqual(f.read().split('\n'),
+                             ['apple', 'mango', 'zebra'])
+
+    def test_mmap_lookup(self):
+        """Бинарный поиск по файлу находит все пароли и только их."""
+        passwords = get_password_list(CommonPasswordValidatorTests.path)
+        for password in ('apple', 'mango', 'zebra'):
+            with self.subTest(password=password):
+                self.assertIn(password, passwords)
+        for password in ('', 'a', 'banana', 'zzz', 'appl'):
+            with self.subTest(password=password):
+                self.assertNotIn(password, passwords)
+
+    def test_empty_file(self):
+        path = os.path.join(CommonPasswordValidatorTests.tmpdir.name,
+                            'empty.txt')
+        open(path, 'w').close()
+        self.assertNotIn('apple', get_password_list(path))
+
+    def test_validator_rejects_common_password(self):
+        """Валидатор отклоняет пароль из списка."""
+        validator = CommonPasswordValidator(CommonPasswordValidatorTests.path)
+        with self.assertRaises(ValidationError):
+            validator.validate('Mango')
+        validator.validate('papaya-42')
+
+    def test_default_list_matches_django(self):
+        """Без собранного файла проверка совпадает со встроенной."""
+        ours = CommonPasswordValidator(
+            password_validation.CommonPasswordValidator
+            .DEFAULT_PASSWORD_LIST_PATH)
+        theirs = password_validation.CommonPasswordValidator()
+        for password in ('password', 'qwerty', 'correct-horse-staple'):
+            with self.subTest(password=password):
+                self.assertEqual(password in ours.passwords,
+                                 password in theirs.passwords)
+
+
+class UserAttributeSimilarityValidatorTests(TestCase):
+    def test_matches_django_validator(self):
+        """Быстрая проверка дает тот же результат, что и встроенная."""
+        user = User(username='testclient', first_name='Test',
+                    last_name='Client', email='testclient@example.com')
+        ours = UserAttributeSimilarityValidator()
+        theirs = password_validation.UserAttributeSimilarityValidator()
+        for password in ('testclient', 'example.com', 'tneilctset',
+                         'completely-unrelated', 'client123'):
+            with self.subTest(password=password):
+                try:
+                    theirs.validate(password, user)
+                except ValidationError:
+                    with self.assertRaises(ValidationError):
+                        ours.validate(password, user)
+                else:
+                    ours.validate(password, user)
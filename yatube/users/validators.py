@@ -0,0 +1,149 @@
+import gzip
+import mmap
+import os
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import password_validation
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.utils.translation import gettext as _
+
+_lists = {}
+_lock = threading.Lock()
+
+
+class SortedPasswordFile:
+    """Отсортированный файл паролей (по одному в строке), открытый
+    через mmap.
+
+    Поиск идет бинарным поиском прямо по отображенным страницам, так что
+    список на миллионы строк не занимает память процесса, а сами страницы
+    делятся между всеми воркерами через page cache.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            # Пустой файл отобразить нельзя: mmap требует ненулевой длины.
+            if os.fstat(f.fileno()).st_size == 0:
+                self.mm = b''
+            else:
+                self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, password):
+        key = password.encode()
+        mm = self.mm
+        lo, hi = 0, len(mm)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = mm.rfind(b'\n', 0, mid) + 1
+            end = mm.find(b'\n', start)
+            if end == -1:
+                end = len(mm)
+            line = mm[start:end]
+            if line == key:
+                return True
+            if line < key:
+                lo = end + 1
+            else:
+                hi = start
+        return False
+
+
+class SortedPasswordList:
+    """Запасной вариант для сжатого списка: отсортированный список
+    в памяти вместо множества."""
+
+    def __init__(self, path):
+        with gzip.open(path) as f:
+            self.items = sorted(
+                {line.strip() for line in f.read().decode().splitlines()})
+
+    def __contains__(self, password):
+        i = bisect_left(self.items, password)
+        return i < len(self.items) and self.items[i] == password
+
+
+def get_password_list(path=None):
+    """Возвращает общий для процесса список паролей, загружая его
+    один раз."""
+    if path is None:
+        path = getattr(settings, 'COMMON_PASSWORDS_FILE', None)
+        if not path or not os.path.exists(path):
+            # Список еще не собран командой build_password_list.
+            path = (password_validation.CommonPasswordValidator
+                    .DEFAULT_PASSWORD_LIST_PATH)
+    path = str(path)
+    if path not in _lists:
+        with _lock:
+            if path not in _lists:
+                if path.endswith('.gz'):
+                    _lists[path] = SortedPasswordList(path)
+                else:
+                    _lists[path] = SortedPasswordFile(path)
+    return _lists[path]
+
+
+def build_password_file(sources, output):
+    """Собирает из текстовых или .gz списков один отсортированный файл
+    без повторов в нижнем регистре."""
+    passwords = set()
+    for source in sources:
+        opener = gzip.open if source.endswith('.gz') else open
+        with opener(source, 'rb') as f:
+            for line in f:
+                password = line.decode(errors='ignore').strip().lower()
+                if password:
+                    passwords.add(password.encode())
+    tmp = f'{output}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(b'\n'.join(sorted(passwords)))
+    os.replace(tmp, output)
+    return len(passwords)
+
+
+class CommonPasswordValidator(password_validation.CommonPasswordValidator):
+    def __init__(self, password_list_path=None):
+        self.passwords = get_password_list(password_list_path)
+
+
+def _exceeds_similarity(password, counts, part, max_similarity):
+    # quick_ratio() из SequenceMatcher без построения индекса b2j:
+    # сначала дешевая оценка по длинам, затем пересечение мультимножеств.
+    total = len(password) + len(part)
+    if 2 * min(len(password), len(part)) < max_similarity * total:
+        return False
+    matches = sum((counts & Counter(part)).values())
+    return 2 * matches >= max_similarity * total
+
+
+class UserAttributeSimilarityValidator(
+        password_validation.UserAttributeSimilarityValidator):
+    def validate(self, password, user=None):
+        if not user:
+            return
+
+        password = password.lower()
+        counts = Counter(password)
+        for attribute_name in self.user_attributes:
+            value = getattr(user, attribute_name, None)
+            if not value or not isinstance(value, str):
+                continue
+            value_lower = value.lower()
+            value_parts = set(re.split(r'\W+', value_lower) + [value_lower])
+            for value_part in value_parts:
+                if not _exceeds_similarity(password, counts, value_part,
+                                           self.max_similarity):
+                    continue
+                try:
+                    verbose_name = str(
+                        user._meta.get_field(attribute_name).verbose_name)
+                except FieldDoesNotExist:
+                    verbose_name = attribute_name
+                raise ValidationError(
+                    _('The password is too similar to the %(verbose_name)s.'),
+                    code='password_too_similar',
+                    params={'verbose_name': verbose_name},
+                )
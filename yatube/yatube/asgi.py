@@ -0,0 +1,25 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+Django 2.2 has no ASGI support of its own, so ``yatube.handlers.AsgiHandler``
+runs the regular WSGI handler in a thread pool and keeps slow clients and
+feed streams on the event loop. Serve it with any ASGI server, e.g.
+``uvicorn yatube.asgi:application``.
+"""
+
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+from yatube.handlers import AsgiHandler
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = AsgiHandler(get_wsgi_application())
+
+# Просмотры сводит в БД фоновый поток процесса, а не запросы.
+from analytics.counter import counter  # noqa: E402
+
+counter.start()
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Бэкенды, которые каждый процесс держит у себя.
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Счетчики непрочитанного, версии кэшей, сессии и лимиты должны
+    быть общими для всех процессов, иначе каждый видит свои."""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in LOCAL_CACHES:
+        return []
+    return [Error(
+        f'Кэш default ({backend}) не общий для процессов.',
+        hint='Задайте MEMCACHED_LOCATION.',
+        id='yatube.E001',
+    )]
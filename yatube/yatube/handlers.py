@@ -0,0 +1,178 @@
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.http.response import HttpResponseBase
+
+BODY_SPOOL_SIZE = 1024 * 1024
+
+
+class AsgiHandler:
+    """ASGI-приложение поверх WSGI-обработчика Django.
+
+    Django 2.2 не умеет асинхронных представлений, поэтому они
+    выполняются в ограниченном пуле потоков, а все ожидание остается
+    на event loop: тело запроса читается до передачи в пул, ответ
+    медленному клиенту отправляется уже без потока, а ответы с
+    ``async_streaming_content`` (SSE и long-poll из posts.streams)
+    ждут новых постов, не занимая поток вовсе.
+    """
+
+    def __init__(self, wsgi_app, max_workers=None):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(
+            max_workers or getattr(settings, 'ASGI_THREADS', 16),
+            thread_name_prefix='asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported ASGI scope type {scope["type"]}')
+
+        loop = asyncio.get_running_loop()
+        # Через пул по умолчанию ходят в БД и асинхронные генераторы.
+        loop.set_default_executor(self.executor)
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        try:
+            status, headers, response = await loop.run_in_executor(
+                self.executor, self.call_app, self.environ(scope, body))
+            try:
+                await send({'type': 'http.response.start',
+                            'status': status, 'headers': headers})
+                if getattr(response, 'async_streaming_content', None):
+                    await self.send_async(response, receive, send)
+                else:
+                    await self.send_sync(response, send)
+            finally:
+                if hasattr(response, 'close'):
+                    await loop.run_in_executor(self.executor,
+                                               response.close)
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = tempfile.SpooledTemporaryFile(max_size=BODY_SPOOL_SIZE)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        body.seek(0)
+        return body
+
+    def environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode().decode(
+                'latin1'),
+            'PATH_INFO': scope['path'].encode().decode('latin1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+            # Представления узнают, что ожидание не займет поток.
+            'yatube.asgi': True,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin1').upper().replace('-', '_')
+            if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+                name = f'HTTP_{name}'
+            value = value.decode('latin1')
+            if name in environ:
+                # HTTP/2 шлет куки отдельными заголовками, а склеиваются
+                # они через '; ', не через запятую (RFC 7540, 8.1.2.5).
+                separator = '; ' if name == 'HTTP_COOKIE' else ','
+                value = f'{environ[name]}{separator}{value}'
+            environ[name] = value
+        # Тело уже прочитано целиком, chunked-запросам нужна длина.
+        body.seek(0, 2)
+        environ.setdefault('CONTENT_LENGTH', str(body.tell()))
+        body.seek(0)
+        return environ
+
+    def call_app(self, environ):
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers]
+
+        response = self.wsgi_app(environ, start_response)
+        return started['status'], started['headers'], response
+
+    async def send_sync(self, response, send):
+        if isinstance(response, HttpResponseBase) and not response.streaming:
+            body = b''.join(response)
+        else:
+            # Файлы и генераторы читаем в пуле, отправляем без него.
+            loop = asyncio.get_running_loop()
+            iterator = iter(response)
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next,
+                                                   iterator, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body',
+                                'body': chunk, 'more_body': True})
+            body = b''
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def send_async(self, response, receive, send):
+        stream = response.async_streaming_content
+
+        async def pump():
+            async for chunk in stream:
+                await send({'type': 'http.response.body',
+                            'body': response.make_bytes(chunk),
+                            'more_body': True})
+            await send({'type': 'http.response.body', 'body': b''})
+
+        async def disconnected():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        pumping = asyncio.ensure_future(pump())
+        watching = asyncio.ensure_future(disconnected())
+        try:
+            await asyncio.wait({pumping, watching},
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (pumping, watching):
+                task.cancel()
+            await asyncio.gather(pumping, watching, return_exceptions=True)
+            await stream.aclose()
+        if pumping.done() and not pumping.cancelled():
+            pumping.result()
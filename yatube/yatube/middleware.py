@@ -0,0 +1,102 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+SHORT_LIVED = 'public, max-age=60'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        if params.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def if_none_match(request):
+    """ETag из If-None-Match; слабое сравнение, как требует RFC 7232."""
+    header = request.META.get('HTTP_IF_NONE_MATCH', '')
+    return {tag.strip().replace('W/', '', 1) for tag in header.split(',')}
+
+
+class StaticFile:
+    def __init__(self, url_path, path):
+        stat = os.stat(path)
+        self.path = path
+        self.content_type = (mimetypes.guess_type(path)[0]
+                             or 'application/octet-stream')
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.last_modified = http_date(stat.st_mtime)
+        self.cache_control = (IMMUTABLE if HASHED_NAME.search(url_path)
+                              else SHORT_LIVED)
+        self.variants = [(coding, path + suffix)
+                         for coding, suffix in ENCODINGS
+                         if os.path.isfile(path + suffix)]
+
+    def respond(self, request):
+        accepted = accepted_encodings(request)
+        path, encoding, etag = self.path, None, self.etag
+        for coding, variant in self.variants:
+            if coding in accepted:
+                # У каждой копии свой ETag: сжатое тело не должно
+                # подтверждаться клиенту, который его не просил.
+                path, encoding = variant, coding
+                etag = f'{self.etag[:-1]}-{coding}"'
+                break
+        if etag in if_none_match(request):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'),
+                                    content_type=self.content_type)
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Last-Modified'] = self.last_modified
+        response['ETag'] = etag
+        response['Cache-Control'] = self.cache_control
+        if self.variants:
+            response['Vary'] = 'Accept-Encoding'
+        return response
+
+
+class StaticFilesMiddleware:
+    """Отдает собранную статику из STATIC_ROOT до разрешения URL.
+
+    Файлы не сжимаются на лету: выбирается заранее подготовленная
+    ``CompressedManifestStaticFilesStorage`` копия под Accept-Encoding.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self.files = {}
+
+    def __call__(self, request):
+        if (self.root and request.method in ('GET', 'HEAD')
+                and request.path_info.startswith(self.prefix)):
+            static_file = self.find(request.path_info[len(self.prefix):])
+            if static_file is not None:
+                return static_file.respond(request)
+        return self.get_response(request)
+
+    def find(self, url_path):
+        if url_path not in self.files:
+            try:
+                path = safe_join(self.root, url_path)
+            except ValueError:
+                return None
+            if not os.path.isfile(path):
+                # Неизвестные пути не запоминаем, чтобы не раздувать кэш.
+                return None
+            self.files[url_path] = StaticFile(url_path, path)
+        return self.files[url_path]
@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_count(model, using='default'):
+    """Число строк таблицы по статистике СУБД, без прохода по ней.
+
+    SQLite берет его из sqlite_stat1 (после ANALYZE), а без статистики —
+    из разброса rowid: архив уносит самые старые строки, так что
+    MAX - MIN + 1 почти не завышает; PostgreSQL — из pg_class.reltuples.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [table])
+            row = cursor.fetchone()
+            return max(row[0], 0) if row else 0
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")
+            if cursor.fetchone():
+                cursor.execute(
+                    'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+                stats = [int(stat.split()[0]) for stat, in cursor.fetchall()]
+                if stats:
+                    return max(stats)
+        pk = model._meta.pk.column
+        cursor.execute(f'SELECT MIN({pk}), MAX({pk}) FROM {table}')
+        low, high = cursor.fetchone()
+        return high - low + 1 if high is not None else 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор админки с ограниченной стоимостью подсчета.
+
+    COUNT упирается в ADMIN_COUNT_LIMIT: список короче границы
+    считается точно. Длиннее — для нефильтрованного списка число строк
+    оценивается по статистике таблицы (но не меньше границы), а для
+    отфильтрованного страницы дальше границы не показываются.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        limit = getattr(settings, 'ADMIN_COUNT_LIMIT', 10000)
+        counted = queryset.order_by()[:limit].count()
+        if counted < limit or queryset.query.where:
+            return counted
+        return max(estimated_count(queryset.model, queryset.db), limit)
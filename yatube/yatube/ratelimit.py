@@ -0,0 +1,183 @@
+import functools
+import ipaddress
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+DEFAULT_METHODS = ('POST',)
+
+
+def parse_rate(rate):
+    """'5/m' -> (5, 60), '20/10m' -> (20, 600): емкость и период."""
+    count, _, period = rate.partition('/')
+    return int(count), int(period[:-1] or 1) * PERIODS[period[-1]]
+
+
+@functools.lru_cache(maxsize=None)
+def _networks(proxies):
+    return [ipaddress.ip_network(proxy, strict=False) for proxy in proxies]
+
+
+def _is_trusted(address, networks):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_ip(request):
+    """Адрес клиента.
+
+    Если запрос пришел от прокси из TRUSTED_PROXIES, адрес берется из
+    X-Forwarded-For: первый справа, который не принадлежит доверенным
+    прокси. Левее него клиент может дописать что угодно.
+    """
+    address = request.META.get('REMOTE_ADDR', '')
+    networks = _networks(tuple(getattr(settings, 'TRUSTED_PROXIES', ())))
+    if not _is_trusted(address, networks):
+        return address
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+    for hop in reversed([hop.strip() for hop in forwarded.split(',')]):
+        if not hop:
+            continue
+        address = hop
+        if not _is_trusted(hop, networks):
+            break
+    return address
+
+
+class TokenBucket:
+    """Ведро на ``capacity`` токенов, наполняющееся за ``period`` секунд.
+
+    Состояние лежит в общем кэше двумя ключами: когда ведро заведено
+    и сколько токенов из него с тех пор взято. К моменту ``now``
+    выдано может быть ``capacity + rate * (now - start)`` токенов,
+    поэтому проверка — это один атомарный ``incr`` без блокировок
+    между процессами. Запас, накопившийся сверх емкости, пока ведро
+    простаивало полным, списывается тем же ``incr``. С кэшем в памяти
+    процесса ведро у каждого процесса свое и лимит умножается на их
+    число, поэтому check --deploy требует общий кэш (yatube.checks).
+    """
+
+    def __init__(self, key, capacity, period):
+        self.start_key = f'ratelimit:{key}:start'
+        self.used_key = f'ratelimit:{key}:used'
+        self.capacity = capacity
+        self.rate = capacity / period
+        # Через period простоя ведро и так полное: ключи можно забыть.
+        self.timeout = period + 1
+
+    def consume(self, now=None):
+        """Берет токен; возвращает 0 или через сколько секунд повторить."""
+        now = time.time() if now is None else now
+        start = cache.get(self.start_key)
+        if start is None:
+            cache.add(self.used_key, 0, self.timeout)
+            cache.add(self.start_key, now, self.timeout)
+            start = cache.get(self.start_key, now)
+        try:
+            used = cache.incr(self.used_key)
+        except ValueError:
+            # Ключ вытеснили между get и incr: считаем ведро новым.
+            cache.set(self.used_key, 1, self.timeout)
+            used = 1
+        allowed = self.capacity + self.rate * (now - start)
+        overflow = int(allowed - (used - 1) - self.capacity)
+        if overflow > 0:
+            used = cache.incr(self.used_key, overflow)
+        if used > allowed:
+            cache.decr(self.used_key)
+            return (used - allowed) / self.rate
+        cache.touch(self.start_key, self.timeout)
+        cache.touch(self.used_key, self.timeout)
+        return 0
+
+
+def buckets(request, view_name, limits):
+    """Ведра, через которые проходит запрос: по пользователю и по IP."""
+    if 'user' in limits and request.user.is_authenticated:
+        yield TokenBucket(f'{view_name}:user:{request.user.id}',
+                          *parse_rate(limits['user']))
+    if 'ip' in limits:
+        yield TokenBucket(f'{view_name}:ip:{client_ip(request)}',
+                          *parse_rate(limits['ip']))
+
+
+def too_many_requests(retry_after, status=429):
+    response = HttpResponse('Слишком много запросов, повторите позже.',
+                            content_type='text/plain; charset=utf-8',
+                            status=status)
+    response['Retry-After'] = str(max(math.ceil(retry_after), 1))
+    return response
+
+
+class RateLimitMiddleware:
+    """Ограничивает частоту запросов к представлениям из RATELIMITS.
+
+    Ключ настройки — имя маршрута (``posts:new_post``, ``signup``),
+    значение — лимиты ``{'user': '10/m', 'ip': '30/m', 'methods': [...]}``.
+    По умолчанию считаются только POST: показ формы ничего не стоит.
+    Должен стоять после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_name = request.resolver_match.view_name
+        limits = getattr(settings, 'RATELIMITS', {}).get(view_name)
+        if not limits or request.method not in limits.get(
+                'methods', DEFAULT_METHODS):
+            return None
+        for bucket in buckets(request, view_name, limits):
+            retry_after = bucket.consume()
+            if retry_after:
+                return too_many_requests(retry_after)
+        return None
+
+
+class ConcurrencyLimitMiddleware:
+    """Сбрасывает нагрузку, пока не выросла очередь на блокировку БД.
+
+    Запрос сверх MAX_CONCURRENT_REQUESTS одновременных или запись
+    сверх MAX_CONCURRENT_WRITES сразу получают 503 с Retry-After, а
+    не ждут своей очереди. Лимиты действуют на процесс: сам процесс
+    обслуживает запросы потоками, и счетчик в памяти точнее общего.
+    Потоковый ответ отпускает место, как только представление его
+    вернуло, поэтому открытые SSE-ленты лимит не занимают.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.requests = self.semaphore('MAX_CONCURRENT_REQUESTS')
+        self.writes = self.semaphore('MAX_CONCURRENT_WRITES')
+
+    @staticmethod
+    def semaphore(name):
+        limit = getattr(settings, name, None)
+        return threading.BoundedSemaphore(limit) if limit else None
+
+    def __call__(self, request):
+        held = [self.requests]
+        if request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            held.append(self.writes)
+        held = [semaphore for semaphore in held if semaphore is not None]
+        acquired = []
+        try:
+            for semaphore in held:
+                if not semaphore.acquire(blocking=False):
+                    return too_many_requests(1, status=503)
+                acquired.append(semaphore)
+            return self.get_response(request)
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
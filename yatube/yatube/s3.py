@@ -0,0 +1,225 @@
+import datetime as dt
+import hashlib
+import hmac
+import mimetypes
+from urllib.parse import quote
+from xml.etree import ElementTree
+
+import urllib3
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+from django.utils.encoding import filepath_to_uri
+
+UNSIGNED_PAYLOAD = 'UNSIGNED-PAYLOAD'
+MISSING = -1
+
+
+class S3Error(Exception):
+    def __init__(self, status, body):
+        super().__init__(f'S3 responded {status}: {body[:200]!r}')
+        self.status = status
+
+
+def _hmac(key, message):
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+class S3Client:
+    """Минимальный клиент S3-совместимого API: подпись SigV4,
+    path-style адреса и общий пул соединений urllib3."""
+
+    def __init__(self, endpoint, bucket, access_key, secret_key,
+                 region='us-east-1', pool_size=10):
+        self.endpoint = endpoint.rstrip('/')
+        self.host = urllib3.util.parse_url(self.endpoint).netloc
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.http = urllib3.PoolManager(maxsize=pool_size, block=True,
+                                        retries=urllib3.Retry(3))
+
+    def _sign(self, method, path, query, headers, payload_hash):
+        now = dt.datetime.utcnow()
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        date = now.strftime('%Y%m%d')
+        headers.update({'host': self.host, 'x-amz-date': amz_date,
+                        'x-amz-content-sha256': payload_hash})
+        canonical_headers = ''.join(
+            f'{name}:{str(value).strip()}\n'
+            for name, value in sorted((k.lower(), v)
+                                      for k, v in headers.items()))
+        signed_headers = ';'.join(sorted(k.lower() for k in headers))
+        canonical_query = '&'.join(
+            f'{quote(k, safe="~")}={quote(str(v), safe="~")}'
+            for k, v in sorted(query.items()))
+        canonical_request = '\n'.join([
+            method, quote(path, safe='/~'), canonical_query,
+            canonical_headers, signed_headers, payload_hash])
+        scope = f'{date}/{self.region}/s3/aws4_request'
+        string_to_sign = '\n'.join([
+            'AWS4-HMAC-SHA256', amz_date, scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest()])
+        key = _hmac(f'AWS4{self.secret_key}'.encode(), date)
+        for part in (self.region, 's3', 'aws4_request'):
+            key = _hmac(key, part)
+        signature = hmac.new(key, string_to_sign.encode(),
+                             hashlib.sha256).hexdigest()
+        headers['Authorization'] = (
+            f'AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, '
+            f'SignedHeaders={signed_headers}, Signature={signature}')
+        return canonical_query
+
+    def request(self, method, key, query=None, body=b'', headers=None,
+                preload_content=True, expected=(200, 204, 206)):
+        query = query or {}
+        headers = dict(headers or {})
+        path = f'/{self.bucket}/{key}'
+        payload_hash = (hashlib.sha256(body).hexdigest()
+                        if method in ('GET', 'HEAD', 'DELETE')
+                        else UNSIGNED_PAYLOAD)
+        canonical_query = self._sign(method, path, query, headers,
+                                     payload_hash)
+        url = self.endpoint + quote(path, safe='/~')
+        if canonical_query:
+            url += '?' + canonical_query
+        response = self.http.request(method, url, body=body or None,
+                                     headers=headers,
+                                     preload_content=preload_content)
+        if response.status not in expected:
+            data = response.data if preload_content else response.read()
+            raise S3Error(response.status, data)
+        return response
+
+    def head(self, key):
+        return self.request('HEAD', key, expected=(200, 404))
+
+    def put(self, key, body, content_type):
+        return self.request('PUT', key, body=body,
+                            headers={'Content-Type': content_type})
+
+    def get(self, key):
+        return self.request('GET', key, preload_content=False)
+
+    def delete(self, key):
+        return self.request('DELETE', key, expected=(200, 204, 404))
+
+    def multipart_upload(self, key, chunks, content_type):
+        """Потоковая загрузка частями: в памяти лежит одна часть."""
+        response = self.request('POST', key, query={'uploads': ''},
+                                headers={'Content-Type': content_type})
+        upload_id = _find(response.data, 'UploadId')
+        parts = []
+        try:
+            for number, chunk in enumerate(chunks, start=1):
+                response = self.request(
+                    'PUT', key, body=chunk,
+                    query={'partNumber': number, 'uploadId': upload_id})
+                parts.append((number, response.headers['ETag']))
+            body = ''.join(
+                f'<Part><PartNumber>{number}</PartNumber>'
+                f'<ETag>{etag}</ETag></Part>' for number, etag in parts)
+            self.request(
+                'POST', key, query={'uploadId': upload_id},
+                body=('<CompleteMultipartUpload>'
+                      f'{body}</CompleteMultipartUpload>').encode())
+        except Exception:
+            self.request('DELETE', key, query={'uploadId': upload_id},
+                         expected=(200, 204, 404))
+            raise
+
+
+def _find(xml, tag):
+    for element in ElementTree.fromstring(xml).iter():
+        if element.tag.rsplit('}', 1)[-1] == tag:
+            return element.text
+    raise S3Error(200, xml)
+
+
+@deconstructible
+class S3Storage(Storage):
+    """Хранилище Django поверх S3-совместимого API.
+
+    Большие файлы грузятся multipart-частями по S3_MULTIPART_CHUNK_SIZE,
+    результаты exists()/size() кэшируются в S3_METADATA_CACHE.
+    """
+
+    def __init__(self, bucket=None, location=''):
+        self.bucket = bucket or settings.S3_BUCKET
+        self.location = location.strip('/')
+        self.chunk_size = getattr(settings, 'S3_MULTIPART_CHUNK_SIZE',
+                                  8 * 1024 * 1024)
+        self.metadata_ttl = getattr(settings, 'S3_METADATA_TTL', 300)
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = S3Client(
+                settings.S3_ENDPOINT_URL, self.bucket,
+                settings.S3_ACCESS_KEY, settings.S3_SECRET_KEY,
+                region=getattr(settings, 'S3_REGION', 'us-east-1'),
+                pool_size=getattr(settings, 'S3_POOL_SIZE', 10))
+        return self._client
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, 'S3_METADATA_CACHE', 'default')]
+
+    def _key(self, name):
+        name = name.replace('\\', '/').lstrip('/')
+        return f'{self.location}/{name}' if self.location else name
+
+    def _cache_key(self, name):
+        digest = hashlib.md5(self._key(name).encode()).hexdigest()
+        return f's3meta:{self.bucket}:{digest}'
+
+    def _metadata(self, name):
+        size = self.cache.get(self._cache_key(name))
+        if size is None:
+            response = self.client.head(self._key(name))
+            size = (int(response.headers.get('Content-Length', 0))
+                    if response.status == 200 else MISSING)
+            self.cache.set(self._cache_key(name), size, self.metadata_ttl)
+        return size
+
+    def _open(self, name, mode='rb'):
+        response = self.client.get(self._key(name))
+        try:
+            data = response.read()
+        finally:
+            response.release_conn()
+        return ContentFile(data, name=name)
+
+    def _save(self, name, content):
+        content_type = (getattr(content, 'content_type', None)
+                        or mimetypes.guess_type(name)[0]
+                        or 'application/octet-stream')
+        content.seek(0)
+        key = self._key(name)
+        if content.size is not None and content.size <= self.chunk_size:
+            self.client.put(key, content.read(), content_type)
+        else:
+            self.client.multipart_upload(
+                key, content.chunks(self.chunk_size), content_type)
+        self.cache.set(self._cache_key(name), content.size,
+                       self.metadata_ttl)
+        return name
+
+    def delete(self, name):
+        self.client.delete(self._key(name))
+        self.cache.set(self._cache_key(name), MISSING, self.metadata_ttl)
+
+    def exists(self, name):
+        return self._metadata(name) != MISSING
+
+    def size(self, name):
+        return max(self._metadata(name), 0)
+
+    def url(self, name):
+        base = getattr(settings, 'S3_PUBLIC_URL', None) or (
+            f'{settings.S3_ENDPOINT_URL.rstrip("/")}/{self.bucket}')
+        return f'{base.rstrip("/")}/{filepath_to_uri(self._key(name))}'
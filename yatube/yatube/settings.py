@@ -37,9 +37,13 @@ ALLOWED_HOSTS = [
 # Application definition
 
 INSTALLED_APPS = [
-    'posts',
-    'users',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
     'about',
+    'jobs',
+    'mailer',
+    'notifications.apps.NotificationsConfig',
+    'analytics.apps.AnalyticsConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -51,10 +55,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'yatube.middleware.StaticFilesMiddleware',
+    'yatube.ratelimit.ConcurrencyLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.CachedAuthenticationMiddleware',
+    'analytics.profiling.ProfilingMiddleware',
+    'yatube.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,6 +81,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'yatube.context_processors.year',
+                'notifications.context_processors.unread',
+                'posts.context_processors.live_updates',
             ],
         },
     },
@@ -97,19 +107,23 @@ DATABASES = {
 
 AUTH_PASSWORD_VALIDATORS = [
     {
-        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+        'NAME': 'users.validators.UserAttributeSimilarityValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
     },
     {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+        'NAME': 'users.validators.CommonPasswordValidator',
     },
     {
         'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
     },
 ]
 
+# Собирается командой build_password_list; пока файла нет, используется
+# встроенный список Django.
+COMMON_PASSWORDS_FILE = os.path.join(BASE_DIR, 'common-passwords.txt')
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/2.2/topics/i18n/
@@ -130,19 +144,166 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
+# Имена с хешем содержимого и сжатые .gz/.br копии; отдаются
+# yatube.middleware.StaticFilesMiddleware.
+STATICFILES_STORAGE = 'yatube.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# 'django' — байты отдает wsgi.file_wrapper (sendfile у gunicorn),
+# 'x-accel' — nginx по X-Accel-Redirect на MEDIA_ACCEL_PREFIX,
+# 'x-sendfile' — Apache/lighttpd по X-Sendfile.
+MEDIA_SERVE_MODE = os.environ.get('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Картинки постов хранятся по хешу содержимого (posts.storage);
+# непривязанные файлы удаляются через MEDIA_GC_GRACE секунд.
+MEDIA_PERCEPTUAL_DEDUP = False
+MEDIA_GC_GRACE = 3600
+
+# Медиа в S3-совместимом хранилище (yatube.s3) вместо MEDIA_ROOT.
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+if S3_ENDPOINT_URL:
+    S3_BUCKET = os.environ.get('S3_BUCKET', 'yatube-media')
+    S3_ACCESS_KEY = os.environ.get('S3_ACCESS_KEY', '')
+    S3_SECRET_KEY = os.environ.get('S3_SECRET_KEY', '')
+    S3_REGION = os.environ.get('S3_REGION', 'us-east-1')
+    S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')
+    DEFAULT_FILE_STORAGE = 'yatube.s3.S3Storage'
+    THUMBNAIL_STORAGE = 'yatube.s3.S3Storage'
+    POSTS_IMAGE_STORAGE = 'posts.storage.S3ContentAddressedStorage'
+
+EMAIL_BACKEND = "mailer.backends.OutboxEmailBackend"
+OUTBOX_DELIVERY_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
+# Доставленные письма send_outbox удаляет через столько дней.
+OUTBOX_KEEP_SENT_DAYS = 7
 
 LOGIN_URL = '/auth/login'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Счетчики, версии кэшей и задания планировщика живут в кэше, и его
+# должны видеть все процессы: веб, run_workers и run_scheduler. Кэш в
+# памяти процесса годится только для разработки в одном процессе;
+# check --deploy требует общий (yatube.checks).
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION')
+if MEMCACHED_LOCATION:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATION.split(','),
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# С общим кэшем сессии читаются из него, в БД — только запись, а
+# пользователь сессии кэшируется users.middleware. С кэшем процесса —
+# сессии в БД и без кэша пользователя: иначе выход, смена пароля и
+# блокировка в одном процессе не отзывали бы доступ в остальных.
+# Сессии пишутся лишь при изменении.
+if MEMCACHED_LOCATION:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    USERS_CACHE_TIMEOUT = 300
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    USERS_CACHE_TIMEOUT = 0
+SESSION_SAVE_EVERY_REQUEST = False
+# Публичная сводка автора по имени (users.lookup) кэшируется всегда.
+USERS_SUMMARY_TIMEOUT = 300
+
+# SSE/long-poll уведомления о новых постах (posts.streams).
+STREAMS_POLL_INTERVAL = 1.0
+STREAMS_HEARTBEAT = 15
+STREAMS_MAX_DURATION = 300
+STREAMS_LONGPOLL_TIMEOUT = 25
+# На сколько секунд назад опрос хаба перепроверяет вышедшие посты.
+STREAMS_RELEASE_OVERLAP = 5
+# Под WSGI соединение держит поток, поэтому ленты работают только под
+# yatube.asgi, если не разрешить их явно.
+STREAMS_UNDER_WSGI = False
+
+# Пул потоков, в котором yatube.asgi выполняет представления.
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))
+
+# Сколько уровней ответов показывать на странице поста.
+COMMENTS_DEPTH = 3
+
+# Реакции на посты (posts.reactions): шардов счетчика на пост и реакцию
+# и задержка, с которой задача сводит их в Post.reaction_counts.
+REACTIONS_SHARDS = 8
+REACTIONS_FLUSH_DELAY = 5
+
+# Уведомления (notifications.inbox): задержка и размер пачки раскладки.
+# Бейдж непрочитанных кэшируется на NOTIFICATIONS_UNREAD_TTL секунд.
+NOTIFICATIONS_DELAY = 5
+NOTIFICATIONS_BATCH_SIZE = 500
+NOTIFICATIONS_UNREAD_TTL = 60
+
+# Как часто процесс сверяет свои копии групп с БД (posts.groups).
+POSTS_GROUPS_REFRESH = 5
+
+# Отложенная публикация (posts.scheduler).
+POSTS_SCHEDULER_HORIZON = 600
+POSTS_SCHEDULER_REFRESH = 30
+POSTS_SCHEDULER_BATCH_SIZE = 100
+
+# Ограничение частоты (yatube.ratelimit): токен-ведра по имени маршрута,
+# отдельно на пользователя и на IP; считаются только POST, если не
+# указано иное.
+RATELIMITS = {
+    'posts:new_post': {'user': '10/m', 'ip': '30/m'},
+    'posts:add_comment': {'user': '20/m', 'ip': '60/m'},
+    'posts:profile_follow': {'user': '30/m', 'ip': '60/m',
+                             'methods': ['GET', 'POST']},
+    'signup': {'ip': '5/h'},
 }
+
+# Обратные прокси (адреса или сети через запятую), от которых адрес
+# клиента берется из X-Forwarded-For (yatube.ratelimit.client_ip).
+TRUSTED_PROXIES = [proxy.strip() for proxy in
+                   os.environ.get('TRUSTED_PROXIES', '').split(',')
+                   if proxy.strip()]
+
+# Сброс нагрузки: одновременных запросов и записей на процесс.
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', 64))
+MAX_CONCURRENT_WRITES = int(os.environ.get('MAX_CONCURRENT_WRITES', 8))
+
+# Админка: граница точного COUNT в списках (yatube.paginator).
+ADMIN_COUNT_LIMIT = 10000
+
+# Лента подписок (posts.timeline): длина кэшированного списка постов
+# одного источника и срок его жизни.
+FEED_SOURCE_LENGTH = 500
+FEED_SOURCE_TIMEOUT = 60
+
+# История правок (posts.revisions): каждая N-я версия хранится целиком.
+POSTS_REVISION_SNAPSHOT_EVERY = 10
+
+# Архив (posts.archive): возраст поста, после которого archive_posts
+# переносит его в холодные таблицы, и срок кэша числа архивных постов.
+POSTS_ARCHIVE_AFTER_DAYS = 90
+POSTS_ARCHIVE_COUNT_TTL = 60
+
+# Удаление (posts.purge): содержимое скрывается сразу, а строки и файлы
+# задача purge_deleted удаляет пачками по PURGE_BATCH_SIZE, не больше
+# PURGE_BATCHES_PER_RUN пачек за запуск, с паузой PURGE_DELAY секунд.
+PURGE_BATCH_SIZE = 200
+PURGE_BATCHES_PER_RUN = 20
+PURGE_DELAY = 5
+
+# Просмотры (analytics.counter): копятся в памяти процесса, и фоновый
+# поток сводит их в БД раз в ANALYTICS_FLUSH_INTERVAL секунд или по
+# достижении ANALYTICS_MAX_PENDING страниц.
+ANALYTICS_FLUSH_INTERVAL = 10
+ANALYTICS_MAX_PENDING = 1000
+
+# Профилирование по запросу (analytics.profiling): запрос сотрудника с
+# заголовком X-Profile или ?_profile выполняется под профилировщиком;
+# хранятся последние PROFILING_KEEP профилей.
+PROFILING_INTERVAL = 0.002
+PROFILING_KEEP = 100
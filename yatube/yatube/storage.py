@@ -0,0 +1,60 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.txt', '.html',
+                           '.json', '.xml', '.ico', '.eot', '.ttf', '.otf')
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Хранилище collectstatic: имена файлов с хешем содержимого плюс
+    заранее сжатые копии ``.gz`` (и ``.br``, если установлен brotli).
+
+    Отдает их ``yatube.middleware.StaticFilesMiddleware``.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed = set()
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed.add(hashed_name)
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in hashed:
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress(self.path(hashed_name))
+
+    def compress(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        encoders = [('.gz', _gzip)]
+        if brotli is not None:
+            encoders.append(('.br', brotli.compress))
+        for suffix, encode in encoders:
+            compressed = encode(data)
+            # Сжатая копия нужна только если она действительно меньше.
+            if len(compressed) < len(data):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+            elif os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # collectstatic еще не запускался (разработка, тесты):
+            # ссылаемся на исходное имя.
+            return name
@@ -0,0 +1,106 @@
+import asyncio
+import io
+
+from django.core.wsgi import get_wsgi_application
+from django.test import (SimpleTestCase, TransactionTestCase,
+                         override_settings)
+
+from posts.models import Group
+from posts.streams import hub
+
+from ..handlers import AsgiHandler
+
+
+async def call(app, path, query=b'', method='GET', body=b'',
+               disconnect=None):
+    scope = {'type': 'http', 'method': method, 'path': path,
+             'query_string': query, 'headers': [(b'host', b'testserver')],
+             'server': ('testserver', 80)}
+    disconnect = disconnect or asyncio.Event()
+    messages = []
+    chunks = [body[:1], body[1:]]
+
+    async def receive():
+        if chunks:
+            chunk = chunks.pop(0)
+            return {'type': 'http.request', 'body': chunk,
+                    'more_body': bool(chunks)}
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return messages
+
+
+def response_body(messages):
+    return b''.join(message.get('body', b'') for message in messages
+                    if message['type'] == 'http.response.body')
+
+
+class EnvironTests(SimpleTestCase):
+    def test_headers_and_length(self):
+        """Заголовки переходят в environ, длина тела проставляется."""
+        handler = AsgiHandler(None, max_workers=1)
+        environ = handler.environ({
+            'method': 'POST', 'path': '/новое/', 'query_string': b'a=1',
+            'headers': [(b'content-type', b'text/plain'),
+                        (b'accept', b'a'), (b'accept', b'b')],
+        }, io.BytesIO(b'hello'))
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['CONTENT_LENGTH'], '5')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'a,b')
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['PATH_INFO'].encode('latin1').decode(),
+                         '/новое/')
+
+    def test_split_cookies_are_joined_with_semicolon(self):
+        handler = AsgiHandler(None, max_workers=1)
+        environ = handler.environ({
+            'method': 'GET', 'path': '/',
+            'headers': [(b'cookie', b'sessionid=abc'),
+                        (b'cookie', b'csrftoken=xyz')],
+        }, io.BytesIO())
+        self.assertEqual(environ['HTTP_COOKIE'],
+                         'sessionid=abc; csrftoken=xyz')
+
+
+@override_settings(STREAMS_POLL_INTERVAL=0, STREAMS_HEARTBEAT=0.05,
+                   STREAMS_MAX_DURATION=30)
+class AsgiHandlerTests(TransactionTestCase):
+    def setUp(self):
+        self.app = AsgiHandler(get_wsgi_application(), max_workers=1)
+        self.addCleanup(self.app.executor.shutdown)
+        self.addCleanup(hub.events.clear)
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+
+    def test_regular_view(self):
+        """Обычные представления отдаются через пул потоков."""
+        messages = asyncio.run(call(self.app, '/'))
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn('Последние обновления на сайте'.encode(),
+                      response_body(messages))
+
+    def test_stream_does_not_hold_thread(self):
+        """Открытый поток не занимает единственный поток пула."""
+        async def scenario():
+            closed = asyncio.Event()
+            stream = asyncio.ensure_future(call(
+                self.app, f'/group/{self.group.slug}/stream/',
+                query=b'after=0', disconnect=closed))
+            await asyncio.sleep(0.2)
+            page = await asyncio.wait_for(call(self.app, '/'), 5)
+            stamp = hub.publish(10 ** 9, [f'group:{self.group.id}'])
+            await asyncio.sleep(0.2)
+            closed.set()
+            return page, stamp, await asyncio.wait_for(stream, 5)
+
+        page, stamp, stream = asyncio.run(scenario())
+        self.assertEqual(page[0]['status'], 200)
+        body = response_body(stream).decode()
+        self.assertIn(f'"latest": {stamp}', body)
+        self.assertIn(': ping', body)
+        self.assertNotIn('group', hub.stats()['by_feed'])
@@ -0,0 +1,142 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from posts.models import Post
+
+from ..ratelimit import (ConcurrencyLimitMiddleware, TokenBucket, client_ip,
+                         parse_rate)
+
+User = get_user_model()
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('5/m'), (5, 60))
+        self.assertEqual(parse_rate('20/10m'), (20, 600))
+
+    def test_burst_then_refill(self):
+        """Емкость выдается сразу, дальше — по токену за 1/rate."""
+        bucket = TokenBucket('test', 3, 60)
+        self.assertEqual([bucket.consume(now=100) for _ in range(3)],
+                         [0, 0, 0])
+        self.assertAlmostEqual(bucket.consume(now=100), 20)
+        self.assertEqual(bucket.consume(now=120), 0)
+        self.assertGreater(bucket.consume(now=120), 0)
+
+    def test_idle_bucket_is_capped(self):
+        """Простой не накапливает токенов больше емкости."""
+        bucket = TokenBucket('test', 2, 10)
+        bucket.consume(now=0)
+        results = [bucket.consume(now=10) for _ in range(3)]
+        self.assertEqual(results[:2], [0, 0])
+        self.assertGreater(results[2], 0)
+
+
+class ClientIpTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_forwarded_for_is_ignored_by_default(self):
+        request = self.factory.get('/', REMOTE_ADDR='10.0.0.2',
+                                   HTTP_X_FORWARDED_FOR='203.0.113.7')
+        self.assertEqual(client_ip(request), '10.0.0.2')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_trusted_proxy_forwards_client(self):
+        """За прокси берется первый справа чужой адрес: подделанное
+        клиентом начало заголовка не в счет."""
+        request = self.factory.get(
+            '/', REMOTE_ADDR='10.0.0.2',
+            HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.7, 10.0.0.3')
+        self.assertEqual(client_ip(request), '203.0.113.7')
+        direct = self.factory.get('/', REMOTE_ADDR='198.51.100.1',
+                                  HTTP_X_FORWARDED_FOR='1.1.1.1')
+        self.assertEqual(client_ip(direct), '198.51.100.1')
+
+
+@override_settings(RATELIMITS={
+    'posts:add_comment': {'user': '2/m', 'ip': '3/m'},
+    'posts:profile_follow': {'user': '1/m', 'methods': ['GET']},
+})
+class RateLimitMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(text='test', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('posts:add_comment',
+                           args=['author', RateLimitMiddlewareTests.post.id])
+
+    def login(self, username):
+        client = Client()
+        client.force_login(User.objects.create_user(username=username))
+        return client
+
+    def test_user_bucket(self):
+        client = self.login('reader')
+        statuses = [client.post(self.url, {'text': 'hi'}).status_code
+                    for _ in range(3)]
+        self.assertEqual(statuses, [302, 302, 429])
+        response = client.post(self.url, {'text': 'hi'})
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(RateLimitMiddlewareTests.post.comments.count(), 2)
+
+    def test_ip_bucket_spans_users(self):
+        """Общий IP упирается в свой лимит, даже если аккаунты разные."""
+        statuses = [self.login(f'user{number}').post(
+            self.url, {'text': 'hi'}).status_code for number in range(4)]
+        self.assertEqual(statuses, [302, 302, 302, 429])
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1'])
+    def test_clients_behind_proxy_have_own_buckets(self):
+        statuses = [self.login(f'user{number}').post(
+            self.url, {'text': 'hi'},
+            HTTP_X_FORWARDED_FOR=f'203.0.113.{number}').status_code
+            for number in range(4)]
+        self.assertEqual(statuses, [302] * 4)
+
+    def test_only_listed_methods(self):
+        client = self.login('reader')
+        for _ in range(5):
+            self.assertNotEqual(client.get(self.url).status_code, 429)
+        follow = reverse('posts:profile_follow', args=['author'])
+        self.assertEqual(client.get(follow).status_code, 302)
+        self.assertEqual(client.get(follow).status_code, 429)
+
+
+class ConcurrencyLimitMiddlewareTests(SimpleTestCase):
+    @override_settings(MAX_CONCURRENT_REQUESTS=10, MAX_CONCURRENT_WRITES=1)
+    def test_sheds_writes_over_cap(self):
+        """Лишняя запись получает 503, а не ждет в очереди."""
+        entered, release = threading.Event(), threading.Event()
+
+        def view(request):
+            entered.set()
+            release.wait(5)
+            return HttpResponse()
+
+        middleware = ConcurrencyLimitMiddleware(view)
+        factory = RequestFactory()
+        worker = threading.Thread(
+            target=middleware, args=[factory.post('/')])
+        worker.start()
+        entered.wait(5)
+        response = middleware(factory.post('/'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        release.set()
+        worker.join()
+        self.assertEqual(middleware(factory.get('/')).status_code, 200)
+        self.assertEqual(middleware(factory.post('/')).status_code, 200)
@@ -0,0 +1,166 @@
+import re
+import threading
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from ..s3 import S3Storage
+
+
+class S3Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def parse(self):
+        url = urlsplit(self.path)
+        _, bucket, key = url.path.split('/', 2)
+        self.server.calls[self.command] += 1
+        if not self.headers.get('Authorization', '').startswith(
+                'AWS4-HMAC-SHA256 Credential='):
+            self.send(403)
+            return None
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        return key, parse_qs(url.query, keep_blank_values=True), body
+
+    def send(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        parsed = self.parse()
+        if parsed is None:
+            return
+        data = self.server.objects.get(parsed[0])
+        if data is None:
+            self.send(404)
+        else:
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+
+    def do_GET(self):
+        parsed = self.parse()
+        if parsed is None:
+            return
+        data = self.server.objects.get(parsed[0])
+        self.send(404) if data is None else self.send(200, data)
+
+    def do_PUT(self):
+        parsed = self.parse()
+        if parsed is None:
+            return
+        key, query, body = parsed
+        if 'uploadId' in query:
+            upload = self.server.uploads[query['uploadId'][0]]
+            upload[int(query['partNumber'][0])] = body
+            self.send(200, headers={'ETag': f'"part{len(upload)}"'})
+        else:
+            self.server.objects[key] = body
+            self.send(200)
+
+    def do_POST(self):
+        parsed = self.parse()
+        if parsed is None:
+            return
+        key, query, body = parsed
+        if 'uploads' in query:
+            upload_id = uuid.uuid4().hex
+            self.server.uploads[upload_id] = {}
+            self.send(200, (
+                '<InitiateMultipartUploadResult><UploadId>'
+                f'{upload_id}</UploadId></InitiateMultipartUploadResult>'
+            ).encode())
+        else:
+            upload = self.server.uploads.pop(query['uploadId'][0])
+            numbers = [int(n) for n in
+                       re.findall(rb'<PartNumber>(\d+)</PartNumber>', body)]
+            self.server.objects[key] = b''.join(upload[n] for n in numbers)
+            self.send(200, b'<CompleteMultipartUploadResult/>')
+
+    def do_DELETE(self):
+        parsed = self.parse()
+        if parsed is None:
+            return
+        self.server.objects.pop(parsed[0], None)
+        self.send(204)
+
+
+class S3StandIn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), S3Handler)
+        self.objects = {}
+        self.uploads = {}
+        self.calls = Counter()
+
+
+class S3StorageTests(SimpleTestCase):
+    def setUp(self):
+        self.server = S3StandIn()
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        endpoint = f'http://127.0.0.1:{self.server.server_address[1]}'
+        settings = override_settings(
+            S3_ENDPOINT_URL=endpoint, S3_BUCKET='media',
+            S3_ACCESS_KEY='key', S3_SECRET_KEY='secret',
+            S3_MULTIPART_CHUNK_SIZE=1024, S3_PUBLIC_URL=None)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        cache.clear()
+        self.storage = S3Storage()
+
+    def test_small_file_roundtrip(self):
+        """Небольшой файл загружается одним PUT и читается обратно."""
+        name = self.storage.save('posts/a.txt', ContentFile(b'hello'))
+        self.assertEqual(self.server.objects['posts/a.txt'], b'hello')
+        self.assertEqual(self.server.calls['POST'], 0)
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), b'hello')
+
+    def test_large_file_uses_multipart(self):
+        """Большой файл уходит multipart-частями."""
+        data = bytes(range(256)) * 20
+        self.storage.save('posts/big.bin', ContentFile(data))
+        self.assertEqual(self.server.objects['posts/big.bin'], data)
+        self.assertEqual(self.server.calls['PUT'], 5)
+        self.assertEqual(self.server.calls['POST'], 2)
+
+    def test_metadata_is_cached(self):
+        """exists()/size() не ходят в S3 повторно."""
+        self.server.objects['posts/x.txt'] = b'12345'
+        for _ in range(3):
+            self.assertTrue(self.storage.exists('posts/x.txt'))
+            self.assertEqual(self.storage.size('posts/x.txt'), 5)
+            self.assertFalse(self.storage.exists('posts/missing.txt'))
+        self.assertEqual(self.server.calls['HEAD'], 2)
+
+    def test_delete_updates_cache(self):
+        """После удаления exists() сразу возвращает False."""
+        name = self.storage.save('posts/a.txt', ContentFile(b'hello'))
+        self.assertTrue(self.storage.exists(name))
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertNotIn(name, self.server.objects)
+
+    def test_url(self):
+        """URL строится от адреса бакета."""
+        self.assertEqual(
+            self.storage.url('posts/a b.txt'),
+            f'http://127.0.0.1:{self.server.server_address[1]}'
+            '/media/posts/a%20b.txt')
@@ -0,0 +1,87 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+CSS = b'body { color: red; }\n' * 200
+
+
+class StaticPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.source = tempfile.mkdtemp()
+        cls.root = tempfile.mkdtemp()
+        with open(os.path.join(cls.source, 'site.css'), 'wb') as f:
+            f.write(CSS)
+        cls.settings = override_settings(STATICFILES_DIRS=[cls.source],
+                                         STATIC_ROOT=cls.root)
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.source, ignore_errors=True)
+        shutil.rmtree(cls.root, ignore_errors=True)
+        super().tearDownClass()
+
+    def hashed_url(self):
+        return staticfiles_storage.url('site.css')
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        """collectstatic создает файл с хешем и его сжатую копию."""
+        name = staticfiles_storage.stored_name('site.css')
+        self.assertNotEqual(name, 'site.css')
+        path = os.path.join(StaticPipelineTests.root, name)
+        with gzip.open(path + '.gz') as f:
+            self.assertEqual(f.read(), CSS)
+
+    def test_serves_precompressed_variant(self):
+        """Клиенту с gzip отдается заранее сжатая копия навсегда."""
+        response = self.client.get(self.hashed_url(),
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)),
+                         CSS)
+
+    def test_serves_identity_without_accept_encoding(self):
+        """Без Accept-Encoding отдается несжатый файл."""
+        response = self.client.get(self.hashed_url())
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+
+    def test_etag_revalidation(self):
+        """Совпавший ETag дает 304."""
+        response = self.client.get(self.hashed_url())
+        response = self.client.get(self.hashed_url(),
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_differs_per_encoding(self):
+        """ETag сжатой копии не подтверждает несжатую и наоборот."""
+        gzipped = self.client.get(self.hashed_url(),
+                                  HTTP_ACCEPT_ENCODING='gzip')
+        identity = self.client.get(self.hashed_url())
+        self.assertNotEqual(gzipped['ETag'], identity['ETag'])
+        response = self.client.get(self.hashed_url(),
+                                   HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get(self.hashed_url(),
+                                   HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_path_traversal_is_not_served(self):
+        """Пути за пределами STATIC_ROOT не отдаются."""
+        response = self.client.get('/static/../settings.py')
+        self.assertNotEqual(response.status_code, 200)
@@ -19,8 +19,13 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from posts.media import serve_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('media/<path:path>', serve_media, name='media'),
+    path('notifications/', include('notifications.urls',
+                                   namespace='notifications')),
     path('', include('posts.urls', namespace='posts')),
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
@@ -31,7 +36,5 @@ handler404 = "posts.views.page_not_found"
 handler500 = "posts.views.server_error"
 
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL,
-                          document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)
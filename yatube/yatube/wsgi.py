@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Просмотры сводит в БД фоновый поток процесса, а не запросы.
+from analytics.counter import counter  # noqa: E402
+
+counter.start()